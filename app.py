@@ -1,12 +1,23 @@
 # app.py
-import gradio as gr
-from src.orchestrator.langgraph_workflow import run_workflow
+from typing import Optional, Tuple
+
+from src.config import cfg
+from src.orchestrator.job_queue import QueueFullError, get_default_queue
+from src.orchestrator.langgraph_workflow import run_workflow, stream_workflow
+from src.utils.logging_setup import configure_logging
 from pathlib import Path
 
 
 def generate_report(topic: str):
     if not topic or not topic.strip():
         return "Error: please provide a research topic.", None, None
+    if cfg.SERVICE_MODE == "queue":
+        # Service mode: hand the job to the workers and return its ID right away
+        try:
+            job_id = get_default_queue().submit(topic.strip())
+        except QueueFullError as e:
+            return f"Server busy: {e}. Please try again later.", None, None
+        return f"Queued as job {job_id}", None, None
     paths = run_workflow(topic.strip())
     if isinstance(paths, dict) and "error" in paths:
         return f"Error occurred: {paths['error']}", None, None
@@ -24,7 +35,91 @@ def generate_report(topic: str):
         return f"Error parsing output: {e}", None, None
 
 
+def _section_markdown(heading, content) -> str:
+    if isinstance(content, (list, tuple)):
+        body = "\n".join(f"- {c}" for c in content)
+    else:
+        body = str(content)
+    return f"## {heading}\n\n{body}\n"
+
+
+def generate_report_stream(topic: str):
+    """Streaming variant of `generate_report`: yields (status, preview, docx, pdf) as the run progresses."""
+    if not topic or not topic.strip():
+        yield "Error: please provide a research topic.", "", None, None
+        return
+    key_points = ""
+    sections = []
+    docx_path = pdf_path = None
+    for event in stream_workflow(topic.strip()):
+        kind = event["event"]
+        if kind == "search_done":
+            yield f"Found {len(event['hits'])} sources, extracting key points...", "", None, None
+        elif kind == "key_points_delta":
+            key_points += event["text"]
+            yield "Extracting key points...", f"## Key points (draft)\n\n{key_points}", None, None
+        elif kind == "section":
+            sections.append(_section_markdown(event["heading"], event["content"]))
+            yield f"Drafted {len(sections)} section(s)...", "\n".join(sections), None, None
+        elif kind == "sections_reset":
+            sections = []
+        elif kind == "docx_written":
+            docx_path = event["path"]
+            yield "DOCX written...", "\n".join(sections), docx_path, pdf_path
+        elif kind == "pdf_written":
+            pdf_path = event["path"]
+            yield "PDF written...", "\n".join(sections), docx_path, pdf_path
+        elif kind == "done":
+            error = event["output_paths"].get("error")
+            status = f"Error occurred: {error}" if error else "Report generated successfully!"
+            yield status, "\n".join(sections), docx_path, pdf_path
+
+
+def _sections_preview(structured) -> str:
+    return "\n".join(_section_markdown(sec.get("heading", ""), sec.get("content", ""))
+                     for sec in (structured or {}).get("sections", []))
+
+
+def submit_report_job(topic: str) -> Tuple[Optional[str], str]:
+    """Service mode: enqueue the report and return (job_id, status) without waiting for it.
+
+    The UI then polls `job_progress` on a timer, so a pending report never
+    holds a request handler while the workers run it.
+    """
+    if not topic or not topic.strip():
+        return None, "Error: please provide a research topic."
+    queue = get_default_queue()
+    try:
+        job_id = queue.submit(topic.strip())
+    except QueueFullError as e:
+        return None, f"Server busy: {e}. Please try again later."
+    return job_id, f"Job {job_id} queued ({queue.depth()} job(s) waiting)..."
+
+
+def job_progress(job_id: Optional[str]) -> Tuple[str, str, Optional[str], Optional[str], bool]:
+    """One status read for `job_id`: (status, preview, docx, pdf, finished)."""
+    if not job_id:
+        return "", "", None, None, True
+    queue = get_default_queue()
+    job = queue.status(job_id)
+    if job is None:
+        return f"Error: job {job_id} disappeared from the queue.", "", None, None, True
+    if job["status"] == "done":
+        result = job.get("result", {})
+        paths = result.get("output_paths", {})
+        return ("Report generated successfully!", _sections_preview(result.get("structured")),
+                paths.get("docx"), paths.get("pdf"), True)
+    if job["status"] == "failed":
+        return f"Error occurred: {job.get('error')}", "", None, None, True
+    if job["status"] == "queued":
+        return f"Job {job_id} queued ({queue.depth()} job(s) waiting)...", "", None, None, False
+    return f"Job {job_id}: {job.get('stage')}...", "", None, None, False
+
+
 if __name__ == "__main__":
+    import gradio as gr
+
+    configure_logging()
     with gr.Blocks(title="Research Agent") as demo:
         gr.Markdown("# Multi-Agent Research Report Generator")
         gr.Markdown("Enter a topic below to let the AI agents research, analyze, and write a report for you.")
@@ -36,13 +131,31 @@ if __name__ == "__main__":
         
         generate_btn = gr.Button("Generate Report", variant="primary")
         status = gr.Textbox(label="Status", interactive=False)
+        preview = gr.Markdown()
         
         with gr.Row():
             docx_file = gr.File(label="Download DOCX")
             pdf_file = gr.File(label="Download PDF")
 
-        generate_btn.click(generate_report, inputs=topic_input,
-                        outputs=[status, docx_file, pdf_file])
+        if cfg.SERVICE_MODE == "queue":
+            # Submit returns at once; a timer polls the job so no handler waits on the workers
+            job_id = gr.State(None)
+            poll_timer = gr.Timer(cfg.JOB_POLL_INTERVAL, active=False)
+
+            def submit(topic):
+                submitted, message = submit_report_job(topic)
+                return submitted, message, "", None, None, gr.Timer(active=submitted is not None)
+
+            def poll(current):
+                *outputs, finished = job_progress(current)
+                return (*outputs, gr.Timer(active=not finished))
+
+            generate_btn.click(submit, inputs=topic_input,
+                               outputs=[job_id, status, preview, docx_file, pdf_file, poll_timer])
+            poll_timer.tick(poll, inputs=job_id, outputs=[status, preview, docx_file, pdf_file, poll_timer])
+        else:
+            generate_btn.click(generate_report_stream, inputs=topic_input,
+                               outputs=[status, preview, docx_file, pdf_file])
 
     try:
         demo.launch(server_name="127.0.0.1", server_port=7860, show_error=True)
@@ -0,0 +1,84 @@
+"""Measure LLM tail latency with and without hedged requests against the fake Gemini server.
+
+Run from the repository root (needs google-genai, no API key or network):
+
+    python -m benchmarks.bench_hedging
+    python -m benchmarks.bench_hedging --requests 400 --tail-prob 0.05 --tail-latency 2 --concurrency 8
+
+Starts `benchmarks.fake_llm_server` in-process with a slow tail, then issues the
+same uncached calls twice, hedging off and on. Prints one JSON object per run
+with p50/p95/p99 latency, how many calls were hedged, how often the backup won
+and how many requests the server actually received (the cost of hedging).
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.fake_llm_server import start_server
+from src.config import cfg
+from src.utils.hedging import Hedger
+from src.utils.llm_client import LLMClient
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(server, hedge: bool, requests: int, concurrency: int, warmup: int) -> Dict:
+    cfg.LLM_HEDGE = hedge
+    client = LLMClient(api_key="fake", hedger=Hedger())
+
+    def one(i: int) -> float:
+        t0 = time.perf_counter()
+        client.generate_text(f"Request {i}: say something.", max_tokens=64, use_cache=False)
+        return time.perf_counter() - t0
+
+    # Warm-up calls give the tracker its p95 before hedging can start
+    for i in range(warmup):
+        one(-i - 1)
+    before = server.stats()["requests"]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(requests)))
+    hedging = client.hedger.stats()
+    return {
+        "hedge": hedge,
+        "requests": requests,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000.0, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000.0, 1),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000.0, 1),
+        "max_ms": round(max(latencies) * 1000.0, 1),
+        "hedged": hedging["hedged"],
+        "backup_wins": hedging["backup_wins"],
+        "server_requests": server.stats()["requests"] - before,
+    }
+
+
+def main(argv=None) -> List[Dict]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="typical seconds per request")
+    parser.add_argument("--tail-prob", type=float, default=0.05, help="probability of a slow request")
+    parser.add_argument("--tail-latency", type=float, default=1.0, help="seconds for a slow request")
+    args = parser.parse_args(argv)
+
+    server = start_server(latency=args.latency, jitter=args.latency / 5,
+                          tail_prob=args.tail_prob, tail_latency=args.tail_latency)
+    cfg.GENAI_BASE_URL = server.base_url
+    cfg.LLM_HEDGE_MIN_SAMPLES = min(cfg.LLM_HEDGE_MIN_SAMPLES, args.warmup)
+    cfg.LLM_HEDGE_MIN_DELAY = 0.0
+    try:
+        results = [run(server, hedge, args.requests, args.concurrency, args.warmup)
+                   for hedge in (False, True)]
+    finally:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark pooled vs. per-request HTTP clients against a local stub server.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_http_pool --requests 500 --concurrency 8
+
+Prints one JSON object with requests/second for each client strategy.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.utils import http_client
+
+_BODY = b"<html><body>" + b"<a class='result__a' href='https://example.com'>hit</a>" * 10 + b"</body></html>"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/html"
+
+
+def _timed(n: int, concurrency: int, fn) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: fn(), range(n)))
+    return n / (time.perf_counter() - t0)
+
+
+async def _atimed(n: int, concurrency: int, fn) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await fn()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    return n / (time.perf_counter() - t0)
+
+
+async def _async_suite(url: str, n: int, concurrency: int) -> dict:
+    import httpx
+
+    async def fresh_client():
+        async with httpx.AsyncClient() as client:
+            (await client.post(url, data={"q": "x"})).raise_for_status()
+
+    async def pooled():
+        (await http_client.arequest("POST", url, data={"q": "x"})).raise_for_status()
+
+    results = {
+        "async_fresh_client_rps": round(await _atimed(n, concurrency, fresh_client), 1),
+        "async_pooled_rps": round(await _atimed(n, concurrency, pooled), 1),
+    }
+    await http_client.aclose_async_client()
+    return results
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    server, url = start_stub_server()
+    try:
+        n, c = args.requests, args.concurrency
+        results = {
+            "requests": n,
+            "concurrency": c,
+            "sync_fresh_connection_rps": round(_timed(
+                n, c, lambda: requests.post(url, data={"q": "x"}, timeout=10).raise_for_status()), 1),
+            "sync_pooled_session_rps": round(_timed(
+                n, c, lambda: http_client.request("POST", url, data={"q": "x"}).raise_for_status()), 1),
+        }
+        results.update(asyncio.run(_async_suite(url, n, c)))
+    finally:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Measure cold import time of the pipeline's entry modules with `python -X importtime`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --module src.orchestrator.batch --top 15 --max-ms 400
+
+Each module is imported in a fresh interpreter (best of --repeat runs). Prints
+one JSON object per module with the total cumulative import time and the
+heaviest top-level dependencies. With --max-ms the exit status is 1 when any
+module exceeds the budget, so the check can run in CI.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+DEFAULT_MODULES = [
+    "src.orchestrator.langgraph_workflow",
+    "src.orchestrator.batch",
+    "src.agents.report_writer_agent",
+    "app",
+]
+
+# "import time:       self [us] |  cumulative | imported package"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """One record per imported module: name, depth, self_us, cumulative_us."""
+    records = []
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            records.append({"module": name, "depth": (len(indent) - 1) // 2,
+                            "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return records
+
+
+def measure(module: str) -> List[Dict]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def summarize(module: str, records: List[Dict], top: int) -> Dict:
+    target = next((r for r in reversed(records) if r["module"] == module), None)
+    # Dependencies by top-level package (e.g. "google" rather than every google.*
+    # submodule), excluding the measured module's own package
+    own = module.split(".")[0]
+    roots: Dict[str, int] = {}
+    for r in records:
+        root = r["module"].split(".")[0]
+        if root != own:
+            roots[root] = max(roots.get(root, 0), r["cumulative_us"])
+    heaviest = sorted(roots.items(), key=lambda kv: -kv[1])[:top]
+    return {
+        "module": module,
+        "total_ms": round((target["cumulative_us"] if target else 0) / 1000.0, 1),
+        "modules_imported": len(records),
+        "heaviest_ms": {name: round(us / 1000.0, 1) for name, us in heaviest},
+    }
+
+
+def main(argv=None) -> List[Dict]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", action="append", dest="modules",
+                        help="module to import (repeatable); defaults to the pipeline entry points")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module; best run wins")
+    parser.add_argument("--top", type=int, default=10, help="heaviest dependencies to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail when a module takes longer")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in args.modules or DEFAULT_MODULES:
+        runs = [summarize(module, measure(module), args.top) for _ in range(max(1, args.repeat))]
+        results.append(min(runs, key=lambda r: r["total_ms"]))
+    print(json.dumps(results, indent=2))
+
+    if args.max_ms is not None:
+        slow = [r["module"] for r in results if r["total_ms"] > args.max_ms]
+        if slow:
+            print(f"over budget ({args.max_ms} ms): {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark the streaming PDF renderer on synthetic 10/100/1000-page reports.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_render --pages 10 100 1000
+
+Prints one JSON object per report size with render time, pages written, file
+size and peak Python heap usage (tracemalloc).
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from src.tools.pdf_renderer import render_report_pdf
+
+_WORDS = ("solar irrigation yield water pump farmers adoption cost subsidy region "
+          "efficiency groundwater policy survey panel battery maintenance income").split()
+
+# One section (heading, paragraph, bullets, small table) fills roughly half a page
+_SECTIONS_PER_PAGE = 2
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_report(pages: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    sections = []
+    for i in range(pages * _SECTIONS_PER_PAGE):
+        sections.append({
+            "heading": f"Section {i + 1}: {rng.choice(_WORDS).title()}",
+            "content": " ".join(_sentence(rng) for _ in range(8)),
+            "table": [["Metric", "Value", "Source"]] + [
+                [rng.choice(_WORDS), f"{rng.random() * 100:.1f}%", _sentence(rng)] for _ in range(2)],
+        })
+        sections.append({
+            "heading": "Key points",
+            "content": [_sentence(rng) for _ in range(3)],
+        })
+    return {"title": f"Synthetic {pages}-page report", "summary": _sentence(rng), "sections": sections}
+
+
+def _page_count(path: str) -> int:
+    with open(path, "rb") as f:
+        data = f.read()
+    marker = b"/Type /Pages /Kids"
+    start = data.rfind(marker)
+    count_at = data.index(b"/Count ", start) + len(b"/Count ")
+    return int(data[count_at:data.index(b" ", count_at)])
+
+
+def bench(pages: int, out_dir: str) -> dict:
+    report = synthetic_report(pages)
+    path = os.path.join(out_dir, f"bench_{pages}.pdf")
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    render_report_pdf(report, path)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "target_pages": pages,
+        "pages": _page_count(path),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(_page_count(path) / elapsed, 1),
+        "peak_heap_mb": round(peak / 1e6, 2),
+        "file_mb": round(os.path.getsize(path) / 1e6, 2),
+    }
+
+
+def main(argv=None) -> list:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as out_dir:
+        results = [bench(n, out_dir) for n in args.pages]
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
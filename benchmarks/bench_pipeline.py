@@ -0,0 +1,140 @@
+"""End-to-end pipeline benchmark on deterministic fake search and LLM backends.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline -o results.json
+    python -m benchmarks.bench_pipeline --topics 16 --concurrency 1 4 8 --llm-latency lognormal:0.2:0.4
+    python -m benchmarks.compare baseline.json results.json
+
+Every topic runs through the real workflow (agents, summarizer, analysis,
+rendering) with `benchmarks.fakes` standing in for web search and Gemini, so the
+numbers depend only on this code and the configured distributions. Reports:
+
+* per-stage latency (p50/p95 of node.*, tool.search, llm.generate, render.*)
+  and end-to-end throughput for each concurrency level, via `run_batch`;
+* render time of `generate_docx` / `generate_pdf_from_text` on a synthetic report;
+* peak RSS of this process and of its child processes (process-pool renders).
+
+The JSON output is meant to be stored per commit and diffed with
+`benchmarks.compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+from benchmarks.bench_pdf_render import synthetic_report
+from benchmarks.fakes import FakeGenAIClient, FakeSearch, install_fakes
+from src.config import cfg
+from src.orchestrator.batch import run_batch
+from src.tools.doc_generator import docx_available, generate_docx, generate_pdf_from_text
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0
+    return {
+        "self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def bench_throughput(topics: int, concurrency: int, max_results: int) -> Dict:
+    # Topic names are unique per level so no level benefits from another's search cache
+    names = [f"Benchmark topic {i} at concurrency {concurrency}" for i in range(topics)]
+    summary = run_batch(names, concurrency=concurrency, max_results=max_results)
+    return {
+        "concurrency": concurrency,
+        "reports": summary["reports"],
+        "failed": summary["failed"],
+        "elapsed_s": summary["elapsed_s"],
+        "reports_per_min": summary["reports_per_min"],
+        "stages": summary["stages"],
+    }
+
+
+def bench_render(pages: int, repeat: int) -> Dict:
+    report = synthetic_report(pages)
+    writers = {"pdf": generate_pdf_from_text}
+    if docx_available():
+        writers["docx"] = generate_docx
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, writer in writers.items():
+            timings = []
+            for i in range(max(1, repeat)):
+                path = os.path.join(tmp, f"bench_{i}.{fmt}")
+                t0 = time.perf_counter()
+                writer(report, path)
+                timings.append(time.perf_counter() - t0)
+            results[fmt] = {"best_ms": round(min(timings) * 1000.0, 1),
+                            "bytes": os.path.getsize(path)}
+    return {"pages": pages, "formats": results}
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=8, help="topics per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--search-latency", default="uniform:0.05:0.15", help="seconds (distribution)")
+    parser.add_argument("--snippet-words", default="uniform:30:80", help="words per search snippet")
+    parser.add_argument("--llm-latency", default="lognormal:0.2:0.3", help="seconds (distribution)")
+    parser.add_argument("--llm-chars", default="uniform:400:1200", help="characters per LLM answer")
+    parser.add_argument("--render-pages", type=int, default=20, help="synthetic report size for render timing")
+    parser.add_argument("--render-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    search = FakeSearch(args.search_latency, args.snippet_words, args.seed)
+    llm = FakeGenAIClient(args.llm_latency, args.llm_chars, args.seed)
+    output_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    previous_output_dir, cfg.OUTPUT_DIR = cfg.OUTPUT_DIR, output_dir
+    try:
+        with install_fakes(search, llm):
+            levels = [bench_throughput(args.topics, c, args.max_results) for c in args.concurrency]
+        render = bench_render(args.render_pages, args.render_repeat)
+    finally:
+        cfg.OUTPUT_DIR = previous_output_dir
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+            "search_calls": search.calls,
+            "llm_calls": llm.calls,
+        },
+        "throughput": levels,
+        "render": render,
+        "peak_rss": _peak_rss_mb(),
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Diff two benchmark JSON results and flag performance regressions.
+
+Run from the repository root:
+
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+
+Numeric leaves of both files are matched by path (list entries with a
+"concurrency" or "pages" key are matched on it, others by position). Metrics
+named like times or sizes (*_ms, *_s, *_mb, bytes) are better when lower,
+throughput (*_per_min, *_per_s, rps) when higher; other numbers are listed
+but never fail. Exits with status 1 when any metric regresses by more than
+--threshold percent; time metrics must also move by at least --min-delta-ms so
+sub-millisecond jitter in fast stages is not reported.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+_LOWER_SUFFIXES = ("_ms", "_s", "_mb", "bytes")
+_HIGHER_SUFFIXES = ("_per_min", "_per_s", "rps")
+# Inputs and bookkeeping rather than measurements
+_SKIP_ROOTS = ("meta",)
+
+
+def _label(item, index: int) -> str:
+    if isinstance(item, dict):
+        for key in ("concurrency", "pages", "module", "name"):
+            if key in item:
+                return f"{key}={item[key]}"
+    return str(index)
+
+
+def flatten(data, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if not prefix and key in _SKIP_ROOTS:
+                continue
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            yield from flatten(item, f"{prefix}[{_label(item, i)}]")
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        yield prefix, float(data)
+
+
+def direction(path: str) -> Optional[str]:
+    leaf = path.rsplit(".", 1)[-1]
+    if leaf.endswith(_HIGHER_SUFFIXES):
+        return "higher"
+    if leaf.endswith(_LOWER_SUFFIXES):
+        return "lower"
+    return None
+
+
+def _delta_ms(path: str, delta: float) -> Optional[float]:
+    leaf = path.rsplit(".", 1)[-1]
+    if leaf.endswith("_ms"):
+        return abs(delta)
+    if leaf.endswith("_s"):
+        return abs(delta) * 1000.0
+    return None
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_delta_ms: float = 0.0) -> Dict:
+    old, new = dict(flatten(baseline)), dict(flatten(current))
+    rows, regressions = [], []
+    for path in sorted(set(old) & set(new)):
+        before, after = old[path], new[path]
+        change = (after - before) / before * 100.0 if before else 0.0
+        better = direction(path)
+        worse = (better == "lower" and change > threshold) or (better == "higher" and change < -threshold)
+        delta_ms = _delta_ms(path, after - before)
+        if worse and delta_ms is not None and delta_ms < min_delta_ms:
+            worse = False
+        rows.append({"metric": path, "baseline": before, "current": after,
+                     "change_pct": round(change, 1), "better": better, "regression": worse})
+        if worse:
+            regressions.append(path)
+    return {"rows": rows, "regressions": regressions,
+            "only_baseline": sorted(set(old) - set(new)), "only_current": sorted(set(new) - set(old))}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="ignore time changes smaller than this many milliseconds")
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    result = compare(baseline, current, args.threshold, args.min_delta_ms)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        width = max((len(r["metric"]) for r in result["rows"]), default=10)
+        for r in result["rows"]:
+            flag = "REGRESSION" if r["regression"] else ""
+            print(f"{r['metric']:<{width}}  {r['baseline']:>12.4g}  {r['current']:>12.4g}  "
+                  f"{r['change_pct']:>+7.1f}%  {flag}")
+        if result["regressions"]:
+            print(f"\n{len(result['regressions'])} regression(s) over {args.threshold}%", file=sys.stderr)
+    return 1 if result["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Local fake of the Gemini REST API with injectable latency, for hedging and load tests.
+
+Run from the repository root:
+
+    python -m benchmarks.fake_llm_server --port 8765 --latency 0.2 --tail-prob 0.05 --tail-latency 3
+
+then point the pipeline at it (any non-empty API key works):
+
+    GENAI_BASE_URL=http://127.0.0.1:8765 GOOGLE_API_KEY=fake python batch.py ...
+
+Serves `POST /<version>/models/<model>:generateContent` and
+`:streamGenerateContent?alt=sse`. Responses come from the in-repo mock LLM so the
+pipeline parses them like real output. Each request sleeps `latency` +/- `jitter`
+seconds; with probability `tail_prob` it sleeps `tail_latency` instead (a slow
+replica), and with probability `error_rate` it fails with 503. Per-model
+latencies (`--model-latency name=seconds`) allow routing tests.
+
+`GET /stats` returns request counts; `POST /control` with a JSON object updates
+the settings of a running server.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from src.utils.llm_client import MockLLM
+
+_PATH_RE = re.compile(r"^/[^/]+/models/([^/:]+):(generateContent|streamGenerateContent)")
+
+DEFAULT_SETTINGS = {
+    "latency": 0.2,
+    "jitter": 0.05,
+    "tail_prob": 0.0,
+    "tail_latency": 2.0,
+    "error_rate": 0.0,
+    "model_latency": {},
+    "stream_chunks": 4,
+}
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], settings: Optional[Dict] = None):
+        super().__init__(address, _Handler)
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {"requests": 0, "errors": 0, "tail": 0}
+        self.per_model: Dict[str, int] = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self, model: str) -> Tuple[float, bool]:
+        """(seconds to sleep, fail with 503) for one request to `model`."""
+        s = self.settings
+        with self.lock:
+            self.counts["requests"] += 1
+            self.per_model[model] = self.per_model.get(model, 0) + 1
+            if random.random() < s["error_rate"]:
+                self.counts["errors"] += 1
+                return 0.0, True
+            if random.random() < s["tail_prob"]:
+                self.counts["tail"] += 1
+                return s["tail_latency"], False
+        base = s["model_latency"].get(model, s["latency"])
+        return max(0.0, base + random.uniform(-s["jitter"], s["jitter"])), False
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {**self.counts, "per_model": dict(self.per_model)}
+
+
+def _response(text: str, model: str, prompt_chars: int) -> Dict:
+    prompt_tokens = prompt_chars // 4 + 1
+    response_tokens = len(text) // 4 + 1
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                        "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": response_tokens,
+                          "totalTokenCount": prompt_tokens + response_tokens},
+        "modelVersion": model,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeLLMServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        if self.path.startswith("/control"):
+            update = self._read_json()
+            with self.server.lock:
+                self.server.settings.update(update)
+            self._send_json(200, self.server.settings)
+            return
+        m = _PATH_RE.match(self.path)
+        if not m:
+            self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+            return
+        model, method = m.groups()
+        body = self._read_json()
+        prompt = "".join(part.get("text", "") for content in body.get("contents", [])
+                         for part in content.get("parts", []))
+        config = body.get("generationConfig", {})
+
+        seconds, fail = self.server.delay(model)
+        time.sleep(seconds)
+        if fail:
+            self._send_json(503, {"error": {"code": 503, "message": "fake overload", "status": "UNAVAILABLE"}})
+            return
+        text = MockLLM().generate_text(prompt, max_tokens=config.get("maxOutputTokens", 1024))
+
+        if method == "generateContent":
+            self._send_json(200, _response(text, model, len(prompt)))
+            return
+        # Server-sent events, one JSON response per chunk
+        n = max(1, self.server.settings["stream_chunks"])
+        step = max(1, -(-len(text) // n))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i in range(0, max(len(text), 1), step):
+            chunk = json.dumps(_response(text[i:i + step], model, len(prompt)))
+            self.wfile.write(f"data: {chunk}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **settings) -> FakeLLMServer:
+    """Start a server in a daemon thread (port 0 picks a free one); stop it with `shutdown()`."""
+    server = FakeLLMServer((host, port), settings)
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+def _model_latency(values) -> Dict[str, float]:
+    latencies = {}
+    for item in values or []:
+        name, _, seconds = item.partition("=")
+        latencies[name] = float(seconds)
+    return latencies
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=DEFAULT_SETTINGS["latency"], help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_SETTINGS["jitter"], help="+/- seconds")
+    parser.add_argument("--tail-prob", type=float, default=0.0, help="probability of a slow request")
+    parser.add_argument("--tail-latency", type=float, default=DEFAULT_SETTINGS["tail_latency"],
+                        help="seconds for a slow request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503")
+    parser.add_argument("--model-latency", action="append", metavar="MODEL=SECONDS",
+                        help="per-model base latency (repeatable)")
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer((args.host, args.port), {
+        "latency": args.latency, "jitter": args.jitter, "tail_prob": args.tail_prob,
+        "tail_latency": args.tail_latency, "error_rate": args.error_rate,
+        "model_latency": _model_latency(args.model_latency),
+    })
+    print(f"fake Gemini API on {server.base_url} (GENAI_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Deterministic fake search and LLM backends for pipeline benchmarks.
+
+`install_fakes` replaces the upstream search providers behind
+`src.tools.web_search.search` and the google-genai client inside the shared
+`LLMClient` with in-process fakes, so caching, spans, rate limiting and the
+agents' parsing all run as in production while every external call has a
+controlled latency and payload size. Full-page fetching and the on-disk LLM cache
+are switched off and the search cache is cleared for the duration.
+
+Latency and size distributions are given as strings:
+
+    "0.05"                  constant
+    "uniform:0.02:0.08"     uniform between two values
+    "lognormal:0.05:0.5"    lognormal with the given median and sigma
+
+Draws are seeded by (seed, request content), so the same query or prompt always
+gets the same latency and payload regardless of thread scheduling.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Tuple
+
+from src.config import cfg
+from src.tools import web_search
+from src.utils.llm_client import MockLLM, get_default_client
+
+_WORDS = ("solar irrigation yield water pump farmers adoption cost subsidy region "
+          "efficiency groundwater policy survey panel battery maintenance income").split()
+
+
+class Distribution:
+    def __init__(self, spec: str):
+        self.spec = str(spec)
+        kind, _, args = self.spec.partition(":")
+        if not args:
+            self.kind, self.args = "const", (float(kind),)
+        else:
+            self.kind, self.args = kind, tuple(float(a) for a in args.split(":"))
+        if self.kind not in ("const", "uniform", "lognormal"):
+            raise ValueError(f"Unknown distribution {self.spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "const":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.args)
+        median, sigma = self.args
+        return median * math.exp(rng.gauss(0.0, sigma))
+
+    def __repr__(self) -> str:
+        return self.spec
+
+
+def _rng(seed: int, key: str) -> random.Random:
+    digest = hashlib.sha256(f"{seed}:{key}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(max(1, count)))
+
+
+class FakeSearch:
+    """Stands in for the SerpAPI / DuckDuckGo providers."""
+
+    def __init__(self, latency: str = "0.05", snippet_words: str = "40", seed: int = 0):
+        self.latency = Distribution(latency)
+        self.snippet_words = Distribution(snippet_words)
+        self.seed = seed
+        self.calls = 0
+
+    def results(self, query: str, num: int) -> Tuple[List[Dict], float]:
+        rng = _rng(self.seed, f"search:{query}:{num}")
+        hits = []
+        for i in range(num):
+            words = int(self.snippet_words.sample(rng))
+            hits.append({"title": f"{query} - source {i + 1}",
+                         "link": f"https://bench.invalid/{rng.getrandbits(32):08x}",
+                         "snippet": f"{query} {_words(rng, words)}."})
+        return hits, self.latency.sample(rng)
+
+    def __call__(self, query: str, num: int) -> List[Dict]:
+        self.calls += 1
+        hits, delay = self.results(query, num)
+        time.sleep(delay)
+        return hits
+
+    async def acall(self, query: str, num: int) -> List[Dict]:
+        self.calls += 1
+        hits, delay = self.results(query, num)
+        await asyncio.sleep(delay)
+        return hits
+
+
+class _Response:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4 + 1, candidates_token_count=len(text) // 4 + 1,
+            total_token_count=(len(prompt) + len(text)) // 4 + 2)
+
+
+class FakeGenAIClient:
+    """Mimics the parts of `google.genai.Client` that `LLMClient` calls.
+
+    Answers come from `MockLLM` so the agents parse them like real output; plain
+    text answers (key points) are padded with bullets up to the sampled size.
+    """
+
+    def __init__(self, latency: str = "0.2", response_chars: str = "800", seed: int = 0):
+        self.latency = Distribution(latency)
+        self.response_chars = Distribution(response_chars)
+        self.seed = seed
+        self.calls = 0
+        self.models = SimpleNamespace(generate_content=self._generate,
+                                      generate_content_stream=self._stream)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+
+    def _answer(self, model: str, contents: str, config):
+        self.calls += 1
+        rng = _rng(self.seed, f"llm:{model}:{contents}")
+        text = MockLLM().generate_text(contents, max_tokens=getattr(config, "max_output_tokens", 1024) or 1024)
+        if not text.lstrip().startswith("{"):
+            target = int(self.response_chars.sample(rng))
+            while len(text) < target:
+                text += f"\n- {_words(rng, 12)}."
+        return text, self.latency.sample(rng)
+
+    def _generate(self, model: str, contents: str, config=None):
+        text, delay = self._answer(model, contents, config)
+        time.sleep(delay)
+        return _Response(text, contents)
+
+    def _stream(self, model: str, contents: str, config=None) -> Iterator[_Response]:
+        text, delay = self._answer(model, contents, config)
+        # Time to first chunk is half the latency, the rest is spread over the chunks
+        time.sleep(delay / 2)
+        step = max(1, len(text) // 8)
+        for i in range(0, len(text), step):
+            time.sleep(delay / 16)
+            yield _Response(text[i:i + step], contents)
+
+    async def _agenerate(self, model: str, contents: str, config=None):
+        text, delay = self._answer(model, contents, config)
+        await asyncio.sleep(delay)
+        return _Response(text, contents)
+
+
+@contextmanager
+def install_fakes(search: FakeSearch, llm: FakeGenAIClient):
+    """Route search and LLM calls to the fakes inside the block; restores everything after."""
+    client = get_default_client()
+    saved = {
+        "upstream": web_search._upstream_search,
+        "aupstream": web_search._aupstream_search,
+        "client": client._client,
+        "api_key": client.api_key,
+        "cache": client.cache,
+        "fetch": cfg.FETCH_PAGES,
+    }
+
+    def upstream(query: str, num: int) -> List[Dict]:
+        with web_search.stage_slot("search"):
+            return search(query, num)
+
+    async def aupstream(query: str, num: int) -> List[Dict]:
+        async with web_search.astage_slot("search"):
+            return await search.acall(query, num)
+
+    web_search._upstream_search = upstream
+    web_search._aupstream_search = aupstream
+    client._client = llm
+    client.api_key = "benchmark"
+    client.cache = None
+    cfg.FETCH_PAGES = False
+    web_search._cache.clear()
+    try:
+        yield
+    finally:
+        web_search._upstream_search = saved["upstream"]
+        web_search._aupstream_search = saved["aupstream"]
+        client._client = saved["client"]
+        client.api_key = saved["api_key"]
+        client.cache = saved["cache"]
+        cfg.FETCH_PAGES = saved["fetch"]
+        web_search._cache.clear()
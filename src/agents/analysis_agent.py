@@ -1,28 +1,29 @@
 """Analysis agent: synthesize research hits into a structured report.
 
-Uses the summarizer and LLM wrapper to produce a JSON report structure. Falls back to
-an internal heuristic if a robust LLM isn't available.
+Uses the summarizer and LLM wrapper to produce a JSON report structure. Answers are
+parsed and validated against the report schema by `src.utils.structured_output`
+(native JSON mode, one repair re-prompt); the internal heuristic report is the last
+resort when no valid report comes back.
 """
 import json
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from src.tools.summarizer import extract_key_points
+from src.config import cfg
+from src.tools.context_packer import pack_context, stale_filter
+from src.tools.summarizer import extract_key_points, aextract_key_points
 from src.utils.llm_client import get_default_client
+from src.utils.structured_output import REPORT, SECTIONS
 
+# How the analysis stage obtains its bullets:
+#   "reuse"       - use the key_points research_topic already extracted (no extra LLM call)
+#   "two_pass"    - re-extract key points from the excerpts, then structure them (legacy)
+#   "single_pass" - one request that returns key points and the structured report together
+ANALYSIS_MODES = ("reuse", "two_pass", "single_pass")
 
-def analyze_research(research_output: dict) -> dict:
-    excerpts: List[str] = research_output.get("excerpts", [])
-    title = research_output.get("query", "Research Report")
-    summary = research_output.get("summary", "")
-
-    # First get concise bullets
-    try:
-        key_points_text = extract_key_points(excerpts)
-    except Exception:
-        key_points_text = "\n".join([f"- {e}" for e in excerpts[:8]])
 
+def _build_prompt(title: str, summary: str, key_points_text: str) -> str:
     # Prompt an LLM to convert bullets into structured JSON
-    prompt = (
+    return (
         f"{title}\n"
         f"Summary: {summary}\n\n"
         f"Bulleted points:\n{key_points_text}\n\n"
@@ -32,34 +33,150 @@ def analyze_research(research_output: dict) -> dict:
         "IMPORTANT: Return ONLY valid JSON. Do not include markdown formatting (like ```json ... ```) or any other text."
     )
 
-    llm = get_default_client()
-    try:
-        content = llm.generate_text(prompt, temperature=0.0, max_tokens=1000)
-        # Attempt to clean potential markdown fences if the LLM ignores instructions
-        clean_content = content.replace("```json", "").replace("```", "").strip()
-        
-        parsed = None
-        try:
-            parsed = json.loads(clean_content)
-        except json.JSONDecodeError:
-            # Try to find a JSON substring if direct parse fails
-            start = content.find("{")
-            end = content.rfind("}")
-            if start != -1 and end != -1:
-                try:
-                    parsed = json.loads(content[start:end+1])
-                except Exception:
-                    parsed = None
-
-        if isinstance(parsed, dict):
-            # Validate basic structure
-            if "sections" not in parsed:
-                parsed["sections"] = [{"heading": "Key Points", "content": key_points_text}]
-            return parsed
 
+def _build_single_pass_prompt(title: str, summary: str, excerpts: List[str], max_points: int = 8) -> str:
+    lines = [f"- {e}" for e in pack_context(excerpts, query=title)]
+    return (
+        f"{title}\n"
+        + (f"Summary: {summary}\n" if summary else "")
+        + "\nSource excerpts:\n" + "\n".join(lines) + "\n\n"
+        f"Task: Identify at most {max_points} key insights from the excerpts and write a structured report. "
+        "Return only a valid JSON object with keys: 'title', 'summary', 'key_points', 'sections'. "
+        "'key_points' is a list of concise strings. "
+        "The 'sections' key should be a list of objects, each having 'heading' and 'content' keys. "
+        "Content can be a string or a list of strings. "
+        "Do not include markdown formatting (like ```json ... ```) or any other text."
+    )
+
+
+def _build_update_prompt(title: str, headings: List[str], key_points_text: str,
+                         removed: List[str]) -> str:
+    listed = "\n".join(f"{i}. {h}" for i, h in enumerate(headings, 1)) or "(none)"
+    return (
+        f"{title}\n"
+        f"Existing report sections:\n{listed}\n\n"
+        f"New findings since the report was written:\n{key_points_text}\n\n"
+        + (f"Sources no longer available: {len(removed)}\n\n" if removed else "")
+        + "Task: Write only the additions the new findings require. "
+        "Return only a valid JSON object with key 'sections', a list of objects with 'heading' and 'content' keys. "
+        "Reuse an existing heading exactly to add to that section, or use a new heading for a new section. "
+        "Content can be a string or a list of strings and must contain only the new material. "
+        "Do not include markdown formatting (like ```json ... ```) or any other text."
+    )
+
+
+def _merge_content(old, new):
+    """Append `new` section content to `old`, skipping lines or items already present."""
+    if isinstance(old, str) and isinstance(new, str):
+        lines = [l for l in old.splitlines() if l.strip()]
+        seen = {l.strip().casefold() for l in lines}
+        lines += [l for l in new.splitlines() if l.strip() and l.strip().casefold() not in seen]
+        return "\n".join(lines)
+    items = list(old) if isinstance(old, (list, tuple)) else [old] if old else []
+    seen = {str(i).strip().casefold() for i in items}
+    for item in (new if isinstance(new, (list, tuple)) else [new]):
+        if item and str(item).strip().casefold() not in seen:
+            items.append(item)
+            seen.add(str(item).strip().casefold())
+    return items
+
+
+def merge_sections(structured: dict, updates: List[dict]) -> Tuple[dict, List[str]]:
+    """Merge `updates` into `structured` by heading; returns (report, changed headings).
+
+    A section whose heading matches (case-insensitively) gets the new content
+    appended, any other section is added at the end. Unchanged sections are
+    shared with `structured`, which itself is not modified.
+    """
+    sections = list(structured.get("sections", []))
+    position = {str(sec.get("heading", "")).strip().casefold(): i for i, sec in enumerate(sections)}
+    changed: List[str] = []
+    for update in updates:
+        if not isinstance(update, dict) or not update.get("content"):
+            continue
+        heading = str(update.get("heading") or "Updates").strip()
+        i = position.get(heading.casefold())
+        if i is None:
+            position[heading.casefold()] = len(sections)
+            sections.append({"heading": heading, "content": update["content"]})
+        else:
+            content = _merge_content(sections[i].get("content", ""), update["content"])
+            if content == sections[i].get("content"):
+                continue
+            sections[i] = {**sections[i], "content": content}
+        changed.append(heading)
+    return {**structured, "sections": sections}, changed
+
+
+def _prune_content(content, is_stale):
+    if isinstance(content, (list, tuple)):
+        return [item for item in content if not is_stale(str(item))]
+    return "\n".join(line for line in str(content or "").splitlines() if not is_stale(line))
+
+
+def prune_sections(structured: dict, stale: List[str], excerpts: List[str]) -> Tuple[dict, List[str]]:
+    """Drop lines / items backed only by `stale` source excerpts; returns (report, changed headings).
+
+    Support is lexical (`stale_filter`), so paraphrased or general content is
+    kept. A section left empty is removed. `structured` is not modified.
+    """
+    if not stale:
+        return structured, []
+    is_stale = stale_filter(stale, excerpts)
+    sections: List[dict] = []
+    changed: List[str] = []
+    for sec in structured.get("sections", []):
+        content = _prune_content(sec.get("content", ""), is_stale)
+        if content == sec.get("content", ""):
+            sections.append(sec)
+            continue
+        changed.append(str(sec.get("heading", "")))
+        if content:
+            sections.append({**sec, "content": content})
+    if not changed:
+        return structured, []
+    return {**structured, "sections": sections}, changed
+
+
+def update_report(structured: dict, key_points_text: str, removed: Optional[List[str]] = None,
+                  stale: Optional[List[str]] = None,
+                  excerpts: Optional[List[str]] = None) -> Tuple[dict, List[str]]:
+    """Revise a finished report after its sources changed.
+
+    Lines backed only by `stale` excerpts (the previous text of changed and
+    removed sources) are pruned first, checked against the current `excerpts`.
+    Then only the section headings and the key points of new or changed
+    sources are sent to the LLM, so the request grows with the change rather
+    than with the report. When the answer cannot be parsed the key points are
+    added to a "Key Points" section. Returns (report, changed headings); the
+    report is `structured` itself when nothing changed.
+    """
+    structured, pruned = prune_sections(structured, stale or [], excerpts or [])
+    if not key_points_text.strip():
+        return structured, pruned
+    title = structured.get("title", "Research Report")
+    headings = [str(sec.get("heading", "")) for sec in structured.get("sections", [])]
+    prompt = _build_update_prompt(title, headings, key_points_text, removed or [])
+    try:
+        parsed = SECTIONS.generate(prompt, task="analysis", max_tokens=1000)
     except Exception:
         parsed = None
+    if parsed is None:
+        parsed = {"sections": [{"heading": "Key Points", "content": key_points_text}]}
+    structured, added = merge_sections(structured, parsed.get("sections", []))
+    return structured, pruned + [h for h in added if h not in pruned]
+
 
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = mode or cfg.ANALYSIS_MODE
+    return mode if mode in ANALYSIS_MODES else "reuse"
+
+
+def _naive_bullets(excerpts: List[str]) -> str:
+    return "\n".join([f"- {e}" for e in excerpts[:8]])
+
+
+def _fallback_report(title: str, summary: str, excerpts: List[str], key_points_text: str) -> dict:
     # Final fallback: construct a simple structured report
     sections = []
     if key_points_text:
@@ -75,6 +192,193 @@ def analyze_research(research_output: dict) -> dict:
     }
 
 
+def analyze_research(research_output: dict, mode: Optional[str] = None) -> dict:
+    excerpts: List[str] = research_output.get("excerpts", [])
+    title = research_output.get("query", "Research Report")
+    summary = research_output.get("summary", "")
+    mode = _resolve_mode(mode)
+    llm = get_default_client()
+
+    if mode == "single_pass":
+        try:
+            parsed = REPORT.generate(_build_single_pass_prompt(title, summary, excerpts), task="analysis",
+                                     max_tokens=1500, llm=llm)
+            if parsed is not None:
+                return parsed
+        except Exception:
+            pass
+        return _fallback_report(title, summary, excerpts, _naive_bullets(excerpts))
+
+    # First get concise bullets
+    key_points_text = research_output.get("key_points") if mode == "reuse" else None
+    if not key_points_text:
+        try:
+            key_points_text = extract_key_points(excerpts, query=title)
+        except Exception:
+            key_points_text = _naive_bullets(excerpts)
+
+    prompt = _build_prompt(title, summary, key_points_text)
+
+    try:
+        parsed = REPORT.generate(prompt, task="analysis", max_tokens=1000, llm=llm)
+        if parsed is not None:
+            return parsed
+    except Exception:
+        pass
+
+    return _fallback_report(title, summary, excerpts, key_points_text)
+
+
+async def aanalyze_research(research_output: dict, mode: Optional[str] = None) -> dict:
+    """Async variant of `analyze_research`."""
+    excerpts: List[str] = research_output.get("excerpts", [])
+    title = research_output.get("query", "Research Report")
+    summary = research_output.get("summary", "")
+    mode = _resolve_mode(mode)
+    llm = get_default_client()
+
+    if mode == "single_pass":
+        try:
+            parsed = await REPORT.agenerate(_build_single_pass_prompt(title, summary, excerpts), task="analysis",
+                                            max_tokens=1500, llm=llm)
+            if parsed is not None:
+                return parsed
+        except Exception:
+            pass
+        return _fallback_report(title, summary, excerpts, _naive_bullets(excerpts))
+
+    key_points_text = research_output.get("key_points") if mode == "reuse" else None
+    if not key_points_text:
+        try:
+            key_points_text = await aextract_key_points(excerpts, query=title)
+        except Exception:
+            key_points_text = _naive_bullets(excerpts)
+
+    prompt = _build_prompt(title, summary, key_points_text)
+
+    try:
+        parsed = await REPORT.agenerate(prompt, task="analysis", max_tokens=1000, llm=llm)
+        if parsed is not None:
+            return parsed
+    except Exception:
+        pass
+
+    return _fallback_report(title, summary, excerpts, key_points_text)
+
+
+class _SectionScanner:
+    """Pull complete section objects out of a partially streamed report JSON.
+
+    Scans forward from where it stopped, tracking brace depth and string state,
+    so each streamed chunk is examined once.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = -1       # scan position inside the "sections" array, -1 until found
+        self._depth = 0
+        self._obj_start = -1
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        self.buffer += chunk
+        if self._pos < 0:
+            key = self.buffer.find('"sections"')
+            bracket = self.buffer.find("[", key) if key != -1 else -1
+            if bracket == -1:
+                return []
+            self._pos = bracket + 1
+        found = []
+        buf = self.buffer
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = self._pos
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start != -1:
+                    try:
+                        obj = json.loads(buf[self._obj_start:self._pos + 1])
+                        if isinstance(obj, dict):
+                            found.append(obj)
+                    except json.JSONDecodeError:
+                        pass
+                    self._obj_start = -1
+            self._pos += 1
+        return found
+
+
+def stream_analysis(research_output: dict, mode: Optional[str] = None) -> Iterator[Tuple[str, dict]]:
+    """Yield ("section", section) as each section of the report JSON is streamed,
+    then ("report", structured) once the full report is parsed.
+
+    When the final report does not start with the streamed sections (it was
+    repaired or is the fallback), ("reset", {}) is yielded first: the sections
+    seen so far are void and all of the report's sections follow.
+
+    The single-pass mode is not streamed; its sections are yielded after the call.
+    """
+    excerpts: List[str] = research_output.get("excerpts", [])
+    title = research_output.get("query", "Research Report")
+    summary = research_output.get("summary", "")
+    mode = _resolve_mode(mode)
+
+    if mode == "single_pass":
+        report = analyze_research(research_output, mode=mode)
+        for sec in report.get("sections", []):
+            yield "section", sec
+        yield "report", report
+        return
+
+    key_points_text = research_output.get("key_points") if mode == "reuse" else None
+    if not key_points_text:
+        try:
+            key_points_text = extract_key_points(excerpts, query=title)
+        except Exception:
+            key_points_text = _naive_bullets(excerpts)
+
+    scanner = _SectionScanner()
+    emitted: List[dict] = []
+    parsed = None
+    try:
+        llm = get_default_client()
+        prompt = _build_prompt(title, summary, key_points_text)
+        parsed = REPORT.cached(prompt, task="analysis", max_tokens=1000, llm=llm)
+        if parsed is None:
+            # The raw stream is not cached; `complete` caches the validated report
+            for chunk in llm.generate_text_stream(prompt, temperature=0.0, max_tokens=1000, use_cache=False,
+                                                  task="analysis", response_schema=REPORT.native_schema):
+                for sec in scanner.feed(chunk):
+                    emitted.append(sec)
+                    yield "section", sec
+            parsed = REPORT.complete(scanner.buffer, task="analysis", max_tokens=1000, llm=llm, prompt=prompt)
+    except Exception:
+        parsed = None
+
+    report = parsed if parsed is not None else _fallback_report(title, summary, excerpts, key_points_text)
+    sections = report.get("sections", [])
+    if sections[:len(emitted)] != emitted:
+        # The report was repaired or replaced by the fallback: streamed sections are void
+        yield "reset", {}
+        emitted = []
+    # Sections the scanner could not see (e.g. fallback report) are delivered now
+    for sec in sections[len(emitted):]:
+        yield "section", sec
+    yield "report", report
+
+
 # -------------------------
 # Debug test
 # -------------------------
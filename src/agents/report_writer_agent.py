@@ -1,16 +1,241 @@
+"""Render a structured report to every output format.
+
+The report is normalized once into a `Document` and all requested writers
+render that same model concurrently, so write latency is bounded by the slowest
+format rather than the sum of them. Heavy formats (DOCX, PDF) run on a shared
+render pool: threads by default (`RENDER_EXECUTOR=thread`), or "serial". With
+the opt-in `RENDER_EXECUTOR=process` they run on a process pool whose workers
+are spawned rather than forked, since forking a process that already runs
+search, LLM and HTTP threads can deadlock on locks those threads held. Spawned
+workers re-import the main module, so the entry script must keep its pipeline
+calls under `if __name__ == "__main__":` or each worker runs them again.
+Cheap text formats (Markdown, HTML, JSON) render inline. Formats come from the
+registry in `src.tools.formats`.
+
+A format that fails to render does not lose the others: its error is logged,
+recorded on its `render.<format>` span and reported under the "error" key next
+to the paths that were written. `RenderError` is raised only when nothing could
+be rendered.
+"""
+import asyncio
+import logging
+import multiprocessing
 import os
-from datetime import datetime
-from src.tools.doc_generator import generate_docx, generate_pdf_from_text
+import threading
+import time
+import uuid
+from concurrent.futures import (BrokenExecutor, Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor, as_completed)
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.tools.document_model import Document, build_document
+from src.tools.formats import available_formats, get_format, get_writer, resolve_formats
 from src.config import cfg
+from src.utils.instrumentation import record_span
+from src.utils.stage_limits import astage_slot, stage_slot
+
+logger = logging.getLogger(__name__)
+
+RENDER_EXECUTORS = ("process", "thread", "serial")
+
+_pool_lock = threading.Lock()
+_pool: Optional[Executor] = None
+_pool_pid: Optional[int] = None
+
+
+class RenderError(RuntimeError):
+    """Raised when formats failed to render; `errors` maps format -> message."""
+
+    def __init__(self, errors: Dict[str, str]):
+        super().__init__(_describe(errors))
+        self.errors = errors
+
 
-def write_report(structured_report: dict) -> dict:
+def _describe(errors: Dict[str, str]) -> str:
+    return "; ".join(f"{fmt}: {msg}" for fmt, msg in errors.items())
+
+
+def _safe_name(text: str) -> str:
+    return "".join(c for c in text if c.isalnum() or c in (" ", "-")).rstrip()
+
+
+def _output_paths(structured_report: dict, formats: List[str], run_id: Optional[str] = None) -> dict:
+    """File path per format, unique per run (`run_id`, or a random suffix without one).
+
+    The title and timestamp alone collide when reports on the same topic are
+    written within the same second, e.g. concurrent jobs or batch runs.
+    """
     os.makedirs(cfg.OUTPUT_DIR, exist_ok=True)
-    title = structured_report.get("title", "Research Report")
-    safe_title = "".join(c for c in title if c.isalnum() or c in (" ", "-")).rstrip()
-    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-    base = f"{safe_title[:50]}_{timestamp}"
-    docx_path = os.path.join(cfg.OUTPUT_DIR, base + ".docx")
-    pdf_path = os.path.join(cfg.OUTPUT_DIR, base + ".pdf")
-    generate_docx(structured_report, docx_path)
-    generate_pdf_from_text(structured_report, pdf_path)
-    return {"docx": docx_path, "pdf": pdf_path}
+    safe_title = _safe_name(structured_report.get("title", "Research Report"))
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+    suffix = _safe_name(run_id or "")[:32] or uuid.uuid4().hex[:12]
+    base = f"{safe_title[:50]}_{timestamp}_{suffix}"
+    return {fmt: os.path.join(cfg.OUTPUT_DIR, f"{base}.{get_format(fmt).extension}") for fmt in formats}
+
+
+def _render_one(fmt: str, doc: Document, out_path: str) -> Tuple[str, float, int]:
+    """Worker entry point (must stay module-level to be picklable)."""
+    t0 = time.perf_counter()
+    get_writer(fmt)(doc, out_path)
+    size = os.path.getsize(out_path) if os.path.exists(out_path) else 0
+    return out_path, (time.perf_counter() - t0) * 1000.0, size
+
+
+def _record(fmt: str, result: Tuple[str, float, int]) -> str:
+    # Spans cannot cross the process boundary, so the parent records the timing
+    path, duration_ms, size = result
+    record_span(f"render.{fmt}", duration_ms, path=path, bytes=size)
+    return path
+
+
+def _pool_workers() -> int:
+    # RENDER_WORKERS=0: one worker per heavy format, so a full render never queues
+    heavy = [fmt for fmt in available_formats() if not get_format(fmt).inline]
+    return max(1, cfg.RENDER_WORKERS or len(heavy))
+
+
+def _get_pool() -> Optional[Executor]:
+    """Shared render pool, or None for serial rendering (rebuilt after a fork)."""
+    global _pool, _pool_pid
+    mode = cfg.RENDER_EXECUTOR if cfg.RENDER_EXECUTOR in RENDER_EXECUTORS else "thread"
+    if mode == "serial":
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            workers = _pool_workers()
+            if mode == "process":
+                _pool = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+            else:
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _reset_pool(pool: Executor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _failed(fmt: str, error: BaseException, errors: Dict[str, str]) -> None:
+    logger.warning(f"Rendering {fmt} failed: {error}")
+    record_span(f"render.{fmt}", 0.0, error=str(error))
+    errors[fmt] = str(error)
+
+
+def _iter_rendered(doc: Document, paths: Dict[str, str],
+                   errors: Dict[str, str]) -> Iterator[Tuple[str, str]]:
+    """Yield (format, path) per written file; failed formats go to `errors`."""
+    inline = [fmt for fmt in paths if get_format(fmt).inline]
+    heavy = [fmt for fmt in paths if fmt not in inline]
+    pool = _get_pool() if heavy else None
+    futures: Dict[Future, str] = {}
+    if pool is not None:
+        try:
+            futures = {pool.submit(_render_one, fmt, doc, paths[fmt]): fmt for fmt in heavy}
+        except Exception as e:
+            # e.g. process pools unavailable in this sandbox/platform
+            logger.warning(f"Render pool unavailable ({e}); rendering serially")
+            _reset_pool(pool)
+            pool = None
+    if pool is None:
+        inline += heavy
+    # Cheap formats render here while the pool works on the heavy ones
+    for fmt in inline:
+        try:
+            result = _render_one(fmt, doc, paths[fmt])
+        except Exception as e:
+            _failed(fmt, e, errors)
+            continue
+        yield fmt, _record(fmt, result)
+    for future in as_completed(futures):
+        fmt = futures[future]
+        try:
+            try:
+                result = future.result()
+            except BrokenExecutor as e:
+                logger.warning(f"Render pool broke while writing {fmt} ({e}); retrying serially")
+                _reset_pool(pool)
+                result = _render_one(fmt, doc, paths[fmt])
+        except Exception as e:
+            _failed(fmt, e, errors)
+            continue
+        yield fmt, _record(fmt, result)
+
+
+def _written(paths: Dict[str, str], errors: Dict[str, str]) -> dict:
+    """Paths that were written, plus an "error" entry naming the formats that were not."""
+    if not errors:
+        return paths
+    if len(errors) == len(paths):
+        raise RenderError(errors)
+    written = {fmt: path for fmt, path in paths.items() if fmt not in errors}
+    written["error"] = _describe(errors)
+    return written
+
+
+def write_report(structured_report: dict, formats: Optional[Iterable[str]] = None,
+                 run_id: Optional[str] = None) -> dict:
+    """Render `structured_report` in `formats` (default OUTPUT_FORMATS); returns {format: path}.
+
+    File names carry `run_id` when given (a random suffix otherwise), so
+    concurrent runs never overwrite each other's files.
+    """
+    doc = build_document(structured_report)
+    paths = _output_paths(structured_report, resolve_formats(formats), run_id)
+    errors: Dict[str, str] = {}
+    with stage_slot("render"):
+        for _ in _iter_rendered(doc, paths, errors):
+            pass
+    return _written(paths, errors)
+
+
+def iter_write_report(structured_report: dict, formats: Optional[Iterable[str]] = None,
+                      run_id: Optional[str] = None):
+    """Render all formats concurrently, yielding (format, path) as each file is written.
+
+    Raises `RenderError` after the last written file if any format failed.
+    """
+    doc = build_document(structured_report)
+    paths = _output_paths(structured_report, resolve_formats(formats), run_id)
+    errors: Dict[str, str] = {}
+    with stage_slot("render"):
+        yield from _iter_rendered(doc, paths, errors)
+    if errors:
+        raise RenderError(errors)
+
+
+async def awrite_report(structured_report: dict, formats: Optional[Iterable[str]] = None,
+                        run_id: Optional[str] = None) -> dict:
+    """Async variant of `write_report`.
+
+    Heavy writers run on the render pool (or the default executor when
+    rendering serially) so the event loop stays free for other jobs.
+    """
+    doc = build_document(structured_report)
+    paths = _output_paths(structured_report, resolve_formats(formats), run_id)
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    async with astage_slot("render"):
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _render_one, fmt, doc, paths[fmt])
+            if not get_format(fmt).inline else asyncio.to_thread(_render_one, fmt, doc, paths[fmt])
+            for fmt in paths), return_exceptions=True)
+    errors: Dict[str, str] = {}
+    for fmt, result in zip(paths, results):
+        if isinstance(result, BrokenExecutor):
+            logger.warning(f"Render pool broke while writing {fmt} ({result}); retrying serially")
+            _reset_pool(pool)
+            try:
+                result = await asyncio.to_thread(_render_one, fmt, doc, paths[fmt])
+            except Exception as e:
+                result = e
+        if isinstance(result, BaseException):
+            _failed(fmt, result, errors)
+        else:
+            _record(fmt, result)
+    return _written(paths, errors)
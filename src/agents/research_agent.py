@@ -1,37 +1,80 @@
-"""Research agent: query web search wrapper and produce snippets + summary."""
-from typing import List, Dict
+"""Research agent: query web search wrapper and produce snippets + summary.
+
+With a research index configured (RESEARCH_INDEX_PATH), finished research is
+remembered and a new topic close to a fresh past one reuses it: at
+RESEARCH_REUSE_THRESHOLD similarity as is (no search, no LLM call), above
+RESEARCH_EXTEND_THRESHOLD by extending it when the new search confirms the
+overlap, extracting key points only from the sources the past run did not have.
+
+`refresh_research` does the same for a later run of the same topic: hits are
+diffed against the previous research by URL and content hash and only new or
+changed sources go to the LLM.
+"""
+import hashlib
+import logging
+from typing import List, Dict, Optional, Tuple
+from src.config import cfg
 from src.tools import web_search
-from src.tools.summarizer import extract_key_points
-from src.utils.llm_client import get_default_client
+from src.tools.context_packer import stale_filter
+from src.tools.page_fetcher import afetch_pages, fetch_pages, page_text
+from src.tools.research_index import ResearchMatch, get_default_index
+from src.tools.summarizer import extract_key_points, aextract_key_points
+from src.utils.instrumentation import span
 
+logger = logging.getLogger(__name__)
 
-def research_topic(topic: str, max_results: int = 5) -> Dict:
-    """Run a web search for `topic`, collect hits and produce short excerpts and a summary.
 
-    Returns a dict with keys: query, hits (list of dicts), excerpts (list of strings), summary (str)
-    """
-    if not topic:
-        return {"query": topic, "hits": [], "excerpts": [], "summary": ""}
+def _fetch_targets(hits: List[Dict], max_results: int) -> List[str]:
+    """Links worth downloading: real (non-mock) hits, top FETCH_TOP_N of them."""
+    if not cfg.FETCH_PAGES:
+        return []
+    top_n = cfg.FETCH_TOP_N or max_results
+    return [h.get("link") for h in hits[:min(top_n, max_results)]
+            if h.get("link") and not h.get("mock")]
 
-    # Get search hits from the web_search tool (uses SerpAPI if configured, otherwise mock/simple scrapper)
-    try:
-        hits = web_search.search(topic, num=max_results)
-    except Exception:
-        hits = []
 
-    # Build excerpts list from hits' snippets
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _source(h: Dict, pages: Dict[str, Dict]) -> Tuple[Dict, str]:
+    """(hit as stored in research output, its excerpt: snippet plus fetched page text)."""
+    link = h.get("link") or ""
+    snippet = (h.get("snippet") or "").strip()
+    excerpt = "\n".join(p for p in (snippet, page_text(pages.get(link))) if p)
+    hit = {"title": h.get("title") or link, "link": link, "snippet": snippet,
+           "content_hash": content_hash(excerpt)}
+    return hit, excerpt
+
+
+def _previous_excerpts(previous: Dict) -> Dict[str, str]:
+    """{link: excerpt} of `previous` research, matched by content hash (or snippet prefix)."""
+    excerpts = previous.get("excerpts", [])
+    by_hash = {content_hash(e): e for e in excerpts}
+    out: Dict[str, str] = {}
+    for h in previous.get("hits", []):
+        excerpt = by_hash.get(h.get("content_hash"))
+        if excerpt is None and h.get("snippet"):
+            excerpt = next((e for e in excerpts if e.startswith(h["snippet"])), None)
+        if excerpt and h.get("link"):
+            out[h["link"]] = excerpt
+    return out
+
+
+def _collect_excerpts(topic: str, hits: List[Dict], max_results: int,
+                      pages: Dict[str, Dict] = None, placeholder: bool = True) -> Tuple[List[Dict], List[str]]:
+    # Build excerpts list from hits' snippets, extended with fetched page text
+    pages = pages or {}
     excerpts: List[str] = []
     hits_out: List[Dict] = []
     for h in hits[:max_results]:
-        title = h.get("title") or h.get("link") or ""
-        link = h.get("link") or ""
-        snippet = (h.get("snippet") or "").strip()
-        if snippet:
-            excerpts.append(snippet)
-        hits_out.append({"title": title, "link": link, "snippet": snippet})
+        hit, excerpt = _source(h, pages)
+        if excerpt:
+            excerpts.append(excerpt)
+        hits_out.append(hit)
 
     # If no excerpts found, add a placeholder
-    if not excerpts:
+    if not excerpts and placeholder:
         # Create a small curated mock result set for local/dev runs
         mocked_hits = [
             {
@@ -52,17 +95,16 @@ def research_topic(topic: str, max_results: int = 5) -> Dict:
         ]
         hits_out = mocked_hits[:max_results]
         excerpts = [h["snippet"] for h in hits_out]
+    return hits_out, excerpts
 
-    # Use summarizer (backed by LLM client) to extract key points; fallback to naive summary
-    try:
-        key_points_text = extract_key_points(excerpts)
-        # Build a short summary from the returned bullets (first lines)
-        summary = key_points_text.splitlines()[0] if key_points_text else ""
-    except Exception:
-        # Naive fallback
-        summary = " ".join(excerpts[:2])
-        key_points_text = "- " + summary
 
+def _naive_key_points(excerpts: List[str]) -> Tuple[str, str]:
+    summary = " ".join(excerpts[:2])
+    return summary, "- " + summary
+
+
+def _research_output(topic: str, hits_out: List[Dict], excerpts: List[str],
+                     summary: str, key_points_text: str) -> Dict:
     return {
         "query": topic,
         "hits": hits_out,
@@ -70,3 +112,322 @@ def research_topic(topic: str, max_results: int = 5) -> Dict:
         "summary": summary,
         "key_points": key_points_text,
     }
+
+
+def search_hits(topic: str, max_results: int = 5, use_cache: bool = True) -> List[Dict]:
+    try:
+        return web_search.search(topic, num=max_results, use_cache=use_cache)
+    except Exception:
+        return []
+
+
+def _fetch(hits: List[Dict], max_results: int) -> Dict[str, Dict]:
+    try:
+        return fetch_pages(_fetch_targets(hits, max_results))
+    except Exception:
+        return {}
+
+
+async def _afetch(hits: List[Dict], max_results: int) -> Dict[str, Dict]:
+    try:
+        return await afetch_pages(_fetch_targets(hits, max_results))
+    except Exception:
+        return {}
+
+
+def gather_excerpts(topic: str, max_results: int = 5,
+                    hits: Optional[List[Dict]] = None) -> Tuple[List[Dict], List[str]]:
+    """Search (and page fetch) step of `research_topic` on its own: returns (hits, excerpts)."""
+    if hits is None:
+        hits = search_hits(topic, max_results)
+    return _collect_excerpts(topic, hits, max_results, _fetch(hits, max_results))
+
+
+# -------------------------
+# Reuse of past research
+# -------------------------
+def find_reusable(topic: str, extract_points: bool = True) -> Optional[ResearchMatch]:
+    """The closest fresh past research worth reusing or extending, or None."""
+    index = get_default_index()
+    if index is None or not topic:
+        return None
+    with span("tool.research_index", topic=topic) as sp:
+        match = index.nearest(topic, max_age=cfg.RESEARCH_REUSE_MAX_AGE or None)
+        usable = (match is not None and match.similarity >= cfg.RESEARCH_EXTEND_THRESHOLD
+                  and (not extract_points or bool(match.research.get("key_points"))))
+        sp.set("similarity", match.similarity if match else None)
+        sp.set("matched_topic", match.topic if match else None)
+        sp.set("usable", usable)
+    return match if usable else None
+
+
+def _reused(topic: str, match: ResearchMatch, mode: str, **updates) -> Dict:
+    research = {**match.research, **updates, "query": topic}
+    research["reused_from"] = {"topic": match.topic, "similarity": match.similarity, "mode": mode}
+    logger.info("research reused", extra={"fields": {
+        "topic": topic, "reused_topic": match.topic, "similarity": match.similarity, "mode": mode}})
+    return research
+
+
+def reuse_research(topic: str, match: Optional[ResearchMatch]) -> Optional[Dict]:
+    """`match`'s research relabelled for `topic` when it is similar enough to skip all work."""
+    if match is None or match.similarity < cfg.RESEARCH_REUSE_THRESHOLD:
+        return None
+    return _reused(topic, match, "reuse")
+
+
+def split_new_hits(match: ResearchMatch, hits: List[Dict]) -> Tuple[Optional[List[Dict]], float]:
+    """(hits the past run lacks, share of real hits it already had).
+
+    The new hits are None when the overlap is below RESEARCH_EXTEND_MIN_OVERLAP,
+    i.e. the search disagrees that both topics are about the same thing. Mock
+    hits are shared by every topic and do not count.
+    """
+    past = {h.get("link") for h in match.research.get("hits", []) if h.get("link")}
+    real = [h for h in hits if h.get("link") and not h.get("mock")]
+    overlap = sum(h["link"] in past for h in real) / len(real) if real else 0.0
+    if overlap < cfg.RESEARCH_EXTEND_MIN_OVERLAP:
+        return None, overlap
+    return [h for h in real if h["link"] not in past], overlap
+
+
+def _merge_bullets(old: str, new: str) -> str:
+    lines = [l for l in (old or "").splitlines() if l.strip()]
+    seen = {l.strip().casefold() for l in lines}
+    lines += [l for l in (new or "").splitlines() if l.strip() and l.strip().casefold() not in seen]
+    return "\n".join(lines)
+
+
+def merge_research(topic: str, match: ResearchMatch, hits_out: List[Dict], excerpts: List[str],
+                   key_points_text: str, max_results: int = 5, ranked: Optional[List[str]] = None) -> Dict:
+    """Extend `match`'s research with new hits/excerpts and their key points.
+
+    Hits are deduplicated by link and capped at `max_results`, ordered by
+    `ranked` (the links of the current search), then past before new. Each
+    excerpt stays with its hit, so the excerpts are capped the same way.
+    """
+    past = match.research
+    new_excerpts = {content_hash(e): e for e in excerpts}
+    old_excerpts = _previous_excerpts(past)
+    sources: Dict[str, Tuple[Dict, Optional[str]]] = {}
+    for h in past.get("hits", []):
+        key = h.get("link") or h.get("title") or ""
+        sources.setdefault(key, (h, old_excerpts.get(h.get("link") or "")))
+    for h in hits_out:
+        key = h.get("link") or h.get("title") or ""
+        sources.setdefault(key, (h, new_excerpts.get(h.get("content_hash"))))
+    rank = {link: i for i, link in enumerate(ranked or [])}
+    kept = sorted(sources, key=lambda key: rank.get(key, len(rank)))[:max_results]
+    key_points = _merge_bullets(past.get("key_points", ""), key_points_text)
+    return _reused(topic, match, "extend",
+                   hits=[sources[key][0] for key in kept],
+                   excerpts=[sources[key][1] for key in kept if sources[key][1]],
+                   summary=past.get("summary") or (key_points.splitlines()[0] if key_points else ""),
+                   key_points=key_points)
+
+
+def remember_research(research: Dict) -> None:
+    """Add finished research to the index (reused-as-is research is already there)."""
+    index = get_default_index()
+    if index is None or not research.get("excerpts"):
+        return
+    if (research.get("reused_from") or {}).get("mode") == "reuse":
+        return
+    index.add(research.get("query", ""), research)
+
+
+def extend_research(topic: str, match: ResearchMatch, hits: List[Dict], max_results: int,
+                     extract_points: bool) -> Optional[Dict]:
+    new_hits, _ = split_new_hits(match, hits)
+    if new_hits is None:
+        return None
+    hits_out, excerpts = _collect_excerpts(topic, new_hits, max_results, _fetch(new_hits, max_results),
+                                           placeholder=False)
+    key_points_text = ""
+    if excerpts and extract_points:
+        try:
+            key_points_text = extract_key_points(excerpts, query=topic)
+        except Exception:
+            key_points_text = _naive_key_points(excerpts)[1]
+    return merge_research(topic, match, hits_out, excerpts, key_points_text, max_results,
+                          [h.get("link") for h in hits])
+
+
+async def aextend_research(topic: str, match: ResearchMatch, hits: List[Dict], max_results: int,
+                            extract_points: bool) -> Optional[Dict]:
+    new_hits, _ = split_new_hits(match, hits)
+    if new_hits is None:
+        return None
+    hits_out, excerpts = _collect_excerpts(topic, new_hits, max_results,
+                                           await _afetch(new_hits, max_results), placeholder=False)
+    key_points_text = ""
+    if excerpts and extract_points:
+        try:
+            key_points_text = await aextract_key_points(excerpts, query=topic)
+        except Exception:
+            key_points_text = _naive_key_points(excerpts)[1]
+    return merge_research(topic, match, hits_out, excerpts, key_points_text, max_results,
+                          [h.get("link") for h in hits])
+
+
+# -------------------------
+# Incremental refresh
+# -------------------------
+def _same_content(old: Dict, hit: Dict) -> bool:
+    if "content_hash" in old:
+        return old["content_hash"] == hit["content_hash"]
+    return old.get("snippet", "") == hit["snippet"]
+
+
+def diff_sources(previous: Dict, hits: List[Dict], pages: Dict[str, Dict],
+                 max_results: int) -> Tuple[List[Dict], List[str], Dict[str, List[str]]]:
+    """Compare fresh hits with `previous` research by URL and content hash.
+
+    Returns (hits_out, excerpts, changes) where changes lists the links that are
+    "added", "changed" or "removed", plus "excerpts" of the added and changed
+    sources and "stale", the previous excerpts of the changed and removed ones.
+    Previous research without content hashes is compared by snippet.
+    """
+    known = {h["link"]: h for h in previous.get("hits", []) if h.get("link")}
+    old_excerpts = _previous_excerpts(previous)
+    hits_out: List[Dict] = []
+    excerpts: List[str] = []
+    changes: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "excerpts": [], "stale": []}
+    for h in hits[:max_results]:
+        hit, excerpt = _source(h, pages)
+        hits_out.append(hit)
+        if excerpt:
+            excerpts.append(excerpt)
+        old = known.get(hit["link"])
+        if old is None:
+            kind = "added"
+        elif _same_content(old, hit):
+            continue
+        else:
+            kind = "changed"
+        changes[kind].append(hit["link"] or hit["title"])
+        if excerpt:
+            changes["excerpts"].append(excerpt)
+    current = {h["link"] for h in hits_out}
+    changes["removed"] = [link for link in known if link not in current]
+    changes["stale"] = [old_excerpts[link] for link in changes["changed"] + changes["removed"]
+                        if link in old_excerpts]
+    return hits_out, excerpts, changes
+
+
+def refresh_research(previous: Dict, max_results: int = 5) -> Tuple[Dict, Dict[str, List[str]]]:
+    """Search `previous`'s topic again and update the research with what changed.
+
+    Returns (research, changes) as in `diff_sources`. Previous key points backed
+    only by changed or removed sources are dropped (`stale_filter`). Key points
+    are extracted from the added and changed excerpts only and merged into the
+    remaining ones (changes["key_points"]); with nothing added or changed no LLM
+    call is made. When the search returns nothing the previous research is kept
+    as it is.
+    """
+    topic = previous.get("query", "")
+    # A cached answer would hide exactly the changes the refresh is looking for
+    hits = [h for h in search_hits(topic, max_results, use_cache=False) if h.get("link") and not h.get("mock")]
+    if not hits:
+        logger.warning(f"Refresh search for {topic!r} returned no sources; keeping the previous research")
+        return previous, {"added": [], "changed": [], "removed": [], "excerpts": [], "stale": []}
+    hits_out, excerpts, changes = diff_sources(previous, hits, _fetch(hits, max_results), max_results)
+    key_points = previous.get("key_points", "")
+    if changes["stale"]:
+        is_stale = stale_filter(changes["stale"], excerpts)
+        key_points = "\n".join(line for line in key_points.splitlines() if not is_stale(line))
+    if changes["excerpts"]:
+        try:
+            changes["key_points"] = extract_key_points(changes["excerpts"], query=topic)
+        except Exception:
+            changes["key_points"] = _naive_key_points(changes["excerpts"])[1]
+        key_points = _merge_bullets(key_points, changes["key_points"])
+    research = {**previous, "hits": hits_out, "excerpts": excerpts, "key_points": key_points}
+    logger.info("research refreshed", extra={"fields": {
+        "topic": topic, **{k: len(changes[k]) for k in ("added", "changed", "removed")}}})
+    return research, changes
+
+
+def build_research(topic: str, hits_out: List[Dict], excerpts: List[str], key_points_text: str) -> Dict:
+    """Assemble a `research_topic`-shaped result from already extracted key points."""
+    summary = key_points_text.splitlines()[0] if key_points_text else ""
+    return _research_output(topic, hits_out, excerpts, summary, key_points_text)
+
+
+def research_topic(topic: str, max_results: int = 5, extract_points: bool = True) -> Dict:
+    """Run a web search for `topic`, collect hits and produce short excerpts and a summary.
+
+    Returns a dict with keys: query, hits (list of dicts), excerpts (list of strings), summary (str)
+    and key_points (str). With `extract_points=False` the key-points LLM call is skipped (the
+    single-pass analysis mode extracts them itself) and key_points is empty. Research reused from
+    a similar past topic additionally carries `reused_from` (topic, similarity, mode).
+    """
+    if not topic:
+        return {"query": topic, "hits": [], "excerpts": [], "summary": ""}
+
+    match = find_reusable(topic, extract_points)
+    research = reuse_research(topic, match)
+    if research is not None:
+        return research
+
+    # Get search hits from the web_search tool (uses SerpAPI if configured, otherwise mock/simple scrapper)
+    hits = search_hits(topic, max_results)
+    if match is not None:
+        research = extend_research(topic, match, hits, max_results, extract_points)
+        if research is not None:
+            remember_research(research)
+            return research
+
+    hits_out, excerpts = gather_excerpts(topic, max_results, hits)
+    if not extract_points:
+        return _research_output(topic, hits_out, excerpts, "", "")
+
+    # Use summarizer (backed by LLM client) to extract key points; fallback to naive summary
+    try:
+        key_points_text = extract_key_points(excerpts, query=topic)
+        # Build a short summary from the returned bullets (first lines)
+        summary = key_points_text.splitlines()[0] if key_points_text else ""
+    except Exception:
+        # Naive fallback (not worth remembering for reuse)
+        summary, key_points_text = _naive_key_points(excerpts)
+        return _research_output(topic, hits_out, excerpts, summary, key_points_text)
+
+    research = _research_output(topic, hits_out, excerpts, summary, key_points_text)
+    remember_research(research)
+    return research
+
+
+async def aresearch_topic(topic: str, max_results: int = 5, extract_points: bool = True) -> Dict:
+    """Async variant of `research_topic` using the async search and summarizer tools."""
+    if not topic:
+        return {"query": topic, "hits": [], "excerpts": [], "summary": ""}
+
+    match = find_reusable(topic, extract_points)
+    research = reuse_research(topic, match)
+    if research is not None:
+        return research
+
+    try:
+        hits = await web_search.asearch(topic, num=max_results)
+    except Exception:
+        hits = []
+    if match is not None:
+        research = await aextend_research(topic, match, hits, max_results, extract_points)
+        if research is not None:
+            remember_research(research)
+            return research
+
+    hits_out, excerpts = _collect_excerpts(topic, hits, max_results, await _afetch(hits, max_results))
+    if not extract_points:
+        return _research_output(topic, hits_out, excerpts, "", "")
+
+    try:
+        key_points_text = await aextract_key_points(excerpts, query=topic)
+        summary = key_points_text.splitlines()[0] if key_points_text else ""
+    except Exception:
+        summary, key_points_text = _naive_key_points(excerpts)
+        return _research_output(topic, hits_out, excerpts, summary, key_points_text)
+
+    research = _research_output(topic, hits_out, excerpts, summary, key_points_text)
+    remember_research(research)
+    return research
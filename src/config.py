@@ -4,6 +4,31 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _routes_env(name: str) -> dict:
+    """Parse "task=model,task=model" into {task: model}."""
+    routes = {}
+    for item in os.getenv(name, "").split(","):
+        task, sep, model = item.partition("=")
+        if sep and task.strip() and model.strip():
+            routes[task.strip()] = model.strip()
+    return routes
+
+
 class Config:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
@@ -14,5 +39,121 @@ class Config:
         MAX_SEARCH_RESULTS = 5
     OUTPUT_DIR = os.getenv("OUTPUT_DIR", "outputs")
 
-cfg = Config()
+    # On-disk LLM response cache (disabled when the path is empty)
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+    LLM_CACHE_TTL = _int_env("LLM_CACHE_TTL", 24 * 3600)
+    LLM_CACHE_MAX_ENTRIES = _int_env("LLM_CACHE_MAX_ENTRIES", 10000)
+
+    # LLM rate limits (0 = unlimited), retries on 429/5xx and mock fallback policy:
+    # "no_key" (mock only without an API key), "always" or "never"
+    LLM_RPM = _float_env("LLM_RPM", 0)
+    LLM_TPM = _float_env("LLM_TPM", 0)
+    LLM_RETRIES = _int_env("LLM_RETRIES", 3)
+    LLM_BACKOFF = _float_env("LLM_BACKOFF", 1.0)
+    LLM_BACKOFF_MAX = _float_env("LLM_BACKOFF_MAX", 30.0)
+    LLM_MOCK_FALLBACK = os.getenv("LLM_MOCK_FALLBACK", "no_key")
+    # Alternative Gemini endpoint (e.g. benchmarks/fake_llm_server.py); empty = Google's
+    GENAI_BASE_URL = os.getenv("GENAI_BASE_URL", "")
+
+    # Per-task model routing, "task=model,..." (tasks: key_points, analysis);
+    # tasks without a route use DEFAULT_MODEL
+    MODEL_ROUTES = _routes_env("MODEL_ROUTES")
+    # Hedged requests: once a model has LLM_HEDGE_MIN_SAMPLES latencies, a call still
+    # unanswered after its LLM_HEDGE_QUANTILE latency (at least LLM_HEDGE_MIN_DELAY s)
+    # sends a backup request and the first answer wins
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "0").lower() not in ("0", "false", "no", "")
+    LLM_HEDGE_QUANTILE = _float_env("LLM_HEDGE_QUANTILE", 0.95)
+    LLM_HEDGE_MIN_SAMPLES = _int_env("LLM_HEDGE_MIN_SAMPLES", 20)
+    LLM_HEDGE_MIN_DELAY = _float_env("LLM_HEDGE_MIN_DELAY", 0.25)
+    LLM_HEDGE_WINDOW = _int_env("LLM_HEDGE_WINDOW", 200)
+    # Structured (JSON) answers: request the model's native JSON mode with a response
+    # schema, and re-prompt once with the validation errors when an answer is invalid
+    LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1").lower() not in ("0", "false", "no", "")
+    LLM_JSON_REPAIR = os.getenv("LLM_JSON_REPAIR", "1").lower() not in ("0", "false", "no", "")
+
+    # Analysis stage: "reuse" (default), "two_pass" or "single_pass"
+    ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "reuse")
 
+    # In-process search result cache (0 entries disables it)
+    SEARCH_CACHE_TTL = _int_env("SEARCH_CACHE_TTL", 900)
+    SEARCH_CACHE_MAX_ENTRIES = _int_env("SEARCH_CACHE_MAX_ENTRIES", 1024)
+
+    # Shared HTTP client pools (src/utils/http_client.py)
+    HTTP_POOL_SIZE = _int_env("HTTP_POOL_SIZE", 20)
+    HTTP_PER_HOST_LIMIT = _int_env("HTTP_PER_HOST_LIMIT", 8)
+    HTTP_RETRIES = _int_env("HTTP_RETRIES", 2)
+    HTTP_BACKOFF = _float_env("HTTP_BACKOFF", 0.5)
+    HTTP_TIMEOUT = _float_env("HTTP_TIMEOUT", 10.0)
+
+    # Full-page fetch behind research_topic (FETCH_TOP_N=0 means all max_results hits)
+    FETCH_PAGES = os.getenv("FETCH_PAGES", "1").lower() not in ("0", "false", "no", "")
+    FETCH_TOP_N = _int_env("FETCH_TOP_N", 0)
+    FETCH_CONCURRENCY = _int_env("FETCH_CONCURRENCY", 8)
+    FETCH_MAX_BYTES = _int_env("FETCH_MAX_BYTES", 512 * 1024)
+    FETCH_MAX_CHARS = _int_env("FETCH_MAX_CHARS", 4000)
+    FETCH_TIMEOUT = _float_env("FETCH_TIMEOUT", 6.0)
+    FETCH_DEADLINE = _float_env("FETCH_DEADLINE", 8.0)
+
+    # Prompt context packing: max estimated tokens of source text per prompt
+    CONTEXT_TOKEN_BUDGET = _int_env("CONTEXT_TOKEN_BUDGET", 3000)
+    CONTEXT_CHUNK_TOKENS = _int_env("CONTEXT_CHUNK_TOKENS", 200)
+
+    # Key-point summarizer: "auto" (map-reduce only above one prompt's budget), "single", "map_reduce"
+    SUMMARIZER_MODE = os.getenv("SUMMARIZER_MODE", "auto")
+    SUMMARIZER_TOTAL_BUDGET = _int_env("SUMMARIZER_TOTAL_BUDGET", 24000)
+    SUMMARIZER_FANOUT = _int_env("SUMMARIZER_FANOUT", 4)
+    SUMMARIZER_MAX_DEPTH = _int_env("SUMMARIZER_MAX_DEPTH", 3)
+    SUMMARIZER_MAP_CONCURRENCY = _int_env("SUMMARIZER_MAP_CONCURRENCY", 4)
+
+    # Default report formats (comma-separated; see src/tools/formats.py)
+    OUTPUT_FORMATS = [f.strip() for f in os.getenv("OUTPUT_FORMATS", "docx,pdf").split(",") if f.strip()]
+
+    # Figures embedded in reports must live under this directory (empty disables figures)
+    FIGURE_DIR = os.getenv("FIGURE_DIR", os.path.join(OUTPUT_DIR, "figures"))
+
+    # TrueType fonts (comma-separated .ttf paths, tried in order) for PDF text outside
+    # Windows-1252, e.g. Amharic or CJK; empty = common system fonts found on disk
+    PDF_FONTS = [p.strip() for p in os.getenv("PDF_FONTS", "").split(",") if p.strip()]
+
+    # Report rendering: "thread" (default), "serial" or "process" (spawned workers; these re-import
+    # __main__, so scripts must guard pipeline calls with `if __name__ == "__main__":`);
+    # 0 workers = one per heavy (pool-rendered) format
+    RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread")
+    RENDER_WORKERS = _int_env("RENDER_WORKERS", 0)
+
+    # Stage checkpoints for runs started with a run_id (empty disables them)
+    CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", os.path.join(OUTPUT_DIR, "checkpoints.sqlite"))
+
+    # Reuse of past research for similar topics (empty path disables the index). A fresh
+    # enough match (RESEARCH_REUSE_MAX_AGE seconds) at or above RESEARCH_REUSE_THRESHOLD
+    # cosine similarity is reused as is; above RESEARCH_EXTEND_THRESHOLD it is extended
+    # with key points from the new sources only, provided at least
+    # RESEARCH_EXTEND_MIN_OVERLAP of the new search hits were already known
+    RESEARCH_INDEX_PATH = os.getenv("RESEARCH_INDEX_PATH", "")
+    RESEARCH_INDEX_MAX_ENTRIES = _int_env("RESEARCH_INDEX_MAX_ENTRIES", 2000)
+    RESEARCH_REUSE_THRESHOLD = _float_env("RESEARCH_REUSE_THRESHOLD", 0.88)
+    RESEARCH_EXTEND_THRESHOLD = _float_env("RESEARCH_EXTEND_THRESHOLD", 0.5)
+    RESEARCH_EXTEND_MIN_OVERLAP = _float_env("RESEARCH_EXTEND_MIN_OVERLAP", 0.3)
+    RESEARCH_REUSE_MAX_AGE = _int_env("RESEARCH_REUSE_MAX_AGE", 24 * 3600)
+
+    # Refresh: drop key points / report lines whose words are at least this share backed by a
+    # removed or changed source and by no current one (0 disables pruning)
+    REFRESH_PRUNE_OVERLAP = _float_env("REFRESH_PRUNE_OVERLAP", 0.6)
+
+    # Service mode: the UI enqueues jobs and worker processes run them ("inline" runs in
+    # the UI process). JOB_QUEUE_URL is a redis:// URL or a SQLite path for the local stand-in
+    SERVICE_MODE = os.getenv("SERVICE_MODE", "inline")
+    JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", os.path.join(OUTPUT_DIR, "jobs.sqlite"))
+    JOB_QUEUE_MAX_DEPTH = _int_env("JOB_QUEUE_MAX_DEPTH", 100)
+    JOB_WORKERS = _int_env("JOB_WORKERS", 2)
+    JOB_POLL_INTERVAL = _float_env("JOB_POLL_INTERVAL", 1.0)
+    JOB_RESULT_TTL = _int_env("JOB_RESULT_TTL", 7 * 24 * 3600)
+    # Running jobs without a heartbeat for this long are requeued (workers beat every third of it)
+    JOB_VISIBILITY_TIMEOUT = _float_env("JOB_VISIBILITY_TIMEOUT", 300.0)
+    JOB_MAX_ATTEMPTS = _int_env("JOB_MAX_ATTEMPTS", 3)
+
+    # Logging: level name and "json" (one compact line per event) or "text"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+cfg = Config()
@@ -0,0 +1,169 @@
+"""Batch report generation over a bounded worker pool.
+
+`run_batch` deduplicates the topic list, runs each topic through the workflow
+on a thread pool and streams one JSON line per topic as
+soon as it finishes. Search, LLM and render calls can be limited independently
+of the pool size, and the batch ends with a throughput summary.
+
+CLI usage (topics one per line; "-" or no file reads stdin):
+
+    python -m src.orchestrator.batch topics.txt --concurrency 8 --llm-concurrency 4
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
+
+from src.agents.analysis_agent import ANALYSIS_MODES
+from src.orchestrator.langgraph_workflow import run_workflow_state
+from src.utils.instrumentation import stage_durations
+from src.utils.llm_client import get_llm_stats
+from src.utils.structured_output import get_structured_output_stats
+from src.utils.logging_setup import configure_logging
+from src.utils.stage_limits import STAGES, get_stage_limits, set_stage_limit
+
+
+def dedupe_topics(topics: Iterable[str]) -> List[str]:
+    """Strip blanks and drop duplicates (case and whitespace insensitive), keeping order."""
+    seen = set()
+    unique = []
+    for topic in topics:
+        topic = " ".join(str(topic).split())
+        key = topic.casefold()
+        if topic and key not in seen:
+            seen.add(key)
+            unique.append(topic)
+    return unique
+
+
+def percentile(values: List[float], pct: float) -> float:
+    # Nearest-rank percentile; good enough for latency summaries
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _run_topic(topic: str, max_results: int, analysis_mode: Optional[str]) -> Dict:
+    started = time.perf_counter()
+    state = run_workflow_state(topic, max_results, analysis_mode)
+    # Per-stage wall time from the trace: node.* plus tool.search, llm.generate, render.*
+    timings = stage_durations(state.get("trace", []))
+    timings["total"] = round(time.perf_counter() - started, 4)
+    output_paths = state.get("output_paths") or {"error": "no output"}
+    return {
+        "topic": topic,
+        "output_paths": output_paths,
+        "error": output_paths.get("error"),
+        "timings": timings,
+        "messages": state.get("_messages", [])[1:],
+    }
+
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    stages: Dict[str, List[float]] = {}
+    for r in results:
+        for name, secs in r.get("timings", {}).items():
+            stages.setdefault(name, []).append(secs)
+    failed = sum(1 for r in results if r.get("error"))
+    return {
+        "reports": len(results),
+        "failed": failed,
+        "elapsed_s": round(elapsed, 3),
+        "reports_per_min": round(len(results) / elapsed * 60.0, 2) if elapsed > 0 else 0.0,
+        "stages": {
+            name: {"p50_s": round(percentile(v, 50), 4), "p95_s": round(percentile(v, 95), 4)}
+            for name, v in stages.items()
+        },
+        "llm_rate_limit": get_llm_stats(),
+        "structured_output": get_structured_output_stats(),
+    }
+
+
+def run_batch(topics: Iterable[str], concurrency: int = 4, max_results: int = 5,
+              search_concurrency: Optional[int] = None,
+              llm_concurrency: Optional[int] = None,
+              render_concurrency: Optional[int] = None,
+              analysis_mode: Optional[str] = None,
+              out: Optional[TextIO] = None,
+              on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Generate reports for `topics` with at most `concurrency` in flight.
+
+    Each finished topic is written to `out` as a JSON line (and passed to
+    `on_result`) in completion order. Returns the throughput summary.
+    """
+    unique = dedupe_topics(topics)
+    previous_limits = get_stage_limits()
+    set_stage_limit("search", search_concurrency)
+    set_stage_limit("llm", llm_concurrency)
+    set_stage_limit("render", render_concurrency)
+
+    results: List[Dict] = []
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = {pool.submit(_run_topic, t, max_results, analysis_mode): t for t in unique}
+            for fut in as_completed(futures):
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    result = {"topic": futures[fut], "output_paths": {}, "error": str(e), "timings": {}}
+                results.append(result)
+                if out is not None:
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                if on_result is not None:
+                    on_result(result)
+    finally:
+        for stage in STAGES:
+            set_stage_limit(stage, previous_limits.get(stage))
+
+    return summarize(results, time.perf_counter() - started)
+
+
+def _read_topics(path: Optional[str]) -> List[str]:
+    if not path or path == "-":
+        return sys.stdin.read().splitlines()
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate research reports for a list of topics.")
+    parser.add_argument("topics", nargs="?", default="-",
+                        help="file with one topic per line ('-' for stdin)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--max-results", type=int, default=5)
+    parser.add_argument("--search-concurrency", type=int, default=None)
+    parser.add_argument("--llm-concurrency", type=int, default=None)
+    parser.add_argument("--render-concurrency", type=int, default=None)
+    parser.add_argument("--analysis-mode", choices=ANALYSIS_MODES, default=None)
+    parser.add_argument("-o", "--output", default=None,
+                        help="write JSONL results here instead of stdout")
+    parser.add_argument("--log-level", default=None, help="override LOG_LEVEL")
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level)
+
+    topics = _read_topics(args.topics)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_batch(
+            topics, concurrency=args.concurrency, max_results=args.max_results,
+            search_concurrency=args.search_concurrency,
+            llm_concurrency=args.llm_concurrency,
+            render_concurrency=args.render_concurrency,
+            analysis_mode=args.analysis_mode,
+            out=out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    sys.stderr.write(json.dumps({"summary": summary}) + "\n")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""On-disk checkpoints of workflow stage outputs, keyed by (run_id, stage).
+
+Every successfully finished stage of a run that has a run ID stores its output
+here (research -> "research", analysis -> "structured", write -> "output_paths",
+plus the run's inputs under "input"). Rerunning with the same run ID loads them
+and only executes the stages that are missing, and a finished report can be
+re-rendered into other formats without any search or LLM work.
+
+Checkpoints live in one SQLite file (WAL mode) so several worker processes can
+share it, like the LLM cache.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from src.config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+class CheckpointStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork; reopen in each process.
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " run_id TEXT NOT NULL, stage TEXT NOT NULL, value TEXT NOT NULL,"
+                " updated REAL NOT NULL, PRIMARY KEY (run_id, stage))"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def save(self, run_id: str, stage: str, value) -> None:
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (run_id, stage, value, updated)"
+                    " VALUES (?, ?, ?, ?)", (run_id, stage, payload, time.time()))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Checkpoint write failed for {run_id}/{stage}: {e}")
+
+    def load(self, run_id: str) -> Dict[str, object]:
+        """All stored stages of `run_id` as {stage: value} (empty when unknown)."""
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    "SELECT stage, value FROM checkpoints WHERE run_id = ?", (run_id,)).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Checkpoint read failed for {run_id}: {e}")
+                return {}
+        return {stage: json.loads(value) for stage, value in rows}
+
+    def delete(self, run_id: str, stage: Optional[str] = None) -> None:
+        with self._lock:
+            conn = self._connect()
+            if stage is None:
+                conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            else:
+                conn.execute("DELETE FROM checkpoints WHERE run_id = ? AND stage = ?", (run_id, stage))
+            conn.commit()
+
+    def runs(self, limit: int = 100) -> List[Dict]:
+        """Most recently updated runs: [{"run_id", "stages", "updated"}]."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT run_id, GROUP_CONCAT(stage), MAX(updated) FROM checkpoints"
+                " GROUP BY run_id ORDER BY MAX(updated) DESC LIMIT ?", (limit,)).fetchall()
+        return [{"run_id": r, "stages": s.split(","), "updated": u} for r, s, u in rows]
+
+
+# Singleton accessor
+_default_store: Optional[CheckpointStore] = None
+
+
+def get_default_store() -> Optional[CheckpointStore]:
+    """Return the shared store, or None when CHECKPOINT_PATH is empty."""
+    global _default_store
+    if _default_store is None and cfg.CHECKPOINT_PATH:
+        _default_store = CheckpointStore(cfg.CHECKPOINT_PATH)
+    return _default_store
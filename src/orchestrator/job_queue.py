@@ -0,0 +1,358 @@
+"""Report job queue shared by the UI (producer) and worker processes (consumers).
+
+Jobs are stored through a small subset of Redis commands (RPUSH / BLMOVE /
+LREM / LRANGE / LLEN on the pending and processing lists, HSET / HGETALL /
+EXPIRE on one hash per job), so the same `JobQueue` runs on a real Redis server
+(JOB_QUEUE_URL=redis://...) or on `SQLiteRedis`, a local single-file stand-in
+that several processes can share.
+
+A job is a hash `<name>:job:<id>` with `status` (queued, running, done, failed),
+the JSON `payload`, a free-form `stage` progress line, and `result` / `error`
+once finished. `submit` refuses new jobs with `QueueFullError` once
+JOB_QUEUE_MAX_DEPTH jobs are pending, so a burst of requests gets an immediate
+"busy" answer instead of an ever-growing backlog. The job ID is also the
+workflow run ID, so a requeued job resumes from its checkpoints.
+
+`claim` moves a job ID from the pending list to the processing list in one
+atomic step (BLMOVE), so a worker that dies right after claiming cannot lose
+it. Running workers refresh the job's `heartbeat`; `requeue_stale` puts jobs
+whose heartbeat is older than JOB_VISIBILITY_TIMEOUT back on the pending list,
+and fails them after JOB_MAX_ATTEMPTS claims.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from src.config import cfg
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+# How often SQLiteRedis.blpop / blmove re-check an empty list
+_POLL_INTERVAL = 0.1
+
+
+class QueueFullError(RuntimeError):
+    """The pending list already holds JOB_QUEUE_MAX_DEPTH jobs."""
+
+
+class SQLiteRedis:
+    """Local stand-in for the Redis commands `JobQueue` uses (values are str)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork; reopen in each process.
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS lists ("
+                         " id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, value TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS lists_key ON lists(key, id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS hashes ("
+                         " key TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL,"
+                         " PRIMARY KEY (key, field))")
+            conn.execute("CREATE TABLE IF NOT EXISTS expiry (key TEXT PRIMARY KEY, at REAL NOT NULL)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _purge(self, conn: sqlite3.Connection) -> None:
+        now = time.time()
+        expired = [k for (k,) in conn.execute("SELECT key FROM expiry WHERE at <= ?", (now,))]
+        for key in expired:
+            conn.execute("DELETE FROM hashes WHERE key = ?", (key,))
+            conn.execute("DELETE FROM lists WHERE key = ?", (key,))
+            conn.execute("DELETE FROM expiry WHERE key = ?", (key,))
+
+    def rpush(self, key: str, *values: str) -> int:
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT INTO lists (key, value) VALUES (?, ?)", [(key, v) for v in values])
+            return conn.execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    def lpop(self, key: str) -> Optional[str]:
+        return self.lmove(key, None)
+
+    def lmove(self, source: str, destination: Optional[str], src: str = "LEFT",
+              dest: str = "RIGHT") -> Optional[str]:
+        """Pop the head of `source` and append it to `destination` in one transaction.
+
+        Only LEFT -> RIGHT is supported; a None `destination` just pops.
+        """
+        if (src, dest) != ("LEFT", "RIGHT"):
+            raise ValueError("SQLiteRedis only supports LMOVE LEFT RIGHT")
+        with self._lock:
+            conn = self._connect()
+            # IMMEDIATE takes the write lock up front so two processes never pop the same row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT id, value FROM lists WHERE key = ? ORDER BY id LIMIT 1",
+                                   (source,)).fetchone()
+                if row is not None:
+                    conn.execute("DELETE FROM lists WHERE id = ?", (row[0],))
+                    if destination is not None:
+                        conn.execute("INSERT INTO lists (key, value) VALUES (?, ?)", (destination, row[1]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return row[1] if row else None
+
+    def blmove(self, first_list: str, second_list: str, timeout: float, src: str = "LEFT",
+               dest: str = "RIGHT") -> Optional[str]:
+        """Blocking `lmove`; None after `timeout` s (0 = forever)."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            value = self.lmove(first_list, second_list, src, dest)
+            if value is not None:
+                return value
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(_POLL_INTERVAL)
+
+    def blpop(self, keys, timeout: float = 0):
+        """Pop from the first non-empty list in `keys`; (key, value) or None after `timeout` s (0 = forever)."""
+        if isinstance(keys, str):
+            keys = [keys]
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            for key in keys:
+                value = self.lpop(key)
+                if value is not None:
+                    return key, value
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(_POLL_INTERVAL)
+
+    def llen(self, key: str) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        with self._lock:
+            values = [v for (v,) in self._connect().execute(
+                "SELECT value FROM lists WHERE key = ? ORDER BY id", (key,))]
+        return values[start:None if end == -1 else end + 1]
+
+    def lrem(self, key: str, count: int, value: str) -> int:
+        """Remove up to `count` occurrences of `value` from the head (0 = all); returns how many."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [i for (i,) in conn.execute(
+                    "SELECT id FROM lists WHERE key = ? AND value = ? ORDER BY id", (key, value))]
+                if count > 0:
+                    ids = ids[:count]
+                conn.executemany("DELETE FROM lists WHERE id = ?", [(i,) for i in ids])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(ids)
+
+    def hset(self, key: str, field: Optional[str] = None, value: Optional[str] = None,
+             mapping: Optional[Dict[str, str]] = None) -> int:
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        with self._lock:
+            self._connect().executemany(
+                "INSERT OR REPLACE INTO hashes (key, field, value) VALUES (?, ?, ?)",
+                [(key, f, str(v)) for f, v in items.items()])
+        return len(items)
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        with self._lock:
+            conn = self._connect()
+            self._purge(conn)
+            return dict(conn.execute("SELECT field, value FROM hashes WHERE key = ?", (key,)).fetchall())
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO expiry (key, at) VALUES (?, ?)",
+                                    (key, time.time() + seconds))
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            conn = self._connect()
+            for key in keys:
+                conn.execute("DELETE FROM hashes WHERE key = ?", (key,))
+                conn.execute("DELETE FROM lists WHERE key = ?", (key,))
+                conn.execute("DELETE FROM expiry WHERE key = ?", (key,))
+        return len(keys)
+
+
+def connect_backend(url: str):
+    """A Redis client for redis:// URLs, otherwise a `SQLiteRedis` at the given path."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("JOB_QUEUE_URL points at Redis but the redis package is not installed") from e
+        return redis.Redis.from_url(url, decode_responses=True)
+    return SQLiteRedis(url)
+
+
+class JobQueue:
+    def __init__(self, backend, name: str = "reports", max_depth: Optional[int] = None):
+        self.backend = backend
+        self.name = name
+        self.max_depth = cfg.JOB_QUEUE_MAX_DEPTH if max_depth is None else max_depth
+
+    @property
+    def pending_key(self) -> str:
+        return f"{self.name}:pending"
+
+    @property
+    def processing_key(self) -> str:
+        return f"{self.name}:processing"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.name}:job:{job_id}"
+
+    def depth(self) -> int:
+        return int(self.backend.llen(self.pending_key))
+
+    def submit(self, topic: str, max_results: int = 5, analysis_mode: Optional[str] = None,
+               formats: Optional[List[str]] = None) -> str:
+        """Enqueue a report job and return its ID; raises `QueueFullError` under backpressure.
+
+        The depth check is not atomic with the push, so concurrent producers may
+        overshoot the limit by a few jobs.
+        """
+        depth = self.depth()
+        if self.max_depth and depth >= self.max_depth:
+            raise QueueFullError(f"Job queue is full ({depth} pending, limit {self.max_depth})")
+        job_id = uuid.uuid4().hex
+        payload = {"topic": topic, "max_results": max_results,
+                   "analysis_mode": analysis_mode, "formats": formats}
+        self.backend.hset(self._job_key(job_id), mapping={
+            "status": "queued", "stage": "queued", "payload": json.dumps(payload),
+            "created": str(time.time())})
+        self.backend.rpush(self.pending_key, job_id)
+        logger.info(f"Queued job {job_id} for topic={topic!r} (depth {depth + 1})")
+        return job_id
+
+    def claim(self, timeout: float = 1.0) -> Optional[Dict]:
+        """Move the next job to the processing list and mark it running.
+
+        Returns None when nothing arrived within `timeout` s. The job stays on
+        the processing list until `finish` / `fail`, so `requeue_stale` can
+        recover it if this worker dies.
+        """
+        job_id = self.backend.blmove(self.pending_key, self.processing_key, timeout, "LEFT", "RIGHT")
+        if job_id is None:
+            return None
+        job = self.status(job_id)
+        if job is None:
+            logger.warning(f"Dropping job {job_id}: its record has expired")
+            self.backend.lrem(self.processing_key, 1, job_id)
+            return None
+        now = str(time.time())
+        self.backend.hset(self._job_key(job_id), mapping={
+            "status": "running", "stage": "started", "started": now, "heartbeat": now,
+            "worker": str(os.getpid()), "attempts": str(int(job.get("attempts") or 0) + 1)})
+        return {"job_id": job_id, **job["payload"]}
+
+    def heartbeat(self, job_id: str) -> None:
+        """Mark a running job as alive; called periodically by its worker."""
+        self.backend.hset(self._job_key(job_id), "heartbeat", str(time.time()))
+
+    def progress(self, job_id: str, stage: str) -> None:
+        self.backend.hset(self._job_key(job_id), mapping={"stage": stage, "heartbeat": str(time.time())})
+
+    def _close(self, job_id: str, fields: Dict[str, str]) -> None:
+        key = self._job_key(job_id)
+        self.backend.hset(key, mapping={**fields, "finished": str(time.time())})
+        self.backend.lrem(self.processing_key, 1, job_id)
+        if cfg.JOB_RESULT_TTL > 0:
+            self.backend.expire(key, cfg.JOB_RESULT_TTL)
+
+    def finish(self, job_id: str, result: Dict) -> None:
+        self._close(job_id, {"status": "done", "stage": "done", "result": json.dumps(result, default=str)})
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._close(job_id, {"status": "failed", "stage": "failed", "error": error})
+
+    def requeue(self, job_id: str) -> None:
+        """Put a failed or interrupted job back on the queue (it resumes from its checkpoints)."""
+        self.backend.lrem(self.processing_key, 1, job_id)
+        self._enqueue_again(job_id)
+
+    def _enqueue_again(self, job_id: str) -> None:
+        self.backend.hset(self._job_key(job_id), mapping={"status": "queued", "stage": "queued", "heartbeat": ""})
+        self.backend.rpush(self.pending_key, job_id)
+
+    def requeue_stale(self, timeout: Optional[float] = None) -> List[str]:
+        """Requeue processing jobs whose heartbeat is older than `timeout` s (JOB_VISIBILITY_TIMEOUT).
+
+        Jobs already claimed JOB_MAX_ATTEMPTS times are failed instead, so a job
+        that keeps killing its worker does not loop forever. Safe to run from
+        every worker: a job is only requeued by the reaper whose LREM removed it.
+        Returns the requeued job IDs.
+        """
+        timeout = cfg.JOB_VISIBILITY_TIMEOUT if timeout is None else timeout
+        now = time.time()
+        requeued: List[str] = []
+        for job_id in self.backend.lrange(self.processing_key, 0, -1):
+            job = self.status(job_id)
+            if job is None or job.get("status") in ("done", "failed"):
+                # Expired, or its worker stopped between closing the job and the LREM
+                self.backend.lrem(self.processing_key, 1, job_id)
+                continue
+            if not job.get("heartbeat"):
+                # Claimed but not marked running yet: start its clock now
+                self.heartbeat(job_id)
+                continue
+            seen = float(job["heartbeat"])
+            if now - seen < timeout:
+                continue
+            if not self.backend.lrem(self.processing_key, 1, job_id):
+                continue  # another reaper (or the worker itself) got there first
+            attempts = int(job.get("attempts") or 0)
+            if cfg.JOB_MAX_ATTEMPTS and attempts >= cfg.JOB_MAX_ATTEMPTS:
+                logger.warning(f"Job {job_id} stalled after {attempts} attempt(s); failing it")
+                self.fail(job_id, f"worker stopped responding ({attempts} attempt(s))")
+                continue
+            logger.warning(f"Requeuing job {job_id}: no heartbeat for {now - seen:.0f}s")
+            self._enqueue_again(job_id)
+            requeued.append(job_id)
+        return requeued
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """The job record with `payload` / `result` decoded, or None for unknown IDs."""
+        raw = self.backend.hgetall(self._job_key(job_id))
+        if not raw:
+            return None
+        job = dict(raw, job_id=job_id)
+        job["payload"] = json.loads(raw.get("payload") or "{}")
+        if "result" in raw:
+            job["result"] = json.loads(raw["result"])
+        return job
+
+
+# Singleton accessor
+_default_queue: Optional[JobQueue] = None
+
+
+def get_default_queue() -> JobQueue:
+    """Queue on JOB_QUEUE_URL (a redis:// URL or a SQLite path, default OUTPUT_DIR/jobs.sqlite)."""
+    global _default_queue
+    if _default_queue is None:
+        _default_queue = JobQueue(connect_backend(cfg.JOB_QUEUE_URL))
+    return _default_queue
@@ -3,128 +3,314 @@
 
 This module prefers LangGraph if available; if not, it falls back to a
 simple sequential runner that invokes the research -> analysis -> write nodes.
+LangGraph is imported and the graphs are compiled on first use (`get_graph`),
+so importing this module stays cheap.
 """
-try:
-    from langgraph.graph import StateGraph, MessagesState, START, END  # type: ignore
-    HAS_LANGGRAPH = True
-except Exception:
-    StateGraph = None
-    MessagesState = dict
-    START = "__start__"
-    END = "__end__"
-    HAS_LANGGRAPH = False
-
-from src.agents.research_agent import research_topic
-from src.agents.analysis_agent import analyze_research
-from src.agents.report_writer_agent import write_report
+
+from src.agents.research_agent import (research_topic, aresearch_topic, gather_excerpts, build_research,
+                                       extend_research, find_reusable, refresh_research, remember_research,
+                                       reuse_research, search_hits)
+from src.agents.analysis_agent import analyze_research, aanalyze_research, stream_analysis, update_report
+from src.agents.report_writer_agent import write_report, awrite_report, iter_write_report
+from src.orchestrator.checkpoints import get_default_store, new_run_id
+from src.tools.formats import resolve_formats
+from src.tools.summarizer import stream_key_points
+from src.config import cfg
+from src.utils import http_client
+from src.utils.instrumentation import collect_trace, span
+from src.utils.logging_setup import LazyPFormat
+from collections import Counter
 from pathlib import Path
-import pprint
+from typing import Dict, Iterator, List, Optional, TypedDict
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowState(TypedDict, total=False):
+    """Graph state schema.
+
+    Declaring every key keeps LangGraph from dropping our custom fields (the
+    previous `MessagesState` schema only guaranteed `messages`).
+    """
+    topic: str
+    max_results: int
+    analysis_mode: Optional[str]
+    formats: Optional[List[str]]
+    run_id: Optional[str]
+    _messages: List[str]
+    research: dict
+    structured: dict
+    output_paths: dict
+    trace: List[dict]
+
+
+# -------------------------
+# Fallback accounting
+# -------------------------
+_fallback_counts: Counter = Counter()
+_fallback_lock = threading.Lock()
+
+
+def _record_fallback(kind: str) -> None:
+    with _fallback_lock:
+        _fallback_counts[kind] += 1
+    logger.warning("fallback path taken", extra={"fields": {"fallback": kind}})
+
+
+def get_fallback_stats() -> Dict[str, int]:
+    """How often each fallback path fired in this process (graph errors, resumed stages, node errors)."""
+    with _fallback_lock:
+        return dict(_fallback_counts)
 
 
 # -------------------------
 # Node functions
 # -------------------------
-def node_research(state):
-    # state can be dict in latest LangGraph
-    topic = state.get("topic", "")
-    try:
-        research = research_topic(
-            topic, max_results=state.get("max_results", 5))
-        if not research:
-            research = {"query": topic, "hits": [], "excerpts": [
-                "No excerpts found."], "summary": "No summary."}
-    except Exception as e:
-        research = {"query": topic, "hits": [], "excerpts": [
-            "Error occurred."], "summary": str(e)}
-        if isinstance(state, dict):
-            state.setdefault("_messages", []).append(
-                f"Research node error: {e}")
-        else:
-            state.add_message(f"Research node error: {e}")
+def _add_message(state, msg: str):
+    if isinstance(state, dict):
+        state.setdefault("_messages", []).append(msg)
+    else:
+        state.add_message(msg)
 
+
+def _set(state, key: str, value):
     if isinstance(state, dict):
-        state["research"] = research
+        state[key] = value
+    else:
+        state.set(key, value)
+
+
+def _checkpoint(state, key: str, value) -> None:
+    """Persist a finished stage's output when the run has a run ID."""
+    run_id = state.get("run_id") if isinstance(state, dict) else None
+    store = get_default_store() if run_id else None
+    if store is not None:
+        store.save(run_id, key, value)
+
+
+def _finish_research(state, topic: str, research=None, error: Exception = None):
+    if error is not None:
+        research = {"query": topic, "hits": [], "excerpts": [
+            "Error occurred."], "summary": str(error)}
+        _add_message(state, f"Research node error: {error}")
+        _record_fallback("research_error")
     else:
-        state.set("research", research)
+        if not research:
+            research = {"query": topic, "hits": [], "excerpts": [
+                "No excerpts found."], "summary": "No summary."}
+        _checkpoint(state, "research", research)
+    _set(state, "research", research)
 
-    print("\n[DEBUG] Research Node Output:")
-    pprint.pprint(research)
+    logger.debug("Research Node Output:\n%s", LazyPFormat(research))
     return state
 
 
-def node_analysis(state):
-    research = state.get(
-        "research", {"excerpts": ["No excerpts found."], "summary": ""})
-    try:
-        structured = analyze_research(research)
+def _finish_analysis(state, research: dict, structured=None, error: Exception = None):
+    if error is not None:
+        structured = {
+            "title": research.get("query", "Untitled Report"),
+            "summary": research.get("summary", ""),
+            "sections": [{"heading": "Error", "content": str(error)}]
+        }
+        _add_message(state, f"Analysis node error: {error}")
+        _record_fallback("analysis_error")
+    else:
         if not structured:
             structured = {
                 "title": research.get("query", "Untitled Report"),
                 "summary": research.get("summary", ""),
                 "sections": [{"heading": "Key Points", "content": research.get("excerpts", [])}]
             }
-    except Exception as e:
-        structured = {
-            "title": research.get("query", "Untitled Report"),
-            "summary": research.get("summary", ""),
-            "sections": [{"heading": "Error", "content": str(e)}]
-        }
-        if isinstance(state, dict):
-            state.setdefault("_messages", []).append(
-                f"Analysis node error: {e}")
-        else:
-            state.add_message(f"Analysis node error: {e}")
+        _checkpoint(state, "structured", structured)
+    _set(state, "structured", structured)
 
-    if isinstance(state, dict):
-        state["structured"] = structured
+    logger.debug("Analysis Node Output:\n%s", LazyPFormat(structured))
+    return state
+
+
+def _finish_write(state, output=None, error: Exception = None):
+    if error is not None:
+        output = {"error": str(error)}
+        _add_message(state, f"Write node error: {error}")
+        _record_fallback("write_error")
+    elif not output:
+        output = {"error": "Report generation returned empty output."}
     else:
-        state.set("structured", structured)
+        # Convert Path to str
+        for key, val in output.items():
+            if isinstance(val, Path):
+                output[key] = str(val)
+        _checkpoint(state, "output_paths", output)
+    _set(state, "output_paths", output)
 
-    print("\n[DEBUG] Analysis Node Output:")
-    pprint.pprint(structured)
+    logger.debug("Write Node Output:\n%s", LazyPFormat(output))
     return state
 
 
-def node_write(state):
-    structured = state.get("structured", {
+def _analysis_mode(state) -> str:
+    return state.get("analysis_mode") or cfg.ANALYSIS_MODE
+
+
+def _research_input(state):
+    return state.get("research", {"excerpts": ["No excerpts found."], "summary": ""})
+
+
+def _structured_input(state):
+    return state.get("structured", {
         "title": "Untitled Report",
         "sections": [{"heading": "Empty", "content": "No content available."}]
     })
+
+
+def _log_stage(name: str, state, sp) -> None:
+    """Emit the single compact per-stage INFO line."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    fields = {"stage": name, "topic": state.get("topic", ""), "duration_ms": sp.duration_ms}
+    if name == "research":
+        research = state.get("research") or {}
+        fields["hits"] = len(research.get("hits", []))
+        fields["excerpts"] = len(research.get("excerpts", []))
+    elif name == "analysis":
+        fields["sections"] = len((state.get("structured") or {}).get("sections", []))
+    elif name == "write":
+        output = state.get("output_paths") or {}
+        fields["formats"] = sorted(k for k in output if k != "error")
+        if output.get("error"):
+            fields["error"] = output["error"]
+    logger.info("stage complete", extra={"fields": fields})
+
+
+def _traced(name: str):
+    """Wrap a (sync or async) node so its run is recorded as a `node.<name>` span."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(state):
+                with span(f"node.{name}", topic=state.get("topic", "")) as sp:
+                    state = await fn(state)
+                _log_stage(name, state, sp)
+                return state
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(state):
+            with span(f"node.{name}", topic=state.get("topic", "")) as sp:
+                state = fn(state)
+            _log_stage(name, state, sp)
+            return state
+        return wrapper
+    return decorator
+
+
+@_traced("research")
+def node_research(state):
+    # state can be dict in latest LangGraph
+    topic = state.get("topic", "")
     try:
-        output = write_report(structured)
-        # Convert Path to str
-        for key, val in output.items():
-            if isinstance(val, Path):
-                output[key] = str(val)
-        if not output:
-            output = {"error": "Report generation returned empty output."}
+        research = research_topic(
+            topic, max_results=state.get("max_results", 5),
+            extract_points=_analysis_mode(state) != "single_pass")
     except Exception as e:
-        output = {"error": str(e)}
-        if isinstance(state, dict):
-            state.setdefault("_messages", []).append(f"Write node error: {e}")
-        else:
-            state.add_message(f"Write node error: {e}")
+        return _finish_research(state, topic, error=e)
+    return _finish_research(state, topic, research)
 
-    if isinstance(state, dict):
-        state["output_paths"] = output
-    else:
-        state.set("output_paths", output)
 
-    print("\n[DEBUG] Write Node Output:")
-    pprint.pprint(output)
-    return state
+@_traced("analysis")
+def node_analysis(state):
+    research = _research_input(state)
+    try:
+        structured = analyze_research(research, mode=_analysis_mode(state))
+    except Exception as e:
+        return _finish_analysis(state, research, error=e)
+    return _finish_analysis(state, research, structured)
+
+
+@_traced("write")
+def node_write(state):
+    structured = _structured_input(state)
+    try:
+        output = write_report(structured, formats=state.get("formats"), run_id=state.get("run_id"))
+    except Exception as e:
+        return _finish_write(state, error=e)
+    return _finish_write(state, output)
+
+
+@_traced("research")
+async def anode_research(state):
+    topic = state.get("topic", "")
+    try:
+        research = await aresearch_topic(
+            topic, max_results=state.get("max_results", 5),
+            extract_points=_analysis_mode(state) != "single_pass")
+    except Exception as e:
+        return _finish_research(state, topic, error=e)
+    return _finish_research(state, topic, research)
+
+
+@_traced("analysis")
+async def anode_analysis(state):
+    research = _research_input(state)
+    try:
+        structured = await aanalyze_research(research, mode=_analysis_mode(state))
+    except Exception as e:
+        return _finish_analysis(state, research, error=e)
+    return _finish_analysis(state, research, structured)
+
+
+@_traced("write")
+async def anode_write(state):
+    structured = _structured_input(state)
+    try:
+        output = await awrite_report(structured, formats=state.get("formats"), run_id=state.get("run_id"))
+    except Exception as e:
+        return _finish_write(state, error=e)
+    return _finish_write(state, output)
 
 # -------------------------
 # Build graph
 # -------------------------
 
 
-def build_graph():
-    if HAS_LANGGRAPH and StateGraph is not None:
-        graph = StateGraph(MessagesState)
-        graph.add_node("research", node_research)
-        graph.add_node("analysis", node_analysis)
-        graph.add_node("write", node_write)
+_langgraph = None
+_langgraph_checked = False
+_graphs: Dict[bool, object] = {}
+_graphs_lock = threading.Lock()
+
+
+def _load_langgraph():
+    """(StateGraph, START, END) from LangGraph, or None when it is not installed."""
+    global _langgraph, _langgraph_checked
+    if not _langgraph_checked:
+        try:
+            from langgraph.graph import StateGraph, START, END  # type: ignore
+            _langgraph = (StateGraph, START, END)
+        except Exception:
+            _langgraph = None
+        _langgraph_checked = True
+    return _langgraph
+
+
+def build_graph(use_async: bool = False):
+    if use_async:
+        nodes = [("research", anode_research),
+                 ("analysis", anode_analysis), ("write", anode_write)]
+    else:
+        nodes = [("research", node_research),
+                 ("analysis", node_analysis), ("write", node_write)]
+
+    langgraph = _load_langgraph()
+    if langgraph is not None:
+        StateGraph, START, END = langgraph
+        graph = StateGraph(WorkflowState)
+        for name, fn in nodes:
+            graph.add_node(name, fn)
 
         graph.add_edge(START, "research")
         graph.add_edge("research", "analysis")
@@ -136,8 +322,7 @@ def build_graph():
     # Fallback simple sequential graph
     class SimpleGraph:
         def __init__(self):
-            self._nodes = [("research", node_research),
-                           ("analysis", node_analysis), ("write", node_write)]
+            self._nodes = nodes
 
         def invoke(self, state):
             # Execute nodes in order; nodes may mutate the dict state
@@ -151,48 +336,111 @@ def build_graph():
                             f"{name} node error: {e}")
             return state
 
+        async def ainvoke(self, state):
+            for name, fn in self._nodes:
+                try:
+                    state = await fn(state)
+                except Exception as e:
+                    if isinstance(state, dict):
+                        state.setdefault("_messages", []).append(
+                            f"{name} node error: {e}")
+            return state
+
+        def stream(self, state, stream_mode="values"):
+            # Mirrors LangGraph's "values" mode: the input, then the state after each node
+            yield state
+            for _, fn in self._nodes:
+                state = fn(state)
+                yield state
+
+        async def astream(self, state, stream_mode="values"):
+            yield state
+            for _, fn in self._nodes:
+                state = await fn(state)
+                yield state
+
     return SimpleGraph()
 
 
-_graph = build_graph()
+def get_graph(use_async: bool = False):
+    """Compiled graph for sync or async nodes, built once on first use."""
+    graph = _graphs.get(use_async)
+    if graph is None:
+        with _graphs_lock:
+            graph = _graphs.get(use_async)
+            if graph is None:
+                graph = _graphs[use_async] = build_graph(use_async=use_async)
+    return graph
 
 # -------------------------
 # Run workflow
 # -------------------------
 
 
-def run_workflow(topic: str, max_results: int = 5) -> dict:
+def _initial_state(topic: str, max_results: int, analysis_mode: Optional[str] = None,
+                   formats: Optional[List[str]] = None, run_id: Optional[str] = None) -> dict:
     # Use a simple dict for input (latest LangGraph)
-    state = {
+    return {
         "topic": topic,
         "max_results": max_results,
+        "analysis_mode": analysis_mode or cfg.ANALYSIS_MODE,
+        "formats": list(formats) if formats else None,
+        "run_id": run_id,
         "_messages": [f"Start research for {topic}"]
     }
 
-    # Try to invoke the compiled graph. If LangGraph returns an unexpected
-    # state (e.g., it wraps or drops our dict), fall back to a local sequential
-    # execution of the nodes to guarantee correct behavior.
-    try:
-        final_state = _graph.invoke(state)
-    except Exception:
-        final_state = None
-
-    # If final_state looks wrong, run nodes sequentially to ensure state flows
-    if not isinstance(final_state, dict) or (isinstance(final_state, dict) and not final_state.get("research") and not final_state.get("output_paths")):
-        # start from fresh state dict and execute nodes manually
-        state = {
-            "topic": topic,
-            "max_results": max_results,
-            "_messages": [f"Start research for {topic}"]
-        }
-        state = node_research(state)
-        state = node_analysis(state)
-        state = node_write(state)
-        final_state = state
 
-    print("\n[DEBUG] Final Workflow State:")
-    pprint.pprint(final_state)
+# Stage outputs in pipeline order; a stage is complete once its key is set.
+_STAGE_KEYS = (("research", "research"), ("analysis", "structured"), ("write", "output_paths"))
+
+
+def _resume(state: dict, nodes: dict) -> dict:
+    """Run only the stages whose output is missing from `state` (sync)."""
+    for stage, key in _STAGE_KEYS:
+        if not state.get(key):
+            _record_fallback(f"resume_{stage}")
+            state = nodes[stage](state)
+    return state
+
+
+async def _aresume(state: dict, nodes: dict) -> dict:
+    for stage, key in _STAGE_KEYS:
+        if not state.get(key):
+            _record_fallback(f"resume_{stage}")
+            state = await nodes[stage](state)
+    return state
 
+
+def _restore(state: dict) -> bool:
+    """Load the checkpointed stages of state["run_id"] into `state`.
+
+    Returns True when the run was seen before (the graph is then skipped and
+    only the missing stages run). A new run records its inputs instead.
+    """
+    run_id = state.get("run_id")
+    store = get_default_store() if run_id else None
+    if store is None:
+        return False
+    saved = store.load(run_id)
+    if not saved:
+        store.save(run_id, "input", {k: state.get(k) for k in ("topic", "max_results", "analysis_mode")})
+        return False
+    # The run's identity comes from its first invocation
+    state.update(saved.get("input") or {})
+    for _, key in _STAGE_KEYS:
+        if saved.get(key):
+            state[key] = saved[key]
+    output = state.get("output_paths")
+    if output and not set(resolve_formats(state.get("formats"))) <= set(output):
+        # A format that was not rendered yet: redo only the (cheap) write stage
+        del state["output_paths"]
+    logger.info("resuming run", extra={"fields": {
+        "run_id": run_id, "topic": state.get("topic", ""),
+        "completed": [stage for stage, key in _STAGE_KEYS if state.get(key)]}})
+    return True
+
+
+def _collect_output_paths(final_state: dict) -> dict:
     # Ensure all Path objects are strings
     output_paths = {}
     for key, val in final_state.get("output_paths", {}).items():
@@ -202,3 +450,247 @@ def run_workflow(topic: str, max_results: int = 5) -> dict:
             output_paths[key] = val
 
     return output_paths if output_paths else {"error": "no output"}
+
+
+def run_workflow_state(topic: str, max_results: int = 5, analysis_mode: Optional[str] = None,
+                       formats: Optional[List[str]] = None, run_id: Optional[str] = None) -> dict:
+    """Run the pipeline and return the full final state, including its `trace`.
+
+    `analysis_mode` selects how the analysis stage gets its bullets (see
+    `src.agents.analysis_agent.ANALYSIS_MODES`); defaults to ANALYSIS_MODE.
+    `formats` lists the output formats to render; defaults to OUTPUT_FORMATS.
+    With a `run_id`, every finished stage is checkpointed and a later call with
+    the same ID resumes after the last completed stage (see `checkpoints`).
+    """
+    with collect_trace() as trace:
+        # Stream state snapshots so that, if the graph fails midway, the stages
+        # it did finish are kept and only the remaining ones are run.
+        last_state = _initial_state(topic, max_results, analysis_mode, formats, run_id)
+        if not _restore(last_state):
+            try:
+                for values in get_graph().stream(dict(last_state), stream_mode="values"):
+                    if isinstance(values, dict):
+                        last_state = values
+            except Exception as e:
+                _record_fallback("graph_error")
+                logger.warning(f"Graph run failed, resuming from partial state: {e}")
+
+        final_state = _resume(dict(last_state), {
+            "research": node_research, "analysis": node_analysis, "write": node_write})
+
+    final_state["trace"] = trace
+    logger.debug("Final Workflow State:\n%s", LazyPFormat(final_state))
+    return final_state
+
+
+async def arun_workflow_state(topic: str, max_results: int = 5, analysis_mode: Optional[str] = None,
+                              formats: Optional[List[str]] = None, run_id: Optional[str] = None) -> dict:
+    """Async counterpart of `run_workflow_state`.
+
+    The loop's pooled HTTP client is closed once the last concurrent run on it ends.
+    """
+    async with http_client.async_client_scope(), collect_trace() as trace:
+        last_state = _initial_state(topic, max_results, analysis_mode, formats, run_id)
+        if not _restore(last_state):
+            try:
+                async for values in get_graph(use_async=True).astream(dict(last_state), stream_mode="values"):
+                    if isinstance(values, dict):
+                        last_state = values
+            except Exception as e:
+                _record_fallback("graph_error")
+                logger.warning(f"Async graph run failed, resuming from partial state: {e}")
+
+        final_state = await _aresume(dict(last_state), {
+            "research": anode_research, "analysis": anode_analysis, "write": anode_write})
+
+    final_state["trace"] = trace
+    logger.debug("Final Workflow State:\n%s", LazyPFormat(final_state))
+    return final_state
+
+
+def run_workflow(topic: str, max_results: int = 5, analysis_mode: Optional[str] = None,
+                 formats: Optional[List[str]] = None, run_id: Optional[str] = None) -> dict:
+    return _collect_output_paths(run_workflow_state(topic, max_results, analysis_mode, formats, run_id))
+
+
+async def arun_workflow(topic: str, max_results: int = 5, analysis_mode: Optional[str] = None,
+                        formats: Optional[List[str]] = None, run_id: Optional[str] = None) -> dict:
+    """Async counterpart of `run_workflow`.
+
+    Search and LLM calls are awaited natively and document rendering runs in an
+    executor, so many reports can be in flight on a single event loop.
+    """
+    return _collect_output_paths(await arun_workflow_state(topic, max_results, analysis_mode, formats, run_id))
+
+
+def stream_workflow(topic: str, max_results: int = 5, analysis_mode: Optional[str] = None,
+                    formats: Optional[List[str]] = None, run_id: Optional[str] = None) -> Iterator[dict]:
+    """Run the pipeline as a generator of progress events.
+
+    Yields dicts with an "event" key, in order: "search_done", "key_points_delta"
+    (one per streamed chunk), "key_points", "section" (one per report section;
+    "sections_reset" means the sections so far are replaced by the ones that follow),
+    "<format>_written" (e.g. "docx_written", "pdf_written") per rendered format
+    and finally "done" with the output paths.
+    Every event carries "elapsed_ms" since the run started. With a checkpointed
+    `run_id`, finished stages are replayed from the checkpoint instead of rerun.
+    """
+    started = time.perf_counter()
+    state = _initial_state(topic, max_results, analysis_mode, formats, run_id)
+    _restore(state)
+    topic, max_results = state["topic"], state["max_results"]
+    mode = _analysis_mode(state)
+
+    def event(name: str, **payload) -> dict:
+        payload["event"] = name
+        payload["elapsed_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return payload
+
+    research = state.get("research")
+    hits = None
+    if not research:
+        # A similar past topic may supply (or seed) the research
+        match = find_reusable(topic, mode != "single_pass")
+        research = reuse_research(topic, match)
+        if research is None and match is not None:
+            hits = search_hits(topic, max_results)
+            research = extend_research(topic, match, hits, max_results, mode != "single_pass")
+            if research is not None:
+                remember_research(research)
+        if research is not None:
+            _checkpoint(state, "research", research)
+    if research:
+        # Checkpointed or reused: replay the research events without searching again
+        yield event("search_done", hits=research.get("hits", []))
+        if research.get("key_points"):
+            yield event("key_points", text=research["key_points"])
+    else:
+        hits, excerpts = gather_excerpts(topic, max_results, hits)
+        yield event("search_done", hits=hits)
+
+        key_points_text = ""
+        extracted = False
+        if mode != "single_pass":
+            chunks = []
+            try:
+                for chunk in stream_key_points(excerpts, query=topic):
+                    chunks.append(chunk)
+                    yield event("key_points_delta", text=chunk)
+                key_points_text = "".join(chunks)
+                extracted = True
+            except Exception as e:
+                _record_fallback("research_error")
+                key_points_text = "\n".join(f"- {e}" for e in excerpts[:8])
+                logger.warning(f"Key point stream failed: {e}")
+            yield event("key_points", text=key_points_text)
+        research = build_research(topic, hits, excerpts, key_points_text)
+        if extracted:
+            remember_research(research)
+        _checkpoint(state, "research", research)
+
+    structured = state.get("structured")
+    if structured:
+        for sec in structured.get("sections", []):
+            yield event("section", heading=sec.get("heading", ""), content=sec.get("content", ""))
+    else:
+        for kind, payload in stream_analysis(research, mode=mode):
+            if kind == "section":
+                yield event("section", heading=payload.get("heading", ""), content=payload.get("content", ""))
+            elif kind == "reset":
+                yield event("sections_reset")
+            else:
+                structured = payload
+        _checkpoint(state, "structured", structured)
+
+    output_paths = dict(state.get("output_paths") or {})
+    if output_paths:
+        for fmt, path in output_paths.items():
+            yield event(f"{fmt}_written", path=path)
+    else:
+        try:
+            for fmt, path in iter_write_report(structured, formats=state.get("formats"),
+                                               run_id=state.get("run_id")):
+                output_paths[fmt] = path
+                yield event(f"{fmt}_written", path=path)
+            _checkpoint(state, "output_paths", output_paths)
+        except Exception as e:
+            _record_fallback("write_error")
+            output_paths["error"] = str(e)
+    yield event("done", output_paths=output_paths, research=research, structured=structured)
+
+
+def rerender_run(run_id: str, formats: Optional[List[str]] = None) -> dict:
+    """Render a checkpointed run's report into `formats` without search or LLM calls.
+
+    Returns {format: path} for the newly written files; the run's stored output
+    paths are extended with them.
+    """
+    store = get_default_store()
+    saved = store.load(run_id) if store is not None else {}
+    structured = saved.get("structured")
+    if not structured:
+        raise ValueError(f"Run {run_id!r} has no checkpointed analysis to render")
+    paths = write_report(structured, formats=formats, run_id=run_id)
+    previous = {k: v for k, v in (saved.get("output_paths") or {}).items() if k != "error"}
+    store.save(run_id, "output_paths", {**previous, **paths})
+    return paths
+
+
+def refresh_run(previous_run_id: str, run_id: Optional[str] = None,
+                formats: Optional[List[str]] = None) -> dict:
+    """Regenerate a checkpointed run's report incrementally, e.g. for a scheduled daily refresh.
+
+    The topic is searched again and the hits are diffed against the previous
+    run's research by URL and content hash (`refresh_research`). Key points and
+    report lines backed only by removed or changed sources are pruned. Only
+    added or changed sources go through key-point extraction, and only their
+    key points and the existing section headings are sent to the analysis LLM;
+    the sections it returns are merged into the previous report by heading
+    (`update_report`).
+    When no section changed, the previous files are reused and nothing is
+    re-rendered (formats missing from the previous run are still written).
+    Otherwise every format is rendered again in full: rendering has no
+    section-level reuse, only the search and LLM work is incremental.
+    `formats` defaults to the formats of the previous run.
+
+    The result is checkpointed as a new run (`run_id`, generated when omitted)
+    so it can be refreshed again tomorrow. Returns {"run_id", "output_paths",
+    "changes": {"added", "changed", "removed"}, "updated_sections"}.
+    """
+    store = get_default_store()
+    saved = store.load(previous_run_id) if store is not None else {}
+    previous, structured = saved.get("research"), saved.get("structured")
+    if not previous or not structured:
+        raise ValueError(f"Run {previous_run_id!r} has no checkpointed research and analysis to refresh")
+    inputs = saved.get("input") or {}
+    run_id = run_id or new_run_id()
+    previous_paths = {k: v for k, v in (saved.get("output_paths") or {}).items()
+                      if k != "error" and os.path.exists(v)}
+    formats = resolve_formats(formats or list(previous_paths) or None)
+
+    with span("node.refresh", topic=previous.get("query", ""), previous_run_id=previous_run_id) as sp:
+        research, changes = refresh_research(previous, max_results=inputs.get("max_results", 5))
+        updated: List[str] = []
+        if changes["added"] or changes["changed"] or changes["removed"]:
+            structured, updated = update_report(structured, changes.get("key_points", ""), changes["removed"],
+                                                stale=changes["stale"], excerpts=research.get("excerpts", []))
+
+        if updated:
+            output_paths = write_report(structured, formats=formats, run_id=run_id)
+        else:
+            output_paths = {fmt: previous_paths[fmt] for fmt in formats if fmt in previous_paths}
+            missing = [fmt for fmt in formats if fmt not in output_paths]
+            if missing:
+                output_paths.update(write_report(structured, formats=missing, run_id=run_id))
+        sp.set("updated_sections", len(updated))
+        sp.set("rendered", bool(updated))
+
+    store.save(run_id, "input", {**inputs, "refreshed_from": previous_run_id})
+    store.save(run_id, "research", research)
+    store.save(run_id, "structured", structured)
+    store.save(run_id, "output_paths", output_paths)
+    summary = {k: changes[k] for k in ("added", "changed", "removed")}
+    logger.info("report refreshed", extra={"fields": {
+        "run_id": run_id, "previous_run_id": previous_run_id, "duration_ms": sp.duration_ms,
+        "updated_sections": updated, **{k: len(v) for k, v in summary.items()}}})
+    return {"run_id": run_id, "output_paths": output_paths, "changes": summary, "updated_sections": updated}
@@ -0,0 +1,157 @@
+"""Worker processes that consume report jobs from the job queue.
+
+Each worker claims one job at a time, runs it through `stream_workflow` with the
+job ID as run ID (so an interrupted job resumes from its checkpoints when it is
+requeued) and publishes a progress line per stage. A background thread keeps the
+job's heartbeat fresh, and between jobs every worker requeues jobs whose worker
+stopped beating (`JobQueue.requeue_stale`). Workers scale independently of the
+UI: start more on any host that can reach JOB_QUEUE_URL.
+
+CLI usage:
+
+    python -m src.orchestrator.worker --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from src.config import cfg
+from src.orchestrator.job_queue import JobQueue, get_default_queue
+from src.orchestrator.langgraph_workflow import stream_workflow
+from src.utils.logging_setup import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def _stage(event: dict, sections: int) -> Optional[str]:
+    """Human-readable progress line for a workflow event (None for events not worth a write)."""
+    kind = event["event"]
+    if kind == "search_done":
+        return f"found {len(event['hits'])} sources, extracting key points"
+    if kind == "key_points":
+        return "analyzing"
+    if kind == "section":
+        return f"drafted {sections} section(s)"
+    if kind.endswith("_written"):
+        return f"rendered {kind[:-len('_written')]}"
+    return None
+
+
+def _heartbeat(queue: JobQueue, job_id: str, stop: threading.Event) -> None:
+    interval = max(1.0, cfg.JOB_VISIBILITY_TIMEOUT / 3)
+    while not stop.wait(interval):
+        try:
+            queue.heartbeat(job_id)
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+
+def run_job(queue: JobQueue, job: dict) -> None:
+    job_id = job["job_id"]
+    logger.info(f"Worker picked up job {job_id} topic={job['topic']!r}")
+    beating = threading.Event()
+    threading.Thread(target=_heartbeat, args=(queue, job_id, beating), daemon=True,
+                     name=f"heartbeat-{job_id[:8]}").start()
+    try:
+        _run_job(queue, job)
+    finally:
+        beating.set()
+
+
+def _run_job(queue: JobQueue, job: dict) -> None:
+    job_id = job["job_id"]
+    sections = 0
+    last_stage = None
+    try:
+        for event in stream_workflow(job["topic"], job.get("max_results", 5), job.get("analysis_mode"),
+                                     job.get("formats"), run_id=job_id):
+            if event["event"] == "section":
+                sections += 1
+            elif event["event"] == "sections_reset":
+                sections = 0
+            if event["event"] == "done":
+                output_paths = event["output_paths"]
+                if output_paths.get("error"):
+                    queue.fail(job_id, output_paths["error"])
+                else:
+                    queue.finish(job_id, {"output_paths": output_paths, "structured": event["structured"]})
+                return
+            stage = _stage(event, sections)
+            if stage and stage != last_stage:
+                queue.progress(job_id, stage)
+                last_stage = stage
+        queue.fail(job_id, "workflow ended without a result")
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        queue.fail(job_id, f"{type(e).__name__}: {e}")
+
+
+def work(queue: Optional[JobQueue] = None, stop: Optional[threading.Event] = None,
+         max_jobs: Optional[int] = None, poll_timeout: float = 1.0) -> int:
+    """Claim and run jobs until `stop` is set (or `max_jobs` ran); returns the number of jobs run."""
+    queue = queue or get_default_queue()
+    done = 0
+    reap_every = max(poll_timeout, cfg.JOB_VISIBILITY_TIMEOUT / 3)
+    last_reap = float("-inf")
+    while not (stop is not None and stop.is_set()) and (max_jobs is None or done < max_jobs):
+        if time.monotonic() - last_reap >= reap_every:
+            last_reap = time.monotonic()
+            try:
+                queue.requeue_stale()
+            except Exception as e:
+                logger.warning(f"Reaping stale jobs failed: {e}")
+        job = queue.claim(timeout=poll_timeout)
+        if job is None:
+            continue
+        run_job(queue, job)
+        done += 1
+    return done
+
+
+def _worker_main(log_level: Optional[str]) -> None:
+    configure_logging(level=log_level)
+    stop = threading.Event()
+    # Finish the current job on SIGTERM/SIGINT, then exit
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    work(stop=stop)
+
+
+def run_workers(workers: int, log_level: Optional[str] = None) -> None:
+    """Start `workers` processes and wait for them; SIGTERM/SIGINT stops them gracefully."""
+    procs: List[multiprocessing.Process] = [
+        multiprocessing.Process(target=_worker_main, args=(log_level,), name=f"report-worker-{i}")
+        for i in range(max(1, workers))
+    ]
+    for p in procs:
+        p.start()
+
+    def stop_all(*_):
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, stop_all)
+    signal.signal(signal.SIGINT, stop_all)
+    for p in procs:
+        p.join()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run report worker processes for the job queue.")
+    parser.add_argument("-w", "--workers", type=int, default=cfg.JOB_WORKERS)
+    parser.add_argument("--log-level", default=None, help="override LOG_LEVEL")
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level)
+    logger.info(f"Starting {args.workers} worker(s) on {cfg.JOB_QUEUE_URL}")
+    run_workers(args.workers, args.log_level)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
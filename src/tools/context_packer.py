@@ -0,0 +1,225 @@
+"""Token-budgeted context packing for LLM prompts.
+
+`pack_context` bounds how much source text goes into a prompt regardless of how
+many sources were gathered:
+
+1. excerpts are split into chunks of roughly `chunk_tokens` tokens,
+2. near-duplicate chunks are dropped using MinHash signatures over word shingles,
+3. the remaining chunks are ranked against the query with BM25,
+4. the best chunks are taken until `token_budget` is full and returned in their
+   original order so the prompt still reads coherently.
+
+Scoring is vectorized with NumPy when it is installed and falls back to plain
+Python otherwise. Token counts are estimated at ~4 characters per token.
+"""
+import importlib.util
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# NumPy is only imported the first time a vectorized path actually runs
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+_np = None
+
+from src.config import cfg
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_NUM_PERM = 64
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        import numpy  # type: ignore
+        _np = numpy
+    return _np
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD_RE.findall(text.casefold())
+
+
+def stale_filter(stale: Sequence[str], current: Sequence[str],
+                 threshold: Optional[float] = None) -> Callable[[str], bool]:
+    """Predicate that is True for text backed by a `stale` source but by none of `current`.
+
+    A text is backed by a source when at least `threshold` (REFRESH_PRUNE_OVERLAP)
+    of its distinct words (3+ characters) occur in it. Short texts, and texts no
+    source backs at all, are never stale. A threshold of 0 disables pruning.
+    """
+    threshold = cfg.REFRESH_PRUNE_OVERLAP if threshold is None else threshold
+    stale_sets = [{w for w in _tokens(s) if len(w) > 2} for s in stale]
+    current_sets = [{w for w in _tokens(s) if len(w) > 2} for s in current]
+
+    def best(words, sets) -> float:
+        return max((len(words & s) / len(words) for s in sets), default=0.0)
+
+    def is_stale(text: str) -> bool:
+        words = {w for w in _tokens(text) if len(w) > 2}
+        if threshold <= 0 or not stale_sets or len(words) < 3:
+            return False
+        return best(words, stale_sets) >= threshold and best(words, current_sets) < threshold
+
+    return is_stale
+
+
+def chunk_text(text: str, chunk_tokens: int = 200) -> List[str]:
+    """Split on sentence boundaries and regroup into chunks of about `chunk_tokens`."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in _SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        cost = estimate_tokens(sentence)
+        if current and size + cost > chunk_tokens:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        # A single over-long sentence is hard-wrapped by characters
+        while cost > chunk_tokens:
+            cut = chunk_tokens * 4
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:]
+            cost = estimate_tokens(sentence)
+        current.append(sentence)
+        size += cost
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+# -------------------------
+# MinHash near-duplicate detection
+# -------------------------
+def _shingle_hashes(text: str, k: int = 3) -> List[int]:
+    words = _tokens(text)
+    if len(words) < k:
+        words = words or [""]
+        return [zlib.crc32(" ".join(words).encode("utf-8"))]
+    return list({zlib.crc32(" ".join(words[i:i + k]).encode("utf-8")) for i in range(len(words) - k + 1)})
+
+
+def _permutations(num_perm: int = _NUM_PERM) -> Tuple[List[int], List[int]]:
+    # Fixed seeds keep signatures stable across processes and runs
+    a = [(1103515245 * (i + 1) + 12345) % _MERSENNE_PRIME | 1 for i in range(num_perm)]
+    b = [(214013 * (i + 7) + 2531011) % _MERSENNE_PRIME for i in range(num_perm)]
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations()
+
+
+def minhash_signatures(texts: Sequence[str]):
+    """One row of `_NUM_PERM` min-hashes per text (NumPy array or list of lists)."""
+    if NUMPY_AVAILABLE:
+        np = _numpy()
+        a = np.array(_PERM_A, dtype=np.uint64)[:, None]
+        b = np.array(_PERM_B, dtype=np.uint64)[:, None]
+        sigs = np.empty((len(texts), _NUM_PERM), dtype=np.uint64)
+        for row, text in enumerate(texts):
+            x = np.array(_shingle_hashes(text), dtype=np.uint64)[None, :]
+            # uint64 arithmetic wraps; the mask keeps values in the 61-bit field
+            sigs[row] = ((a * x + b) & np.uint64(_MERSENNE_PRIME)).min(axis=1)
+        return sigs
+    sigs = []
+    for text in texts:
+        hashes = _shingle_hashes(text)
+        sigs.append([min(((pa * h + pb) & _MERSENNE_PRIME) for h in hashes)
+                     for pa, pb in zip(_PERM_A, _PERM_B)])
+    return sigs
+
+
+def dedupe_near_duplicates(texts: Sequence[str], threshold: float = 0.8) -> List[int]:
+    """Indices of `texts` to keep; later texts whose estimated Jaccard similarity
+    to an already kept one is >= `threshold` are dropped."""
+    if not texts:
+        return []
+    sigs = minhash_signatures(texts)
+    kept: List[int] = []
+    if NUMPY_AVAILABLE:
+        for i in range(len(texts)):
+            if kept and (sigs[kept] == sigs[i]).mean(axis=1).max() >= threshold:
+                continue
+            kept.append(i)
+        return kept
+    for i in range(len(texts)):
+        if any(sum(x == y for x, y in zip(sigs[i], sigs[j])) / _NUM_PERM >= threshold for j in kept):
+            continue
+        kept.append(i)
+    return kept
+
+
+# -------------------------
+# BM25 ranking
+# -------------------------
+def bm25_scores(query: str, docs: Sequence[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    query_terms = list(dict.fromkeys(_tokens(query)))
+    if not docs:
+        return []
+    doc_tokens = [_tokens(d) for d in docs]
+    if not query_terms:
+        return [0.0] * len(docs)
+    lengths = [len(t) for t in doc_tokens]
+    avgdl = (sum(lengths) / len(lengths)) or 1.0
+    counts = [Counter(t) for t in doc_tokens]
+    n = len(docs)
+
+    if NUMPY_AVAILABLE:
+        np = _numpy()
+        tf = np.array([[c.get(term, 0) for term in query_terms] for c in counts], dtype=np.float64)
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        dl = np.array(lengths, dtype=np.float64)[:, None]
+        denom = tf + k1 * (1.0 - b + b * dl / avgdl)
+        return (idf * tf * (k1 + 1.0) / np.where(denom == 0, 1.0, denom)).sum(axis=1).tolist()
+
+    scores = []
+    df = {term: sum(1 for c in counts if term in c) for term in query_terms}
+    for c, dl in zip(counts, lengths):
+        score = 0.0
+        for term in query_terms:
+            f = c.get(term, 0)
+            if f:
+                idf = math.log(1.0 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * f * (k1 + 1.0) / (f + k1 * (1.0 - b + b * dl / avgdl))
+        scores.append(score)
+    return scores
+
+
+def pack_context(texts: Sequence[str], query: str = "", token_budget: Optional[int] = None,
+                 chunk_tokens: Optional[int] = None, dedupe_threshold: float = 0.8) -> List[str]:
+    """Return chunks of `texts` that fit `token_budget`, best-first by relevance to `query`.
+
+    Inputs that already fit the budget are returned unchanged.
+    """
+    texts = [t for t in texts if t and t.strip()]
+    budget = token_budget or cfg.CONTEXT_TOKEN_BUDGET
+    if budget <= 0 or sum(estimate_tokens(t) for t in texts) <= budget:
+        return list(texts)
+
+    chunks: List[str] = []
+    for text in texts:
+        chunks.extend(chunk_text(text, chunk_tokens or cfg.CONTEXT_CHUNK_TOKENS))
+    keep = dedupe_near_duplicates(chunks, dedupe_threshold)
+    chunks = [chunks[i] for i in keep]
+
+    scores = bm25_scores(query, chunks)
+    # Ties (e.g. no query overlap) keep source order: earlier hits rank higher
+    order = sorted(range(len(chunks)), key=lambda i: (-scores[i], i))
+    selected, used = [], 0
+    for i in order:
+        cost = estimate_tokens(chunks[i])
+        if used + cost > budget:
+            continue
+        selected.append(i)
+        used += cost
+    return [chunks[i] for i in sorted(selected)]
@@ -1,112 +1,85 @@
 """Document generator with graceful fallbacks when dependencies are missing.
 
-This module will attempt to use `python-docx` and `reportlab` when available.
-If they are not installed, it will produce plain text files so the pipeline
-can complete during local development.
+DOCX output uses `python-docx` (imported on first use) when available and
+falls back to a plain text file so the pipeline can complete during local
+development. PDF output is
+produced by the built-in streaming renderer in `src.tools.pdf_renderer`.
+Both writers accept a report dict or an already built
+`src.tools.document_model.Document`.
 """
+import logging
 import os
-import json
-from typing import Dict
+from typing import Dict, Union
 
-# Try to import python-docx
-try:
-    from docx import Document  # type: ignore
-    DOCX_AVAILABLE = True
-except Exception:
-    Document = None  # type: ignore
-    DOCX_AVAILABLE = False
+from src.tools.document_model import Document as ReportDocument, as_document, document_text
 
-# Try to import reportlab
-try:
-    from reportlab.lib.pagesizes import letter  # type: ignore
-    from reportlab.pdfgen import canvas  # type: ignore
-    REPORTLAB_AVAILABLE = True
-except Exception:
-    letter = None  # type: ignore
-    canvas = None  # type: ignore
-    REPORTLAB_AVAILABLE = False
+logger = logging.getLogger(__name__)
 
+_docx_module = None
+_docx_checked = False
 
-def _safe_text_from_report(report: Dict) -> str:
-    parts = [report.get("title", "")]
-    if report.get("summary"):
-        parts.append(report.get("summary"))
-    for sec in report.get("sections", []):
-        heading = sec.get("heading", "")
-        content = sec.get("content", "")
-        parts.append(heading)
-        # content may be list or string
-        if isinstance(content, (list, tuple)):
-            parts.extend([str(c) for c in content])
-        else:
-            parts.append(str(content))
-    return "\n\n".join([p for p in parts if p])
 
+def _load_docx():
+    """Import python-docx on first use; None when it is not installed."""
+    global _docx_module, _docx_checked
+    if not _docx_checked:
+        try:
+            import docx  # type: ignore
+            import docx.shared  # type: ignore
+            _docx_module = docx
+        except Exception:
+            _docx_module = None
+        _docx_checked = True
+    return _docx_module
 
-def generate_docx(report: Dict, out_path: str):
+
+def docx_available() -> bool:
+    return _load_docx() is not None
+
+
+def generate_docx(report: Union[Dict, ReportDocument], out_path: str):
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-    if DOCX_AVAILABLE:
-        doc = Document()
-        doc.add_heading(report.get("title", ""), 0)
-        if report.get("summary"):
-            doc.add_paragraph(report.get("summary", ""))
-        for sec in report.get("sections", []):
-            doc.add_heading(sec.get("heading", "Section"), level=1)
-            content = sec.get("content", "")
-            if isinstance(content, (list, tuple)):
-                for line in content:
-                    doc.add_paragraph(str(line))
-            else:
-                doc.add_paragraph(str(content))
+    doc_model = as_document(report)
+    docx = _load_docx()
+    if docx is not None:
+        doc = docx.Document()
+        doc.add_heading(doc_model.title, 0)
+        if doc_model.summary:
+            doc.add_paragraph(doc_model.summary)
+        for block in doc_model.blocks:
+            if block.kind == "heading":
+                doc.add_heading(block.text or "Section", level=block.level)
+            elif block.kind == "paragraph":
+                doc.add_paragraph(block.text)
+            elif block.kind == "bullets":
+                for item in block.items:
+                    doc.add_paragraph(item)
+            elif block.kind == "table":
+                ncols = max(len(row) for row in block.rows)
+                table = doc.add_table(rows=len(block.rows), cols=ncols)
+                table.style = "Table Grid"
+                for r, row in enumerate(block.rows):
+                    for c, cell in enumerate(row):
+                        table.cell(r, c).text = cell
+            elif block.kind == "figure":
+                try:
+                    doc.add_picture(block.path, width=docx.shared.Inches(6))
+                except Exception as e:
+                    logger.warning(f"Skipping figure {block.path}: {e}")
+                    continue
+                if block.caption:
+                    doc.add_paragraph(block.caption)
         doc.save(out_path)
         return out_path
 
     # Fallback: write a plain-text file with .docx extension so callers can still find it
-    text = _safe_text_from_report(report)
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write(text)
+        f.write(document_text(doc_model))
     return out_path
 
 
-def generate_pdf_from_text(report: Dict, out_path: str):
-    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-    if REPORTLAB_AVAILABLE:
-        c = canvas.Canvas(out_path, pagesize=letter)
-        width, height = letter
-        y = height - 50
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(50, y, report.get("title", ""))
-        y -= 30
-        if report.get("summary"):
-            c.setFont("Helvetica", 11)
-            for line in str(report.get("summary", "")).splitlines():
-                c.drawString(50, y, line)
-                y -= 14
-                if y < 60:
-                    c.showPage()
-                    y = height - 50
-        y -= 10
-        for sec in report.get("sections", []):
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, sec.get("heading", ""))
-            y -= 18
-            c.setFont("Helvetica", 10)
-            content = sec.get("content", "")
-            if isinstance(content, (list, tuple)):
-                lines = [str(l) for l in content]
-            else:
-                lines = str(content).splitlines()
-            for line in lines:
-                if y < 60:
-                    c.showPage()
-                    y = height - 50
-                c.drawString(50, y, line)
-                y -= 12
-        c.save()
-        return out_path
+def generate_pdf_from_text(report: Union[Dict, ReportDocument], out_path: str):
+    # Pure-Python renderer: wraps text and streams pages to disk, no optional deps
+    from src.tools.pdf_renderer import render_document_pdf
 
-    # Fallback: write plain text to the path so a user can still read output
-    text = _safe_text_from_report(report)
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(text)
-    return out_path
+    return render_document_pdf(as_document(report), out_path)
@@ -0,0 +1,153 @@
+"""Intermediate document model shared by every output writer.
+
+`build_document` normalizes a structured report once (title, summary, and per
+section a heading, paragraphs or bullets, an optional table and figures) into
+plain frozen dataclasses. Writers only walk `Document.blocks` and never look at
+the raw report dict again. The model is picklable so it can be handed to
+renderer processes as-is.
+
+Figure paths come from LLM output, so they are untrusted: a figure is kept only
+when its path resolves inside FIGURE_DIR and the file is a JPEG or PNG image.
+"""
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from src.config import cfg
+
+logger = logging.getLogger(__name__)
+
+FIGURE_SIGNATURES = {b"\xff\xd8": "jpeg", b"\x89PNG\r\n\x1a\n": "png"}
+
+
+@dataclass(frozen=True)
+class Block:
+    """One layout unit.
+
+    kind is one of "heading", "paragraph", "bullets", "table" or "figure";
+    only the fields relevant to that kind are set.
+    """
+
+    kind: str
+    text: str = ""
+    level: int = 1
+    items: Tuple[str, ...] = ()
+    rows: Tuple[Tuple[str, ...], ...] = ()
+    path: str = ""
+    caption: str = ""
+
+
+@dataclass(frozen=True)
+class Document:
+    title: str
+    summary: str = ""
+    blocks: Tuple[Block, ...] = field(default_factory=tuple)
+
+
+def _table_rows(table) -> Tuple[Tuple[str, ...], ...]:
+    if isinstance(table, dict):
+        columns = table.get("columns") or []
+        rows = ([columns] if columns else []) + list(table.get("rows", []))
+    elif isinstance(table, (list, tuple)):
+        rows = list(table)
+    else:
+        return ()
+    return tuple(tuple(str(c) for c in row) for row in rows if row)
+
+
+def figure_kind(head: bytes) -> Optional[str]:
+    """"jpeg" or "png" from the first bytes of an image file, else None."""
+    for signature, kind in FIGURE_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+def _figure_path(path: str) -> Optional[str]:
+    """Resolved `path` if it is a JPEG/PNG file inside FIGURE_DIR, else None."""
+    if not cfg.FIGURE_DIR:
+        logger.warning(f"Dropping figure {path!r}: figures are disabled (FIGURE_DIR is empty)")
+        return None
+    root = os.path.realpath(cfg.FIGURE_DIR)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        logger.warning(f"Dropping figure {path!r}: outside FIGURE_DIR")
+        return None
+    try:
+        with open(full, "rb") as f:
+            head = f.read(8)
+    except OSError as e:
+        logger.warning(f"Dropping figure {path!r}: {e}")
+        return None
+    if figure_kind(head) is None:
+        logger.warning(f"Dropping figure {path!r}: not a JPEG or PNG image")
+        return None
+    return full
+
+
+def build_document(report: Dict) -> Document:
+    """Normalize a structured report into a `Document`.
+
+    A section's `content` may be a string (paragraph) or a list (bullets).
+    Sections may also carry a `table` (rows with the header first, or
+    {"columns": [...], "rows": [[...]]}) and `figures` ([{"path", "caption"}],
+    paths relative to FIGURE_DIR; figures that fail `_figure_path` are dropped).
+    """
+    blocks: List[Block] = []
+    for sec in report.get("sections", []) or []:
+        blocks.append(Block("heading", text=str(sec.get("heading", "")), level=1))
+        content = sec.get("content", "")
+        if isinstance(content, (list, tuple)):
+            blocks.append(Block("bullets", items=tuple(str(c) for c in content)))
+        elif content:
+            blocks.append(Block("paragraph", text=str(content)))
+        rows = _table_rows(sec.get("table"))
+        if rows:
+            blocks.append(Block("table", rows=rows))
+        for fig in sec.get("figures", []) or []:
+            path = _figure_path(str(fig["path"])) if isinstance(fig, dict) and fig.get("path") else None
+            if path:
+                blocks.append(Block("figure", path=path, caption=str(fig.get("caption", ""))))
+    return Document(title=str(report.get("title", "")), summary=str(report.get("summary", "") or ""),
+                    blocks=tuple(blocks))
+
+
+def as_document(report: Union[Dict, Document]) -> Document:
+    return report if isinstance(report, Document) else build_document(report)
+
+
+def document_text(doc: Document) -> str:
+    """Plain-text rendering used by the writers' no-dependency fallbacks."""
+    parts: List[str] = [doc.title, doc.summary]
+    for block in doc.blocks:
+        if block.kind in ("heading", "paragraph"):
+            parts.append(block.text)
+        elif block.kind == "bullets":
+            parts.extend(block.items)
+        elif block.kind == "table":
+            parts.append("\n".join(" | ".join(row) for row in block.rows))
+        elif block.kind == "figure":
+            parts.append(f"[Figure: {block.caption or block.path}]")
+    return "\n\n".join(p for p in parts if p)
+
+
+
+def document_to_report(doc: Document) -> Dict:
+    """Inverse of `build_document`: the structured-report dict for `doc`."""
+    sections: List[Dict] = []
+    for block in doc.blocks:
+        if block.kind == "heading" or not sections:
+            sections.append({"heading": block.text if block.kind == "heading" else "", "content": ""})
+            if block.kind == "heading":
+                continue
+        sec = sections[-1]
+        if block.kind == "paragraph":
+            sec["content"] = block.text
+        elif block.kind == "bullets":
+            sec["content"] = list(block.items)
+        elif block.kind == "table":
+            sec["table"] = [list(row) for row in block.rows]
+        elif block.kind == "figure":
+            sec.setdefault("figures", []).append({"path": block.path, "caption": block.caption})
+    return {"title": doc.title, "summary": doc.summary, "sections": sections}
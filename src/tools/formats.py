@@ -0,0 +1,76 @@
+"""Registry of report output formats.
+
+Each format maps to a writer given as a "module:function" path that is only
+imported the first time the format is rendered, so producing Markdown or JSON
+never pays for loading python-docx or the PDF renderer. Writers take a
+`src.tools.document_model.Document` and an output path and return the path.
+
+Register additional backends with `register_format`.
+"""
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.config import cfg
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    name: str
+    target: str          # "package.module:function"
+    extension: str
+    # Cheap text formats render inline; heavy ones go to the render pool
+    inline: bool = False
+
+
+_registry: Dict[str, OutputFormat] = {}
+_writers: Dict[str, Callable] = {}
+_lock = threading.Lock()
+
+
+def register_format(name: str, target: str, extension: Optional[str] = None, inline: bool = False) -> None:
+    with _lock:
+        _registry[name] = OutputFormat(name, target, extension or name, inline)
+        _writers.pop(name, None)
+
+
+def available_formats() -> List[str]:
+    return list(_registry)
+
+
+def get_format(name: str) -> OutputFormat:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f"Unknown output format {name!r}; available: {', '.join(_registry)}") from None
+
+
+def get_writer(name: str) -> Callable:
+    """Import (once) and return the writer for `name`."""
+    writer = _writers.get(name)
+    if writer is None:
+        module_name, _, func_name = get_format(name).target.partition(":")
+        writer = getattr(importlib.import_module(module_name), func_name)
+        with _lock:
+            _writers[name] = writer
+    return writer
+
+
+def resolve_formats(formats: Optional[Iterable[str]] = None) -> List[str]:
+    """Validate and de-duplicate `formats`, defaulting to OUTPUT_FORMATS."""
+    if formats is None:
+        formats = cfg.OUTPUT_FORMATS
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    names = list(dict.fromkeys(f.strip().lower() for f in formats if f and f.strip()))
+    for name in names:
+        get_format(name)
+    return names
+
+
+register_format("docx", "src.tools.doc_generator:generate_docx")
+register_format("pdf", "src.tools.pdf_renderer:render_document_pdf")
+register_format("md", "src.tools.text_formats:write_markdown", inline=True)
+register_format("html", "src.tools.text_formats:write_html", inline=True)
+register_format("json", "src.tools.text_formats:write_json", inline=True)
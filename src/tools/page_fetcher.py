@@ -0,0 +1,188 @@
+"""Concurrent page fetching and main-text extraction for search hits.
+
+Pages are downloaded in parallel on a bounded pool, streamed in chunks up to a
+per-page byte cap and fed straight into an incremental `html.parser` based
+extractor, so no full DOM is ever built. The whole stage runs under a deadline:
+pages that have not finished by then are cancelled and simply left out, so the
+slowest site never gates the report.
+"""
+import asyncio
+import codecs
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+from src.config import cfg
+from src.utils import http_client
+from src.utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+_SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside",
+              "form", "svg", "button", "select", "iframe", "template"}
+_BLOCK_TAGS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote",
+               "pre", "td", "dd", "figcaption", "article", "section", "div"}
+_VOID_TAGS = {"br", "img", "hr", "meta", "link", "input", "source", "wbr", "area", "base", "col", "embed"}
+
+
+class MainTextExtractor(HTMLParser):
+    """Collects readable passages from HTML fed in arbitrary chunks.
+
+    Text inside boilerplate containers (nav, footer, scripts...) is skipped;
+    everything else is split into passages at block-level tags and passages
+    shorter than `min_chars` (menus, buttons, bylines) are dropped.
+    """
+
+    def __init__(self, min_chars: int = 40, max_chars: int = 3000):
+        super().__init__(convert_charrefs=True)
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.passages: List[str] = []
+        self._total = 0
+        self._skip_depth = 0
+        self._buf: List[str] = []
+
+    @property
+    def full(self) -> bool:
+        return self._total >= self.max_chars
+
+    def _flush(self) -> None:
+        text = " ".join("".join(self._buf).split())
+        self._buf = []
+        if len(text) >= self.min_chars and not self.full:
+            text = text[: self.max_chars - self._total]
+            self.passages.append(text)
+            self._total += len(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            return
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS and self._skip_depth == 0:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS and self._skip_depth == 0:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip_depth == 0:
+            self._buf.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _is_html(content_type: str) -> bool:
+    return not content_type or "html" in content_type.lower()
+
+
+def fetch_page(url: str, max_bytes: Optional[int] = None, timeout: Optional[float] = None,
+               max_chars: Optional[int] = None, cancel: Optional[threading.Event] = None) -> Dict:
+    """Download up to `max_bytes` of `url` and extract its main-text passages.
+
+    Returns {"url", "passages", "bytes", "error"}. Stops early once enough text
+    was extracted or `cancel` is set.
+    """
+    max_bytes = max_bytes or cfg.FETCH_MAX_BYTES
+    extractor = MainTextExtractor(max_chars=max_chars or cfg.FETCH_MAX_CHARS)
+    received = 0
+    try:
+        resp = http_client.request("GET", url, stream=True, timeout=timeout or cfg.FETCH_TIMEOUT)
+        try:
+            if resp.status_code != 200 or not _is_html(resp.headers.get("Content-Type", "")):
+                return {"url": url, "passages": [], "bytes": 0, "error": f"status {resp.status_code}"}
+            decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+            for chunk in resp.iter_content(chunk_size=16384):
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if received >= max_bytes or extractor.full or (cancel is not None and cancel.is_set()):
+                    break
+        finally:
+            resp.close()
+        extractor.close()
+        return {"url": url, "passages": extractor.passages, "bytes": received, "error": None}
+    except Exception as e:
+        return {"url": url, "passages": extractor.passages, "bytes": received, "error": str(e)}
+
+
+def fetch_pages(urls: List[str], max_workers: Optional[int] = None,
+                deadline: Optional[float] = None, **kwargs) -> Dict[str, Dict]:
+    """Fetch `urls` concurrently; returns {url: result} for the pages done by `deadline` seconds."""
+    urls = list(dict.fromkeys(u for u in urls if u and u.startswith(("http://", "https://"))))
+    if not urls:
+        return {}
+    deadline = cfg.FETCH_DEADLINE if deadline is None else deadline
+    cancel = threading.Event()
+    with span("tool.fetch", urls=len(urls)) as sp:
+        pool = ThreadPoolExecutor(max_workers=min(len(urls), max_workers or cfg.FETCH_CONCURRENCY))
+        futures = {pool.submit(fetch_page, u, cancel=cancel, **kwargs): u for u in urls}
+        done, pending = wait(futures, timeout=deadline)
+        # Stragglers are told to stop and are not waited for
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        results = {futures[f]: f.result() for f in done}
+        sp.set("fetched", sum(1 for r in results.values() if r["passages"]))
+        sp.set("timed_out", len(pending))
+        sp.set("bytes", sum(r["bytes"] for r in results.values()))
+    return results
+
+
+async def afetch_page(url: str, max_bytes: Optional[int] = None, max_chars: Optional[int] = None) -> Dict:
+    max_bytes = max_bytes or cfg.FETCH_MAX_BYTES
+    extractor = MainTextExtractor(max_chars=max_chars or cfg.FETCH_MAX_CHARS)
+    received = 0
+    try:
+        client = http_client.get_async_client()
+        async with http_client.ahost_slot(url):
+            async with client.stream("GET", url, timeout=cfg.FETCH_TIMEOUT) as resp:
+                if resp.status_code != 200 or not _is_html(resp.headers.get("Content-Type", "")):
+                    return {"url": url, "passages": [], "bytes": 0, "error": f"status {resp.status_code}"}
+                decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+                async for chunk in resp.aiter_bytes(16384):
+                    received += len(chunk)
+                    extractor.feed(decoder.decode(chunk))
+                    if received >= max_bytes or extractor.full:
+                        break
+        extractor.close()
+        return {"url": url, "passages": extractor.passages, "bytes": received, "error": None}
+    except Exception as e:
+        return {"url": url, "passages": extractor.passages, "bytes": received, "error": str(e)}
+
+
+async def afetch_pages(urls: List[str], max_workers: Optional[int] = None,
+                       deadline: Optional[float] = None, **kwargs) -> Dict[str, Dict]:
+    """Async variant of `fetch_pages`; unfinished downloads are cancelled at the deadline."""
+    urls = list(dict.fromkeys(u for u in urls if u and u.startswith(("http://", "https://"))))
+    if not urls:
+        return {}
+    deadline = cfg.FETCH_DEADLINE if deadline is None else deadline
+    sem = asyncio.Semaphore(max_workers or cfg.FETCH_CONCURRENCY)
+
+    async def bounded(u: str) -> Dict:
+        async with sem:
+            return await afetch_page(u, **kwargs)
+
+    with span("tool.fetch", urls=len(urls)) as sp:
+        tasks = {asyncio.ensure_future(bounded(u)): u for u in urls}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        results = {tasks[t]: t.result() for t in done}
+        sp.set("fetched", sum(1 for r in results.values() if r["passages"]))
+        sp.set("timed_out", len(pending))
+        sp.set("bytes", sum(r["bytes"] for r in results.values()))
+    return results
+
+
+def page_text(result: Optional[Dict]) -> str:
+    """Join a fetch result's passages into one excerpt-ready string."""
+    if not result:
+        return ""
+    return "\n".join(result.get("passages", []))
@@ -0,0 +1,734 @@
+"""Streaming PDF renderer for research reports.
+
+A small pure-Python PDF writer built for long reports:
+
+* text is measured with the standard Helvetica/Helvetica-Bold metrics and word
+  widths are cached, so wrapping a paragraph costs one dictionary lookup per
+  word after warm-up;
+* characters the core fonts cannot encode (anything outside Windows-1252, e.g.
+  Amharic, Greek or CJK text) are set in the first TrueType font from
+  `PDF_FONTS` (default: common system fonts found on disk) that has a glyph for
+  them. Such a font is embedded whole, once per document, with its real glyph
+  widths and a ToUnicode map so the text can be searched and copied. Glyphs are
+  not shaped, so scripts that need shaping (Arabic, Indic) come out unjoined.
+  Characters no font covers are drawn as "?" and logged;
+* each paragraph is broken into lines in a separate pass before any drawing,
+  so layout decisions (page breaks, table row heights) see final line counts;
+* every page is compressed and written to the output file as soon as it is
+  full, so memory stays flat no matter how many pages the report has. Only the
+  byte offsets needed for the cross-reference table are kept;
+* tables (wrapped cells, bold header row, grid) and JPEG/PNG figures are
+  embedded inline and break across pages like any other block. A figure that
+  cannot be read or decoded is skipped with a warning.
+"""
+import logging
+import os
+import struct
+import zlib
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from src.config import cfg
+from src.tools.document_model import Document, build_document
+
+logger = logging.getLogger(__name__)
+
+LETTER = (612.0, 792.0)
+
+REGULAR = "Helvetica"
+BOLD = "Helvetica-Bold"
+
+# Advance widths (1/1000 em) of printable ASCII 32..126 from the Adobe core-font AFMs
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_FONT_WIDTHS = {
+    REGULAR: {chr(32 + i): w for i, w in enumerate(_HELVETICA_WIDTHS)},
+    BOLD: {chr(32 + i): w for i, w in enumerate(_HELVETICA_BOLD_WIDTHS)},
+}
+_FONT_RESOURCES = {REGULAR: "F1", BOLD: "F2"}
+_DEFAULT_WIDTH = 556  # non-ASCII glyphs: close to the average Helvetica advance
+# Characters the core fonts can show: WinAnsiEncoding is Windows-1252
+_WINANSI = frozenset(bytes(range(256)).decode("cp1252", errors="ignore"))
+
+# Unicode TrueType fonts tried when PDF_FONTS is empty (Debian/Ubuntu, Fedora/Arch, macOS, Windows)
+_SYSTEM_FONTS = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansEthiopic-Regular.ttf",
+    "/usr/share/fonts/truetype/freefont/FreeSerif.ttf",
+    "/usr/share/fonts/dejavu-sans-fonts/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arialuni.ttf",
+    "C:\\Windows\\Fonts\\nyala.ttf",
+)
+
+
+def _parse_cmap(cmap: bytes) -> Dict[int, int]:
+    """{code point: glyph id} from the font's Unicode (format 12 or 4) character map."""
+    subtables: Dict[int, int] = {}
+    for i in range(struct.unpack(">H", cmap[2:4])[0]):
+        platform, encoding, offset = struct.unpack(">HHI", cmap[4 + 8 * i:12 + 8 * i])
+        fmt = struct.unpack(">H", cmap[offset:offset + 2])[0]
+        if (platform == 0 or (platform == 3 and encoding in (1, 10))) and fmt in (4, 12):
+            subtables.setdefault(fmt, offset)
+    mapping: Dict[int, int] = {}
+    if 12 in subtables:
+        off = subtables[12]
+        for g in range(struct.unpack(">I", cmap[off + 12:off + 16])[0]):
+            start, end, gid = struct.unpack(">III", cmap[off + 16 + 12 * g:off + 28 + 12 * g])
+            mapping.update((cp, gid + cp - start) for cp in range(start, end + 1))
+    elif 4 in subtables:
+        off = subtables[4]
+        seg_x2 = struct.unpack(">H", cmap[off + 6:off + 8])[0]
+        segs = seg_x2 // 2
+        ends = struct.unpack(f">{segs}H", cmap[off + 14:off + 14 + seg_x2])
+        starts_at = off + 16 + seg_x2
+        starts = struct.unpack(f">{segs}H", cmap[starts_at:starts_at + seg_x2])
+        deltas = struct.unpack(f">{segs}H", cmap[starts_at + seg_x2:starts_at + 2 * seg_x2])
+        ranges_at = starts_at + 2 * seg_x2
+        ranges = struct.unpack(f">{segs}H", cmap[ranges_at:ranges_at + seg_x2])
+        for s in range(segs):
+            for cp in range(starts[s], min(ends[s], 0xFFFE) + 1):
+                if ranges[s]:
+                    at = ranges_at + 2 * s + ranges[s] + 2 * (cp - starts[s])
+                    gid = struct.unpack(">H", cmap[at:at + 2])[0]
+                    gid = (gid + deltas[s]) & 0xFFFF if gid else 0
+                else:
+                    gid = (cp + deltas[s]) & 0xFFFF
+                mapping[cp] = gid
+    else:
+        raise ValueError("font has no Unicode character map")
+    return {cp: gid for cp, gid in mapping.items() if gid}
+
+
+def _postscript_name(table: bytes) -> str:
+    if len(table) < 6:
+        return ""
+    count, strings = struct.unpack(">HH", table[2:6])
+    for i in range(count):
+        platform, _, _, name_id, length, offset = struct.unpack(">6H", table[6 + 12 * i:18 + 12 * i])
+        if name_id == 6:
+            raw = table[strings + offset:strings + offset + length]
+            name = raw.decode("utf-16-be" if platform in (0, 3) else "latin-1", errors="ignore")
+            return "".join(c for c in name if c.isalnum() or c in "-_")
+    return ""
+
+
+class TrueTypeFont:
+    """Character map and metrics of a TrueType font file, enough to embed it whole.
+
+    Only single fonts with TrueType outlines are supported; collections (.ttc)
+    and CFF-flavoured OpenType fonts raise ValueError.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        data = self.data
+        if data[:4] not in (b"\x00\x01\x00\x00", b"true"):
+            raise ValueError("not a TrueType font (collections and CFF outlines are not supported)")
+        tables = {}
+        for i in range(struct.unpack(">H", data[4:6])[0]):
+            tag, _, offset, length = struct.unpack(">4sIII", data[12 + 16 * i:28 + 16 * i])
+            tables[tag] = data[offset:offset + length]
+        missing = [tag.decode() for tag in (b"head", b"hhea", b"hmtx", b"cmap", b"glyf") if tag not in tables]
+        if missing:
+            raise ValueError(f"font has no {', '.join(missing)} table")
+        self.path = path
+        units_per_em = struct.unpack(">H", tables[b"head"][18:20])[0] or 1000
+        self.scale = 1000.0 / units_per_em
+        self.bbox = tuple(round(v * self.scale) for v in struct.unpack(">4h", tables[b"head"][36:44]))
+        ascent, descent = struct.unpack(">hh", tables[b"hhea"][4:8])
+        self.ascent, self.descent = round(ascent * self.scale), round(descent * self.scale)
+        n_metrics = struct.unpack(">H", tables[b"hhea"][34:36])[0]
+        self._advances = struct.unpack(f">{2 * n_metrics}H", tables[b"hmtx"][:4 * n_metrics])[0::2]
+        self.cmap = _parse_cmap(tables[b"cmap"])
+        name = _postscript_name(tables.get(b"name", b"")) or os.path.splitext(os.path.basename(path))[0]
+        self.name = "".join(c for c in name if c.isalnum() or c in "-_") or "Embedded"
+
+    def units(self, gid: int) -> int:
+        """Advance width of glyph `gid` in 1/1000 em."""
+        if not self._advances:
+            return _DEFAULT_WIDTH
+        return round(self._advances[min(gid, len(self._advances) - 1)] * self.scale)
+
+
+@lru_cache(maxsize=8)
+def _load_fonts(paths: Tuple[str, ...]) -> Tuple[TrueTypeFont, ...]:
+    fonts = []
+    for path in paths or tuple(p for p in _SYSTEM_FONTS if os.path.exists(p)):
+        try:
+            fonts.append(TrueTypeFont(path))
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Ignoring PDF font {path}: {e}")
+    return tuple(fonts)
+
+
+def unicode_fonts() -> Tuple[TrueTypeFont, ...]:
+    """Fallback fonts for text outside Windows-1252: PDF_FONTS, else the system fonts found."""
+    return _load_fonts(tuple(cfg.PDF_FONTS))
+
+
+@lru_cache(maxsize=16384)
+def _font_for(ch: str, fonts: Tuple[TrueTypeFont, ...]) -> Optional[int]:
+    """Index in `fonts` of the font to set `ch` in, or None for the core font."""
+    if ch in _WINANSI:
+        return None
+    code = ord(ch)
+    for i, font in enumerate(fonts):
+        if code in font.cmap:
+            return i
+    return None
+
+
+@lru_cache(maxsize=65536)
+def _word_units(word: str, font: str, fonts: Tuple[TrueTypeFont, ...] = ()) -> int:
+    widths = _FONT_WIDTHS[font]
+    if word.isascii():
+        return sum(widths.get(ch, _DEFAULT_WIDTH) for ch in word)
+    total = 0
+    for ch in word:
+        i = _font_for(ch, fonts)
+        total += widths.get(ch, _DEFAULT_WIDTH) if i is None else fonts[i].units(fonts[i].cmap[ord(ch)])
+    return total
+
+
+def string_width(text: str, font: str = REGULAR, size: float = 10.0) -> float:
+    """Width of `text` in points when set in `font` at `size`."""
+    return _word_units(text, font, unicode_fonts()) * size / 1000.0
+
+
+def wrap_text(text: str, max_width: float, font: str = REGULAR, size: float = 10.0) -> List[str]:
+    """Greedy line breaking of `text` into lines no wider than `max_width` points.
+
+    Explicit newlines start a new line; words longer than a full line are split
+    by characters.
+    """
+    fonts = unicode_fonts()
+    scale = size / 1000.0
+    space = _word_units(" ", font, fonts) * scale
+    lines: List[str] = []
+    for para in str(text).split("\n"):
+        words = para.split()
+        if not words:
+            lines.append("")
+            continue
+        current: List[str] = []
+        width = 0.0
+        for word in words:
+            w = _word_units(word, font, fonts) * scale
+            if w > max_width:
+                if current:
+                    lines.append(" ".join(current))
+                    current, width = [], 0.0
+                # Unspaced scripts (CJK) arrive as one long word: split it in one pass
+                piece, w = "", 0.0
+                for ch in word:
+                    cw = _word_units(ch, font, fonts) * scale
+                    if piece and w + cw > max_width:
+                        lines.append(piece)
+                        piece, w = "", 0.0
+                    piece += ch
+                    w += cw
+                word = piece
+            if current and width + space + w > max_width:
+                lines.append(" ".join(current))
+                current, width = [word], w
+            else:
+                width += (space if current else 0.0) + w
+                current.append(word)
+        lines.append(" ".join(current))
+    return lines
+
+
+def _text_runs(text: str, fonts: Tuple[TrueTypeFont, ...]) -> List[Tuple[Optional[int], str]]:
+    """Split `text` into (font index or None for the core font, text) runs."""
+    runs: List[Tuple[Optional[int], List[str]]] = []
+    for ch in text:
+        i = _font_for(ch, fonts)
+        if runs and runs[-1][0] == i:
+            runs[-1][1].append(ch)
+        else:
+            runs.append((i, [ch]))
+    return [(i, "".join(chars)) for i, chars in runs]
+
+
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _to_unicode_cmap(glyphs: Dict[int, str]) -> bytes:
+    """ToUnicode CMap mapping the 2-byte glyph ids of an Identity-H font back to text."""
+    entries = sorted(glyphs.items())
+    out = [b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+           b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+           b"/CMapName /Adobe-Identity-UCS def /CMapType 2 def",
+           b"1 begincodespacerange <0000> <FFFF> endcodespacerange"]
+    for start in range(0, len(entries), 100):
+        chunk = entries[start:start + 100]
+        out.append(b"%d beginbfchar" % len(chunk))
+        out.extend(b"<%04X> <%s>" % (gid, ch.encode("utf-16-be").hex().upper().encode()) for gid, ch in chunk)
+        out.append(b"endbfchar")
+    out.append(b"endcmap CMapName currentdict /CMap defineresource pop end end")
+    return b"\n".join(out)
+
+
+def _jpeg_info(data: bytes) -> Tuple[int, int, int]:
+    """(width, height, components) from a baseline or progressive JPEG header."""
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("only JPEG figures are supported")
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height, data[i + 9]
+        i += 2 + length
+    raise ValueError("JPEG has no frame header")
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Samples per pixel by PNG color type (gray, RGB, palette, gray+alpha, RGBA)
+_PNG_COLORS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _png_info(data: bytes) -> Tuple[int, int, int, int, bytes, bytes]:
+    """(width, height, bit depth, color type, palette, zlib image data) of a PNG."""
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("only JPEG and PNG figures are supported")
+    header, palette, idat = None, b"", []
+    i = 8
+    while i + 8 <= len(data):
+        length, kind = struct.unpack(">I4s", data[i:i + 8])
+        body = data[i + 8:i + 8 + length]
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body[:13])
+        elif kind == b"PLTE":
+            palette = body
+        elif kind == b"IDAT":
+            idat.append(body)
+        elif kind == b"IEND":
+            break
+        i += 12 + length
+    if header is None or not idat:
+        raise ValueError("PNG has no image data")
+    width, height, depth, color_type, _, _, interlace = header
+    if interlace:
+        raise ValueError("interlaced PNG figures are not supported")
+    if color_type not in _PNG_COLORS or (color_type == 3 and not palette):
+        raise ValueError(f"unsupported PNG color type {color_type}")
+    return width, height, depth, color_type, palette, b"".join(idat)
+
+
+def _png_unfilter(raw: bytes, stride: int, bpp: int) -> bytearray:
+    """Undo PNG's per-row filters; returns the raw samples without filter bytes."""
+    out = bytearray()
+    prev = bytearray(stride)
+    for pos in range(0, len(raw), stride + 1):
+        kind, line = raw[pos], bytearray(raw[pos + 1:pos + 1 + stride])
+        if len(line) != stride:
+            raise ValueError("truncated PNG image data")
+        if kind == 1:
+            for i in range(bpp, stride):
+                line[i] = (line[i] + line[i - bpp]) & 0xFF
+        elif kind == 2:
+            for i in range(stride):
+                line[i] = (line[i] + prev[i]) & 0xFF
+        elif kind == 3:
+            for i in range(stride):
+                left = line[i - bpp] if i >= bpp else 0
+                line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+        elif kind == 4:
+            for i in range(stride):
+                a = line[i - bpp] if i >= bpp else 0
+                b, c = prev[i], prev[i - bpp] if i >= bpp else 0
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                line[i] = (line[i] + (a if pa <= pb and pa <= pc else b if pb <= pc else c)) & 0xFF
+        elif kind != 0:
+            raise ValueError(f"bad PNG filter type {kind}")
+        out += line
+        prev = line
+    return out
+
+
+class PDFRenderer:
+    """Flowing-layout PDF writer that flushes each finished page to `fp`.
+
+    Use as a context manager (or call `close()`) so the trailer is written.
+    """
+
+    def __init__(self, fp: BinaryIO, page_size: Tuple[float, float] = LETTER,
+                 margin: float = 50.0, compress: bool = True):
+        self.fp = fp
+        self.width, self.height = page_size
+        self.margin = margin
+        self.compress = compress
+        self.frame_width = self.width - 2 * margin
+        self.page_count = 0
+        self._offsets: Dict[int, int] = {}
+        self._page_refs: List[int] = []
+        self._next_obj = 5  # 1 catalog, 2 page tree, 3-4 fonts
+        self._ops: List[bytes] = []
+        self._page_images: Dict[str, int] = {}
+        self._image_count = 0
+        # Embedded TrueType fonts: font index -> (Type0 object, {glyph id: character})
+        self._fonts = unicode_fonts()
+        self._embedded: Dict[int, Tuple[int, Dict[int, str]]] = {}
+        self._page_fonts: Dict[str, int] = {}
+        self._missing: Set[str] = set()
+        self._y = self.height - margin
+        self._closed = False
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # -------------------------
+    # Low-level output
+    # -------------------------
+    def _write(self, data: bytes) -> None:
+        self.fp.write(data)
+
+    def _tell(self) -> int:
+        return self.fp.tell()
+
+    def _alloc(self) -> int:
+        num = self._next_obj
+        self._next_obj += 1
+        return num
+
+    def _write_obj(self, num: int, body: bytes, stream: Optional[bytes] = None) -> None:
+        self._offsets[num] = self._tell()
+        self._write(b"%d 0 obj\n" % num + body)
+        if stream is not None:
+            self._write(b"\nstream\n" + stream + b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def _stream_obj(self, num: int, data: bytes, extra: bytes = b"") -> None:
+        if self.compress:
+            data = zlib.compress(data, 6)
+            extra += b" /Filter /FlateDecode"
+        self._write_obj(num, b"<< /Length %d%s >>" % (len(data), extra), data)
+
+    # -------------------------
+    # Pages
+    # -------------------------
+    def _flush_page(self) -> None:
+        content = self._alloc()
+        page = self._alloc()
+        self._stream_obj(content, b"\n".join(self._ops))
+        fonts = b" ".join([b"/%s %d 0 R" % (name.encode(), 3 + i)
+                           for i, name in enumerate(_FONT_RESOURCES.values())]
+                          + [b"/%s %d 0 R" % (name.encode(), num) for name, num in self._page_fonts.items()])
+        xobjects = b""
+        if self._page_images:
+            xobjects = b" /XObject << " + b" ".join(
+                b"/%s %d 0 R" % (name.encode(), num) for name, num in self._page_images.items()) + b" >>"
+        self._write_obj(page, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Contents %d 0 R /Resources << /Font << %s >>%s >> >>"
+        ) % (self.width, self.height, content, fonts, xobjects))
+        self._page_refs.append(page)
+        self.page_count += 1
+        self._ops = []
+        self._page_images = {}
+        self._page_fonts = {}
+        self._y = self.height - self.margin
+
+    def new_page(self) -> None:
+        self._flush_page()
+
+    def _ensure(self, height: float) -> None:
+        """Start a new page unless `height` points still fit above the bottom margin."""
+        if self._y - height < self.margin and self._y < self.height - self.margin:
+            self._flush_page()
+
+    def _text(self, x: float, y: float, text: str, font: str, size: float) -> None:
+        if text.isascii():
+            self._ops.append(b"BT /%s %.1f Tf %.2f %.2f Td %s Tj ET"
+                             % (_FONT_RESOURCES[font].encode(), size, x, y, _pdf_string(text)))
+            return
+        ops = [b"BT %.2f %.2f Td" % (x, y)]
+        for i, run in _text_runs(text, self._fonts):
+            if i is None:
+                self._missing.update(ch for ch in run if ch not in _WINANSI)
+                ops.append(b"/%s %.1f Tf %s Tj" % (_FONT_RESOURCES[font].encode(), size, _pdf_string(run)))
+                continue
+            # One embedded font serves both weights; bold is drawn with a thin outline
+            ops.append(b"/%s %.1f Tf %s<%s> Tj%s" % (
+                self._use_font(i).encode(), size,
+                b"2 Tr %.2f w " % (size * 0.03) if font == BOLD else b"",
+                self._glyph_string(i, run), b" 0 Tr" if font == BOLD else b""))
+        ops.append(b"ET")
+        self._ops.append(b" ".join(ops))
+
+    def _use_font(self, i: int) -> str:
+        """Resource name of embedded font `i`, registering it on this page (and document)."""
+        if i not in self._embedded:
+            self._embedded[i] = (self._alloc(), {})
+        name = f"T{i + 1}"
+        self._page_fonts[name] = self._embedded[i][0]
+        return name
+
+    def _glyph_string(self, i: int, text: str) -> bytes:
+        """Hex string of the 2-byte glyph ids of `text` in embedded font `i`."""
+        cmap, used = self._fonts[i].cmap, self._embedded[i][1]
+        gids = []
+        for ch in text:
+            gid = cmap[ord(ch)]
+            used.setdefault(gid, ch)
+            gids.append(gid)
+        return b"".join(b"%04X" % gid for gid in gids)
+
+    def _lines(self, lines: Iterable[str], font: str, size: float, leading: float,
+               x: float, x_first: Optional[float] = None, first_prefix: str = "") -> None:
+        for i, line in enumerate(lines):
+            self._ensure(leading)
+            self._y -= leading
+            if i == 0 and first_prefix:
+                self._text(x_first if x_first is not None else x, self._y, first_prefix, font, size)
+            self._text(x, self._y, line, font, size)
+
+    # -------------------------
+    # Blocks
+    # -------------------------
+    def spacer(self, height: float) -> None:
+        if self._y < self.height - self.margin:
+            self._y -= height
+
+    def heading(self, text: str, level: int = 1) -> None:
+        size = {0: 16.0, 1: 12.0}.get(level, 11.0)
+        leading = size * 1.25
+        lines = wrap_text(text, self.frame_width, BOLD, size)
+        # Keep a heading together with at least two lines of what follows
+        self._ensure(leading * len(lines) + 30)
+        self.spacer(size * 0.5)
+        self._lines(lines, BOLD, size, leading, self.margin)
+        self.spacer(size * 0.4)
+
+    def paragraph(self, text: str, size: float = 10.0, bullet: bool = False) -> None:
+        leading = size * 1.2
+        indent = 14.0 if bullet else 0.0
+        lines = wrap_text(text, self.frame_width - indent, REGULAR, size)
+        self._lines(lines, REGULAR, size, leading, self.margin + indent,
+                    x_first=self.margin + 4, first_prefix="-" if bullet else "")
+        self.spacer(size * 0.4)
+
+    def table(self, rows: Sequence[Sequence], header: bool = True, size: float = 9.0,
+              col_widths: Optional[Sequence[float]] = None) -> None:
+        """Draw `rows` as a grid; the header row is bold and repeated after page breaks."""
+        rows = [[str(c) for c in row] for row in rows if row]
+        if not rows:
+            return
+        ncols = max(len(r) for r in rows)
+        rows = [r + [""] * (ncols - len(r)) for r in rows]
+        if col_widths is None:
+            # Share the frame width in proportion to each column's longest cell (capped)
+            natural = [max(min(string_width(r[c], REGULAR, size), 200.0) for r in rows) + 8 for c in range(ncols)]
+            total = sum(natural) or 1.0
+            col_widths = [self.frame_width * n / total for n in natural]
+        pad, leading = 3.0, size * 1.2
+
+        laid_out = []
+        for r, row in enumerate(rows):
+            font = BOLD if header and r == 0 else REGULAR
+            cells = [wrap_text(cell, max(col_widths[c] - 2 * pad, 10.0), font, size) for c, cell in enumerate(row)]
+            height = max(len(lines) for lines in cells) * leading + 2 * pad
+            laid_out.append((font, cells, height))
+
+        self.spacer(4)
+        for r, (font, cells, height) in enumerate(laid_out):
+            if self._y - height < self.margin and self._y < self.height - self.margin:
+                self._flush_page()
+                if header and r > 0:
+                    self._table_row(*laid_out[0], col_widths, pad, leading, size)
+            self._table_row(font, cells, height, col_widths, pad, leading, size)
+        self.spacer(8)
+
+    def _table_row(self, font, cells, height, col_widths, pad, leading, size) -> None:
+        top = self._y
+        x = self.margin
+        for c, lines in enumerate(cells):
+            self._ops.append(b"%.2f %.2f %.2f %.2f re S" % (x, top - height, col_widths[c], height))
+            y = top - pad
+            for line in lines:
+                y -= leading
+                self._text(x + pad, y + (leading - size) / 2, line, font, size)
+            x += col_widths[c]
+        self._y = top - height
+
+    def _jpeg_xobject(self, data: bytes) -> Tuple[int, int, int]:
+        px_w, px_h, components = _jpeg_info(data)
+        num = self._alloc()
+        colorspace = {1: b"/DeviceGray", 4: b"/DeviceCMYK"}.get(components, b"/DeviceRGB")
+        extra = b" /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s /BitsPerComponent 8 /Filter /DCTDecode" % (
+            px_w, px_h, colorspace)
+        if components == 4:
+            extra += b" /Decode [1 0 1 0 1 0 1 0]"
+        # JPEG data is already compressed: write it as-is
+        self._write_obj(num, b"<< /Length %d%s >>" % (len(data), extra), data)
+        return num, px_w, px_h
+
+    def _png_xobject(self, data: bytes) -> Tuple[int, int, int]:
+        px_w, px_h, depth, color_type, palette, idat = _png_info(data)
+        colors = _PNG_COLORS[color_type]
+        if color_type == 3:
+            colorspace = b"[/Indexed /DeviceRGB %d <%s>]" % (len(palette) // 3 - 1, palette.hex().encode())
+        else:
+            colorspace = b"/DeviceGray" if color_type in (0, 4) else b"/DeviceRGB"
+        image = b" /Type /XObject /Subtype /Image /Width %d /Height %d" % (px_w, px_h)
+        if color_type in (4, 6):
+            # PDF has no alpha channel: split it out into a soft mask
+            if depth != 8:
+                raise ValueError("only 8-bit PNG figures with transparency are supported")
+            pixels = _png_unfilter(zlib.decompress(idat), px_w * colors, colors)
+            alpha = bytes(pixels[colors - 1::colors])
+            del pixels[colors - 1::colors]
+            smask = self._alloc()
+            self._stream_obj(smask, alpha, image + b" /ColorSpace /DeviceGray /BitsPerComponent 8")
+            num = self._alloc()
+            self._stream_obj(num, bytes(pixels), image + b" /ColorSpace %s /BitsPerComponent 8 /SMask %d 0 R"
+                             % (colorspace, smask))
+            return num, px_w, px_h
+        # Opaque PNG data is already Flate with PNG predictors, which PDF decodes natively
+        num = self._alloc()
+        extra = image + (b" /ColorSpace %s /BitsPerComponent %d /Filter /FlateDecode"
+                         b" /DecodeParms << /Predictor 15 /Colors %d /BitsPerComponent %d /Columns %d >>"
+                         % (colorspace, depth, colors, depth, px_w))
+        self._write_obj(num, b"<< /Length %d%s >>" % (len(idat), extra), idat)
+        return num, px_w, px_h
+
+    def image(self, source: Union[str, bytes], width: Optional[float] = None,
+              caption: str = "") -> None:
+        """Embed a JPEG or PNG figure (path or bytes), scaled to `width` points or the frame width.
+
+        The image is fully parsed before anything is written, so a ValueError
+        leaves the document unchanged.
+        """
+        data = source if isinstance(source, bytes) else open(source, "rb").read()
+        if data[:8] == PNG_SIGNATURE:
+            num, px_w, px_h = self._png_xobject(data)
+        else:
+            num, px_w, px_h = self._jpeg_xobject(data)
+        width = min(width or self.frame_width, self.frame_width)
+        height = width * px_h / px_w
+        max_height = self.height - 2 * self.margin - 20
+        if height > max_height:
+            width, height = width * max_height / height, max_height
+
+        self._ensure(height + 6)
+        self._image_count += 1
+        name = f"Im{self._image_count}"
+        self._page_images[name] = num
+        self._y -= height
+        x = self.margin + (self.frame_width - width) / 2
+        self._ops.append(b"q %.2f 0 0 %.2f %.2f %.2f cm /%s Do Q" % (width, height, x, self._y, name.encode()))
+        self.spacer(4)
+        if caption:
+            self.paragraph(caption, size=9.0)
+
+    # -------------------------
+    # Finish
+    # -------------------------
+    def close(self) -> None:
+        if self._closed:
+            return
+        if self._ops or not self._page_refs:
+            self._flush_page()
+        for i, name in enumerate(_FONT_RESOURCES):
+            self._write_obj(3 + i, b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+                            % name.encode())
+        for i, (num, glyphs) in self._embedded.items():
+            self._write_truetype(self._fonts[i], num, glyphs)
+        if self._missing:
+            logger.warning(f"No PDF font has glyphs for {len(self._missing)} character(s) "
+                           f"({''.join(sorted(self._missing)[:20])}); they were drawn as '?'. "
+                           f"Point PDF_FONTS at a TrueType font that covers them.")
+        kids = b" ".join(b"%d 0 R" % p for p in self._page_refs)
+        self._write_obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._page_refs)))
+        self._write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_at = self._tell()
+        size = self._next_obj
+        entries = [b"0000000000 65535 f \n"]
+        for num in range(1, size):
+            entries.append(b"%010d 00000 n \n" % self._offsets[num])
+        self._write(b"xref\n0 %d\n" % size + b"".join(entries))
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_at))
+        self._closed = True
+
+    def _write_truetype(self, font: TrueTypeFont, num: int, glyphs: Dict[int, str]) -> None:
+        """Embed `font` whole as a Type0/CIDFontType2 font addressed by glyph id."""
+        descendant, descriptor, font_file, to_unicode = (self._alloc() for _ in range(4))
+        name = font.name.encode()
+        self._stream_obj(font_file, font.data, b" /Length1 %d" % len(font.data))
+        self._write_obj(descriptor, (
+            b"<< /Type /FontDescriptor /FontName /%s /Flags 4 /FontBBox [%d %d %d %d] /ItalicAngle 0 "
+            b"/Ascent %d /Descent %d /CapHeight %d /StemV 80 /FontFile2 %d 0 R >>"
+        ) % ((name,) + font.bbox + (font.ascent, font.descent, font.ascent, font_file)))
+        widths = b" ".join(b"%d [%d]" % (gid, font.units(gid)) for gid in sorted(glyphs))
+        self._write_obj(descendant, (
+            b"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s "
+            b"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            b"/FontDescriptor %d 0 R /CIDToGIDMap /Identity /W [%s] >>"
+        ) % (name, descriptor, widths))
+        self._stream_obj(to_unicode, _to_unicode_cmap(glyphs))
+        self._write_obj(num, b"<< /Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H "
+                             b"/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>" % (name, descendant, to_unicode))
+
+    def __enter__(self) -> "PDFRenderer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def render_document_pdf(doc: Document, out_path: str) -> str:
+    """Render a `Document` to `out_path`, one page at a time."""
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "wb") as fp, PDFRenderer(fp) as pdf:
+        pdf.heading(doc.title, level=0)
+        if doc.summary:
+            pdf.paragraph(doc.summary, size=11.0)
+        for block in doc.blocks:
+            if block.kind == "heading":
+                pdf.heading(block.text, level=block.level)
+            elif block.kind == "paragraph":
+                pdf.paragraph(block.text)
+            elif block.kind == "bullets":
+                for item in block.items:
+                    pdf.paragraph(item, bullet=True)
+            elif block.kind == "table":
+                pdf.table(block.rows)
+            elif block.kind == "figure":
+                try:
+                    pdf.image(block.path, caption=block.caption)
+                except (OSError, ValueError, zlib.error, struct.error) as e:
+                    logger.warning(f"Skipping figure {block.path}: {e}")
+    return out_path
+
+
+def render_report_pdf(report: Dict, out_path: str) -> str:
+    """Render a structured report dict (see `build_document` for the accepted keys)."""
+    return render_document_pdf(build_document(report), out_path)
@@ -0,0 +1,223 @@
+"""Similarity index over past research outputs for cross-topic reuse.
+
+Near-duplicate topics ("AI in healthcare", "AI applications in health care")
+should not each pay for a full search and LLM run. Every finished research
+result (topic, hits, excerpts, key points) is stored with a hashed feature
+vector of its topic: word unigrams plus character trigrams of the joined words
+(so "health care" and "healthcare" overlap), log-scaled and L2-normalized into
+`DIMENSIONS` buckets. `nearest` returns the most similar fresh-enough entry by
+cosine similarity.
+
+Scoring is one matrix-vector product with NumPy when it is installed (the
+matrix is kept in memory; rows added since the last query are appended with
+`np.vstack` and pruned ones sliced off, so it is never rebuilt from scratch)
+and a sparse dot product
+in plain Python otherwise. Brute force is plenty for the RESEARCH_INDEX_MAX_ENTRIES
+entries the index keeps. Entries live in one SQLite file (WAL mode) shared by
+worker processes; each process picks up rows added by the others on its next
+query.
+"""
+import bisect
+import importlib.util
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.config import cfg
+
+logger = logging.getLogger(__name__)
+
+# NumPy is only imported the first time the vectorized path runs
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+_np = None
+
+DIMENSIONS = 1 << 10
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset("a an and the of in on for to with by at from about into its is are".split())
+
+
+def _numpy():
+    global _np
+    if _np is None:
+        import numpy  # type: ignore
+        _np = numpy
+    return _np
+
+
+def _words(topic: str) -> List[str]:
+    words = [w for w in _WORD_RE.findall(topic.casefold()) if w not in _STOPWORDS]
+    # Crude plural folding is enough for short topic strings
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+
+
+def topic_vector(topic: str) -> Dict[int, float]:
+    """Sparse, L2-normalized hashed feature vector {bucket: weight} of a topic string."""
+    words = _words(topic)
+    features = Counter(f"w:{w}" for w in words)
+    joined = f"#{''.join(words)}#"
+    features.update(f"c:{joined[i:i + 3]}" for i in range(len(joined) - 2))
+    vector: Dict[int, float] = {}
+    for feature, count in features.items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        # Signed hashing keeps bucket collisions from only ever adding similarity
+        sign = 1.0 if h & 0x80000000 else -1.0
+        bucket = h % DIMENSIONS
+        vector[bucket] = vector.get(bucket, 0.0) + sign * (1.0 + math.log(count))
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {k: v / norm for k, v in vector.items() if v} if norm else {}
+
+
+def _dot(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+@dataclass
+class ResearchMatch:
+    topic: str
+    similarity: float
+    created: float
+    research: Dict
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created
+
+
+class ResearchIndex:
+    def __init__(self, path: str, max_entries: int = 2000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        # In-memory copy of the vectors: ids, topics, created times, sparse vectors
+        self._ids: List[int] = []
+        self._topics: List[str] = []
+        self._created: List[float] = []
+        self._vectors: List[Dict[int, float]] = []
+        self._matrix = None
+        self._last_id = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork; reopen in each process.
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS research ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, created REAL NOT NULL,"
+                " vector TEXT NOT NULL, research TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _refresh(self, conn: sqlite3.Connection) -> None:
+        """Under the lock: sync the in-memory copy with rows added or pruned by any process."""
+        min_id = conn.execute("SELECT MIN(id) FROM research").fetchone()[0] or 0
+        cut = bisect.bisect_left(self._ids, min_id)
+        if cut:
+            del self._ids[:cut], self._topics[:cut], self._created[:cut], self._vectors[:cut]
+            if self._matrix is not None:
+                # Rows mirror _vectors[:len(matrix)]; drop the pruned prefix
+                self._matrix = self._matrix[cut:] if cut <= self._matrix.shape[0] else None
+        rows = conn.execute("SELECT id, topic, created, vector FROM research WHERE id > ? ORDER BY id",
+                            (self._last_id,)).fetchall()
+        if not rows:
+            return
+        for row_id, topic, created, vector in rows:
+            self._ids.append(row_id)
+            self._topics.append(topic)
+            self._created.append(created)
+            self._vectors.append({int(k): v for k, v in json.loads(vector).items()})
+        self._last_id = rows[-1][0]
+
+    def _scores(self, query: Dict[int, float]) -> List[float]:
+        if NUMPY_AVAILABLE:
+            np = _numpy()
+            have = 0 if self._matrix is None else self._matrix.shape[0]
+            if have < len(self._vectors):
+                rows = np.zeros((len(self._vectors) - have, DIMENSIONS), dtype=np.float32)
+                for i, vector in enumerate(self._vectors[have:]):
+                    rows[i, list(vector)] = list(vector.values())
+                self._matrix = rows if self._matrix is None else np.vstack((self._matrix, rows))
+            q = np.zeros(DIMENSIONS, dtype=np.float32)
+            q[list(query)] = list(query.values())
+            return (self._matrix @ q).tolist()
+        return [_dot(query, vector) for vector in self._vectors]
+
+    def nearest(self, topic: str, max_age: Optional[float] = None) -> Optional[ResearchMatch]:
+        """The most similar stored research no older than `max_age` seconds, or None."""
+        query = topic_vector(topic)
+        if not query:
+            return None
+        with self._lock:
+            try:
+                conn = self._connect()
+                self._refresh(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"Research index read failed: {e}")
+                return None
+            if not self._vectors:
+                return None
+            oldest = time.time() - max_age if max_age else 0.0
+            best: Optional[Tuple[float, int]] = None
+            for i, score in enumerate(self._scores(query)):
+                if self._created[i] >= oldest and (best is None or score > best[0]):
+                    best = (score, i)
+            if best is None:
+                return None
+            score, i = best
+            matched, created = self._topics[i], self._created[i]
+            row = conn.execute("SELECT research FROM research WHERE id = ?", (self._ids[i],)).fetchone()
+        if row is None:  # pruned by another process meanwhile
+            return None
+        return ResearchMatch(matched, round(float(score), 4), created, json.loads(row[0]))
+
+    def add(self, topic: str, research: Dict) -> None:
+        vector = topic_vector(topic)
+        if not vector:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("INSERT INTO research (topic, created, vector, research) VALUES (?, ?, ?, ?)",
+                             (topic, time.time(), json.dumps(vector),
+                              json.dumps(research, ensure_ascii=False, default=str)))
+                if self.max_entries > 0:
+                    conn.execute("DELETE FROM research WHERE id NOT IN"
+                                 " (SELECT id FROM research ORDER BY id DESC LIMIT ?)", (self.max_entries,))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Research index write failed for {topic!r}: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM research").fetchone()[0]
+
+
+# Singleton accessor
+_default_index: Optional[ResearchIndex] = None
+
+
+def get_default_index() -> Optional[ResearchIndex]:
+    """Return the shared index, or None when RESEARCH_INDEX_PATH is empty (reuse disabled)."""
+    global _default_index
+    if _default_index is None and cfg.RESEARCH_INDEX_PATH:
+        _default_index = ResearchIndex(cfg.RESEARCH_INDEX_PATH, cfg.RESEARCH_INDEX_MAX_ENTRIES)
+    return _default_index
@@ -1,12 +1,162 @@
+"""Key-point extraction over research excerpts.
 
+Small inputs are summarized in a single prompt packed into the context token
+budget. Inputs larger than that budget go through a hierarchical map-reduce:
+chunk groups that each fit one prompt are summarized in parallel (map), then the
+partial bullet lists are merged `SUMMARIZER_FANOUT` at a time until one list is
+left or `SUMMARIZER_MAX_DEPTH` is reached (reduce). Every map and reduce prompt
+is deterministic, so each result is cached on its own by the LLM cache.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from src.config import cfg
+from src.tools.context_packer import estimate_tokens, pack_context
+from src.utils.instrumentation import span
 from src.utils.llm_client import get_default_client
-from typing import List
 
-llm = get_default_client()
+# "auto" switches to map-reduce only when the excerpts exceed one prompt's budget
+SUMMARIZER_MODES = ("auto", "single", "map_reduce")
+
 
-def extract_key_points(texts: List[str], max_points: int = 8) -> str:
+def _build_prompt(texts: List[str], max_points: int, query: str = "",
+                  token_budget: Optional[int] = None) -> str:
+    # Bound the prompt: chunk, dedupe and rank the excerpts into the token budget
+    texts = pack_context(texts, query=query, token_budget=token_budget)
     prompt = "Extract top insights/facts from the following excerpts as numbered bullets:\n"
     for i, t in enumerate(texts, start=1):
         prompt += f"--- EXCERPT {i} ---\n{t}\n\n"
     prompt += f"Return max {max_points} concise bullets."
-    return llm.generate_text(prompt, temperature=0.0, max_tokens=800)
+    return prompt
+
+
+def _build_reduce_prompt(partials: List[str], max_points: int) -> str:
+    prompt = ("Extract the most important insights from these partial bullet lists, "
+              "merging duplicates and keeping concrete facts and figures:\n")
+    for i, p in enumerate(partials, start=1):
+        prompt += f"--- EXCERPT {i} (partial bullets) ---\n{p}\n\n"
+    prompt += f"Return max {max_points} concise bullets."
+    return prompt
+
+
+def _map_groups(texts: List[str], query: str, token_budget: Optional[int],
+                mode: Optional[str]) -> Optional[List[List[str]]]:
+    """Chunk groups for the map stage, or None when a single prompt is enough."""
+    budget = token_budget or cfg.CONTEXT_TOKEN_BUDGET
+    mode = mode if mode in SUMMARIZER_MODES else cfg.SUMMARIZER_MODE
+    if mode == "single":
+        return None
+    if mode == "auto" and sum(estimate_tokens(t) for t in texts) <= budget:
+        return None
+
+    chunks = pack_context(texts, query=query,
+                          token_budget=max(cfg.SUMMARIZER_TOTAL_BUDGET, budget))
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk)
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(chunk)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups if len(groups) > 1 else None
+
+
+def _generate(prompt: str) -> str:
+    return get_default_client().generate_text(prompt, temperature=0.0, max_tokens=800, task="key_points")
+
+
+def _run_parallel(prompts: List[str]) -> List[str]:
+    if len(prompts) == 1:
+        return [_generate(prompts[0])]
+    workers = max(1, min(len(prompts), cfg.SUMMARIZER_MAP_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Copy the context per task so LLM spans still land in the caller's trace
+        futures = [pool.submit(contextvars.copy_context().run, _generate, p) for p in prompts]
+        return [f.result() for f in futures]
+
+
+async def _arun_parallel(prompts: List[str]) -> List[str]:
+    sem = asyncio.Semaphore(max(1, cfg.SUMMARIZER_MAP_CONCURRENCY))
+
+    llm = get_default_client()
+
+    async def one(prompt: str) -> str:
+        async with sem:
+            return await llm.agenerate_text(prompt, temperature=0.0, max_tokens=800, task="key_points")
+
+    return list(await asyncio.gather(*(one(p) for p in prompts)))
+
+
+def _reduce_batches(partials: List[str]) -> List[List[str]]:
+    fanout = max(2, cfg.SUMMARIZER_FANOUT)
+    return [partials[i:i + fanout] for i in range(0, len(partials), fanout)]
+
+
+def _map_reduce_final_prompt(groups: List[List[str]], max_points: int, query: str,
+                             token_budget: Optional[int], sp) -> str:
+    """Run the map stage and all but the last reduce level; return the final reduce prompt."""
+    partials = _run_parallel([_build_prompt(g, max_points, query, token_budget) for g in groups])
+    depth = 1
+    while len(partials) > cfg.SUMMARIZER_FANOUT and depth < cfg.SUMMARIZER_MAX_DEPTH:
+        partials = _run_parallel([_build_reduce_prompt(b, max_points)
+                                  for b in _reduce_batches(partials)])
+        depth += 1
+    sp.set("depth", depth + 1)
+    return _build_reduce_prompt(partials, max_points)
+
+
+async def _amap_reduce_final_prompt(groups: List[List[str]], max_points: int, query: str,
+                                    token_budget: Optional[int], sp) -> str:
+    partials = await _arun_parallel([_build_prompt(g, max_points, query, token_budget) for g in groups])
+    depth = 1
+    while len(partials) > cfg.SUMMARIZER_FANOUT and depth < cfg.SUMMARIZER_MAX_DEPTH:
+        partials = await _arun_parallel([_build_reduce_prompt(b, max_points)
+                                         for b in _reduce_batches(partials)])
+        depth += 1
+    sp.set("depth", depth + 1)
+    return _build_reduce_prompt(partials, max_points)
+
+
+def extract_key_points(texts: List[str], max_points: int = 8, query: str = "",
+                       token_budget: Optional[int] = None, mode: Optional[str] = None) -> str:
+    groups = _map_groups(texts, query, token_budget, mode)
+    if groups is None:
+        prompt = _build_prompt(texts, max_points, query, token_budget)
+        return get_default_client().generate_text(prompt, temperature=0.0, max_tokens=800, task="key_points")
+    with span("tool.summarize", mode="map_reduce", groups=len(groups)) as sp:
+        return _generate(_map_reduce_final_prompt(groups, max_points, query, token_budget, sp))
+
+
+async def aextract_key_points(texts: List[str], max_points: int = 8, query: str = "",
+                              token_budget: Optional[int] = None, mode: Optional[str] = None) -> str:
+    llm = get_default_client()
+    groups = _map_groups(texts, query, token_budget, mode)
+    if groups is None:
+        prompt = _build_prompt(texts, max_points, query, token_budget)
+        return await llm.agenerate_text(prompt, temperature=0.0, max_tokens=800, task="key_points")
+    with span("tool.summarize", mode="map_reduce", groups=len(groups)) as sp:
+        prompt = await _amap_reduce_final_prompt(groups, max_points, query, token_budget, sp)
+        return await llm.agenerate_text(prompt, temperature=0.0, max_tokens=800, task="key_points")
+
+
+def stream_key_points(texts: List[str], max_points: int = 8, query: str = "",
+                      token_budget: Optional[int] = None, mode: Optional[str] = None) -> Iterator[str]:
+    """Yield the key-point bullets as the model produces them.
+
+    In map-reduce mode only the final reduce call is streamed.
+    """
+    groups = _map_groups(texts, query, token_budget, mode)
+    if groups is None:
+        prompt = _build_prompt(texts, max_points, query, token_budget)
+    else:
+        with span("tool.summarize", mode="map_reduce", groups=len(groups)) as sp:
+            prompt = _map_reduce_final_prompt(groups, max_points, query, token_budget, sp)
+    yield from get_default_client().generate_text_stream(prompt, temperature=0.0, max_tokens=800,
+                                                         task="key_points")
@@ -0,0 +1,89 @@
+"""Lightweight text output formats: Markdown, HTML and JSON.
+
+Standard library only; each writer renders a `Document` in a single pass.
+"""
+import html
+import json
+import os
+from typing import Dict, List
+
+from src.tools.document_model import Document, document_to_report
+
+
+def _write(out_path: str, text: str) -> str:
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return out_path
+
+
+def _md_cell(text: str) -> str:
+    return text.replace("|", "\\|").replace("\n", " ")
+
+
+def render_markdown(doc: Document) -> str:
+    parts: List[str] = [f"# {doc.title}"]
+    if doc.summary:
+        parts.append(doc.summary)
+    for block in doc.blocks:
+        if block.kind == "heading":
+            parts.append(f"{'#' * (block.level + 1)} {block.text}")
+        elif block.kind == "paragraph":
+            parts.append(block.text)
+        elif block.kind == "bullets":
+            parts.append("\n".join(f"- {item}" for item in block.items))
+        elif block.kind == "table":
+            header, *body = block.rows
+            lines = ["| " + " | ".join(_md_cell(c) for c in header) + " |",
+                     "|" + "---|" * len(header)]
+            lines += ["| " + " | ".join(_md_cell(c) for c in row) + " |" for row in body]
+            parts.append("\n".join(lines))
+        elif block.kind == "figure":
+            parts.append(f"![{block.caption}]({block.path})")
+    return "\n\n".join(parts) + "\n"
+
+
+def render_html(doc: Document) -> str:
+    esc = html.escape
+    parts: List[str] = [
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8">',
+        f"<title>{esc(doc.title)}</title>",
+        "<style>body{font-family:Helvetica,Arial,sans-serif;max-width:48em;margin:2em auto;line-height:1.45}"
+        "table{border-collapse:collapse}td,th{border:1px solid #999;padding:.25em .5em}</style>",
+        "</head><body>",
+        f"<h1>{esc(doc.title)}</h1>",
+    ]
+    if doc.summary:
+        parts.append(f"<p>{esc(doc.summary)}</p>")
+    for block in doc.blocks:
+        if block.kind == "heading":
+            level = min(block.level + 1, 6)
+            parts.append(f"<h{level}>{esc(block.text)}</h{level}>")
+        elif block.kind == "paragraph":
+            parts.append(f"<p>{esc(block.text)}</p>")
+        elif block.kind == "bullets":
+            parts.append("<ul>" + "".join(f"<li>{esc(i)}</li>" for i in block.items) + "</ul>")
+        elif block.kind == "table":
+            header, *body = block.rows
+            rows = ["<tr>" + "".join(f"<th>{esc(c)}</th>" for c in header) + "</tr>"]
+            rows += ["<tr>" + "".join(f"<td>{esc(c)}</td>" for c in row) + "</tr>" for row in body]
+            parts.append("<table>" + "".join(rows) + "</table>")
+        elif block.kind == "figure":
+            parts.append(f'<figure><img src="{esc(block.path)}" alt="{esc(block.caption)}">'
+                         f"<figcaption>{esc(block.caption)}</figcaption></figure>")
+    parts.append("</body></html>")
+    return "\n".join(parts) + "\n"
+
+
+def write_markdown(doc: Document, out_path: str) -> str:
+    return _write(out_path, render_markdown(doc))
+
+
+def write_html(doc: Document, out_path: str) -> str:
+    return _write(out_path, render_html(doc))
+
+
+def write_json(doc: Document, out_path: str) -> str:
+    report: Dict = document_to_report(doc)
+    return _write(out_path, json.dumps(report, ensure_ascii=False, indent=2))
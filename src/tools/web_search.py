@@ -1,78 +1,318 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict
+import asyncio
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 from src.config import cfg
+from src.utils import http_client
+from src.utils.instrumentation import span
+from src.utils.stage_limits import astage_slot, stage_slot
 
 SERPAPI_KEY = cfg.SERPAPI_API_KEY
 
 
-def _serpapi_search(query: str, num: int = 5) -> List[Dict]:
-    from serpapi import GoogleSearch
-    params = {"q": query, "engine": "google",
-              "num": num, "api_key": SERPAPI_KEY}
-    search = GoogleSearch(params)
-    results = search.get_dict()
+_SERPAPI_URL = "https://serpapi.com/search.json"
+
+
+def _serpapi_params(query: str, num: int) -> Dict:
+    return {"q": query, "engine": "google",
+            "num": num, "api_key": SERPAPI_KEY}
+
+
+def _parse_serpapi(results: Dict, num: int) -> List[Dict]:
     items = results.get("organic_results", [])[:num]
     return [{"title": it.get("title"), "link": it.get("link"), "snippet": it.get("snippet") or ""} for it in items]
 
 
+def _serpapi_search(query: str, num: int = 5) -> List[Dict]:
+    # Call the SerpAPI JSON endpoint over the pooled session rather than building
+    # a new `serpapi.GoogleSearch` (and connection) per query.
+    resp = http_client.request("GET", _SERPAPI_URL, params=_serpapi_params(query, num))
+    resp.raise_for_status()
+    return _parse_serpapi(resp.json(), num)
+
+
+async def _aserpapi_search(query: str, num: int = 5) -> List[Dict]:
+    resp = await http_client.arequest("GET", _SERPAPI_URL, params=_serpapi_params(query, num))
+    resp.raise_for_status()
+    return _parse_serpapi(resp.json(), num)
+
+
+_DDG_URL = "https://duckduckgo.com/html"
+
+
+def _unwrap_duckduckgo_link(href: str) -> str:
+    # Result links are redirects like //duckduckgo.com/l/?uddg=<target>&rut=...
+    if href and "uddg=" in href:
+        target = parse_qs(urlsplit(href).query).get("uddg")
+        if target:
+            return target[0]
+    if href and href.startswith("//"):
+        return "https:" + href
+    return href
+
+
+def _parse_duckduckgo_html(html: str, num: int) -> List[Dict]:
+    from bs4 import BeautifulSoup  # deferred: only the DuckDuckGo path parses HTML
+
+    soup = BeautifulSoup(html, "lxml")
+    results = []
+    for a in soup.select("a.result__a")[:num]:
+        container = a.find_parent(class_="result")
+        snippet = container.select_one(".result__snippet") if container is not None else None
+        results.append(
+            {"title": a.get_text(), "link": _unwrap_duckduckgo_link(a.get("href")),
+             "snippet": snippet.get_text(" ", strip=True) if snippet is not None else ""})
+    return results
+
+
 def _duckduckgo_search(query: str, num: int = 5) -> List[Dict]:
-    url = "https://duckduckgo.com/html"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     try:
-        resp = requests.post(url, data={"q": query}, headers=headers, timeout=10)
+        resp = http_client.request("POST", _DDG_URL, data={"q": query})
         if resp.status_code != 200:
             return []
-        soup = BeautifulSoup(resp.text, "lxml")
-        results = []
-        for a in soup.select("a.result__a")[:num]:
-            results.append(
-                {"title": a.get_text(), "link": a.get("href"), "snippet": ""})
-        return results
+        return _parse_duckduckgo_html(resp.text, num)
+    except Exception:
+        return []
+
+
+async def _aduckduckgo_search(query: str, num: int = 5) -> List[Dict]:
+    try:
+        resp = await http_client.arequest("POST", _DDG_URL, data={"q": query})
+        if resp.status_code != 200:
+            return []
+        return _parse_duckduckgo_html(resp.text, num)
     except Exception:
         return []
 
 
-def search(query: str, num: int = 5) -> List[Dict]:
-    if SERPAPI_KEY:
+def _mock_results(query: str, num: int) -> List[Dict]:
+    # Mock data for Fallback/Demo purposes
+    mocked = [
+        {
+            "title": f"Comprehensive Guide to {query}",
+            "link": "https://example.com/guide",
+            "snippet": f"This detailed guide covers all aspects of {query}, including historical context, current trends, and future projections. It highlights key challenges and opportunities."
+        },
+        {
+            "title": f"Recent Studies on {query}",
+            "link": "https://example.edu/research",
+            "snippet": f"A meta-analysis of recent studies regarding {query} reveals significant widespread impact. Researchers argue that immediate action is required to address emerging issues."
+        },
+        {
+            "title": f"Global Perspectives: {query}",
+            "link": "https://global-news.com/article",
+            "snippet": f"Different regions are approaching {query} in varied ways. This article contrasts policies in the EU, USA, and Asia, noting specific regulatory frameworks."
+        },
+        {
+            "title": f"Economic Analysis of {query}",
+            "link": "https://finance-daily.com/report",
+            "snippet": f"The economic implications of {query} are vast. Market analysts predict a 15% growth in related sectors over the next decade, driven by innovation and demand."
+        },
+        {
+            "title": f"Technological Innovations in {query}",
+            "link": "https://tech-insider.net/innovation",
+            "snippet": f"New technologies are reshaping how we interact with {query}. From AI integration to automated systems, the landscape is rapidly evolving."
+        }
+    ]
+    for item in mocked:
+        item["mock"] = True
+    return mocked[:num]
+
+
+# -------------------------
+# Result cache + in-flight request coalescing
+# -------------------------
+def normalize_query(query: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace so near-identical queries share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.casefold()).split())
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.results: List[Dict] = []
+
+
+class SearchCache:
+    """Thread-safe TTL + LRU cache of upstream search results.
+
+    Also tracks in-flight upstream calls so that concurrent identical queries
+    wait for the first one instead of issuing their own.
+    """
+
+    def __init__(self, ttl: int = 900, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], _InFlight] = {}
+        self._ainflight: Dict[Tuple[int, Tuple[str, int]], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+
+    def _get_locked(self, key) -> Optional[List[Dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, results = entry
+        if self.ttl > 0 and time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return results
+
+    def _put_locked(self, key, results: List[Dict]) -> None:
+        self._entries[key] = (time.time(), results)
+        self._entries.move_to_end(key)
+        while self.max_entries > 0 and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch) -> Tuple[List[Dict], str]:
+        """Return (results, source) where source is "cache", "coalesced" or "upstream"."""
+        with self._lock:
+            cached = self._get_locked(key)
+            if cached is not None:
+                self.hits += 1
+                return copy.deepcopy(cached), "cache"
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self.misses += 1
+                self.upstream_calls += 1
+                leader = self._inflight[key] = _InFlight()
+            else:
+                self.coalesced += 1
+        if waiter is not None:
+            waiter.done.wait()
+            return copy.deepcopy(waiter.results), "coalesced"
+
+        results: List[Dict] = []
+        try:
+            results = fetch()
+        finally:
+            with self._lock:
+                # Empty results mean the upstream failed; don't pin that for a whole TTL
+                if results:
+                    self._put_locked(key, results)
+                leader.results = results
+                del self._inflight[key]
+            leader.done.set()
+        return copy.deepcopy(results), "upstream"
+
+    async def aget_or_fetch(self, key, fetch) -> Tuple[List[Dict], str]:
+        """Async counterpart of `get_or_fetch`; `fetch` is a coroutine function."""
+        loop = asyncio.get_running_loop()
+        akey = (id(loop), key)
+        with self._lock:
+            cached = self._get_locked(key)
+            if cached is not None:
+                self.hits += 1
+                return copy.deepcopy(cached), "cache"
+            waiter = self._ainflight.get(akey)
+            if waiter is None:
+                self.misses += 1
+                self.upstream_calls += 1
+                leader = self._ainflight[akey] = loop.create_future()
+            else:
+                self.coalesced += 1
+        if waiter is not None:
+            return copy.deepcopy(await asyncio.shield(waiter)), "coalesced"
+
+        results: List[Dict] = []
         try:
-            return _serpapi_search(query, num)
-        except Exception:
-            pass
-    
-    results = _duckduckgo_search(query, num)
-    
-    # If no results from DuckDuckGo scraper (or blocked), return a small mocked set
-    if not results:
-        # Mock data for Fallback/Demo purposes
-        mocked = [
-            {
-                "title": f"Comprehensive Guide to {query}",
-                "link": "https://example.com/guide",
-                "snippet": f"This detailed guide covers all aspects of {query}, including historical context, current trends, and future projections. It highlights key challenges and opportunities."
-            },
-            {
-                "title": f"Recent Studies on {query}",
-                "link": "https://example.edu/research",
-                "snippet": f"A meta-analysis of recent studies regarding {query} reveals significant widespread impact. Researchers argue that immediate action is required to address emerging issues."
-            },
-            {
-                "title": f"Global Perspectives: {query}",
-                "link": "https://global-news.com/article",
-                "snippet": f"Different regions are approaching {query} in varied ways. This article contrasts policies in the EU, USA, and Asia, noting specific regulatory frameworks."
-            },
-            {
-                "title": f"Economic Analysis of {query}",
-                "link": "https://finance-daily.com/report",
-                "snippet": f"The economic implications of {query} are vast. Market analysts predict a 15% growth in related sectors over the next decade, driven by innovation and demand."
-            },
-            {
-                "title": f"Technological Innovations in {query}",
-                "link": "https://tech-insider.net/innovation",
-                "snippet": f"New technologies are reshaping how we interact with {query}. From AI integration to automated systems, the landscape is rapidly evolving."
+            results = await fetch()
+        finally:
+            with self._lock:
+                if results:
+                    self._put_locked(key, results)
+                del self._ainflight[akey]
+            if not leader.done():
+                leader.set_result(results)
+        return copy.deepcopy(results), "upstream"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "upstream_calls": self.upstream_calls,
+                "saved_upstream_calls": self.hits + self.coalesced,
+                "entries": len(self._entries),
             }
-        ]
-        return mocked[:num]
-    return results
+
+
+_cache = SearchCache(ttl=cfg.SEARCH_CACHE_TTL, max_entries=cfg.SEARCH_CACHE_MAX_ENTRIES)
+
+
+def get_search_stats() -> Dict[str, int]:
+    """Cache hit, coalescing and saved-upstream-call counters for this process."""
+    return _cache.stats()
+
+
+def _cache_key(query: str, num: int) -> Tuple[str, int]:
+    return normalize_query(query), int(num)
+
+
+def search(query: str, num: int = 5, use_cache: bool = True) -> List[Dict]:
+    with span("tool.search", query=query, num=num) as sp:
+        if use_cache and _cache.max_entries > 0:
+            results, source = _cache.get_or_fetch(_cache_key(query, num), lambda: _upstream_search(query, num))
+        else:
+            results, source = _upstream_search(query, num), "upstream"
+        sp.set("source", source)
+        sp.set("cache_hit", source != "upstream")
+        # If no results from the upstream providers (or blocked), return a small mocked set
+        if not results:
+            sp.set("mock", True)
+            results = _mock_results(query, num)
+        sp.set("results", len(results))
+        return results
+
+
+def _upstream_search(query: str, num: int) -> List[Dict]:
+    with stage_slot("search"):
+        if SERPAPI_KEY:
+            try:
+                return _serpapi_search(query, num)
+            except Exception:
+                pass
+
+        return _duckduckgo_search(query, num)
+
+
+async def asearch(query: str, num: int = 5, use_cache: bool = True) -> List[Dict]:
+    """Async variant of `search` on the pooled async HTTP client."""
+    with span("tool.search", query=query, num=num) as sp:
+        if use_cache and _cache.max_entries > 0:
+            results, source = await _cache.aget_or_fetch(
+                _cache_key(query, num), lambda: _aupstream_search(query, num))
+        else:
+            results, source = await _aupstream_search(query, num), "upstream"
+        sp.set("source", source)
+        sp.set("cache_hit", source != "upstream")
+        if not results:
+            sp.set("mock", True)
+            results = _mock_results(query, num)
+        sp.set("results", len(results))
+        return results
+
+
+async def _aupstream_search(query: str, num: int) -> List[Dict]:
+    async with astage_slot("search"):
+        if SERPAPI_KEY:
+            try:
+                return await _aserpapi_search(query, num)
+            except Exception:
+                pass
+
+        return await _aduckduckgo_search(query, num)
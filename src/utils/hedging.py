@@ -0,0 +1,183 @@
+"""Hedged LLM requests for tail-latency control.
+
+`LatencyTracker` keeps a rolling window of successful call latencies per model.
+`Hedger.call` runs a request and, if it has not answered within the model's
+p95 latency (LLM_HEDGE_QUANTILE), sends one identical backup request; whichever
+finishes first wins and a failure of one still lets the other answer. Until a
+model has LLM_HEDGE_MIN_SAMPLES observations no deadline is known and calls are
+not hedged.
+
+The LLM client hedges only after the rate limiter admitted the primary, so the
+deadline measures the upstream call alone and never time spent queued. A
+backup is only sent when the limiter grants it capacity immediately
+(`RateLimiter.try_acquire`): while callers are queued or the quota is spent,
+slow calls are simply waited for instead of adding load. A sync primary runs on
+its own thread (no shared pool caps concurrency or delays it); backups use a
+small pool. A losing sync request cannot be interrupted and finishes in the
+background; a losing async one is cancelled.
+"""
+import asyncio
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+from src.config import cfg
+
+# Worker threads for sync backup requests (primaries run on their own threads)
+_MAX_WORKERS = 8
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self.window = max(1, window)
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def count(self, model: str) -> int:
+        with self._lock:
+            return len(self._samples.get(model, ()))
+
+    def quantile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            models = list(self._samples)
+        return {m: {"samples": self.count(m),
+                    "p50_ms": round(self.quantile(m, 0.5) * 1000.0, 1),
+                    "p95_ms": round(self.quantile(m, 0.95) * 1000.0, 1)} for m in models}
+
+
+class Hedger:
+    def __init__(self, tracker: Optional[LatencyTracker] = None):
+        self.tracker = tracker if tracker is not None else LatencyTracker(cfg.LLM_HEDGE_WINDOW)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._hedged = 0
+        self._backup_wins = 0
+
+    def deadline(self, model: str) -> Optional[float]:
+        """Seconds to wait before the backup request, or None when calls are not hedged."""
+        if not cfg.LLM_HEDGE or self.tracker.count(model) < max(1, cfg.LLM_HEDGE_MIN_SAMPLES):
+            return None
+        return max(self.tracker.quantile(model, cfg.LLM_HEDGE_QUANTILE), cfg.LLM_HEDGE_MIN_DELAY)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="llm-hedge")
+            return self._pool
+
+    def _fired(self, set_attr: Callable) -> None:
+        set_attr("hedged", True)
+        with self._lock:
+            self._hedged += 1
+
+    def _won(self, winner: str, set_attr: Callable) -> None:
+        set_attr("hedge_winner", winner)
+        if winner == "backup":
+            with self._lock:
+                self._backup_wins += 1
+
+    @staticmethod
+    def _start(fn: Callable) -> Future:
+        """Run `fn` on a new thread; its spans land in the caller's trace via a context copy."""
+        future: Future = Future()
+        context = contextvars.copy_context()
+
+        def run():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(context.run(fn))
+                except BaseException as e:
+                    future.set_exception(e)
+        threading.Thread(target=run, name="llm-hedge-primary", daemon=True).start()
+        return future
+
+    def call(self, model: str, fn: Callable, set_attr: Callable, admit: Optional[Callable[[], bool]] = None):
+        """Return `fn()`, racing a second `fn()` against it once the deadline passes.
+
+        Call it after rate-limiter admission. `admit()` must grant the backup
+        capacity without waiting; when it returns False the primary is awaited alone.
+        """
+        deadline = self.deadline(model)
+        if deadline is None:
+            return fn()
+        primary = self._start(fn)
+        done, _ = wait([primary], timeout=deadline)
+        if done or (admit is not None and not admit()):
+            return primary.result()
+        self._fired(set_attr)
+        backup = self._get_pool().submit(contextvars.copy_context().run, fn)
+        labels = {primary: "primary", backup: "backup"}
+        pending = set(labels)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._won(labels[future], set_attr)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def acall(self, model: str, fn: Callable, set_attr: Callable,
+                    admit: Optional[Callable[[], bool]] = None):
+        """Async `call`: `fn` returns an awaitable; the losing request is cancelled."""
+        deadline = self.deadline(model)
+        if deadline is None:
+            return await fn()
+        primary = asyncio.ensure_future(fn())
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait(set(tasks), timeout=deadline)
+            if done or (admit is not None and not admit()):
+                return await primary
+            self._fired(set_attr)
+            tasks[asyncio.ensure_future(fn())] = "backup"
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._won(tasks[task], set_attr)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel the loser (or both when the caller itself is cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = {"hedged": self._hedged, "backup_wins": self._backup_wins}
+        return {**counters, "latency": self.tracker.stats()}
+
+
+# Singleton accessor
+_default_hedger: Optional[Hedger] = None
+_default_lock = threading.Lock()
+
+
+def get_default_hedger() -> Hedger:
+    global _default_hedger
+    with _default_lock:
+        if _default_hedger is None:
+            _default_hedger = Hedger()
+        return _default_hedger
@@ -0,0 +1,190 @@
+"""Shared, pooled HTTP clients for everything in `src/tools`.
+
+`request()` goes through one process-wide `requests.Session` whose adapters keep
+connections alive, bound the pool size and retry 429/5xx with exponential
+backoff. `arequest()` is the asyncio equivalent on an `httpx.AsyncClient` (one
+per event loop, since httpx clients are loop-bound). Both cap the number of
+concurrent requests per host.
+
+Async clients are held weakly by their loop, so a finished loop never hands its
+client to a new one. Wrap async work in `async_client_scope()` to close the
+client once the last user on that loop is done.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config import cfg
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_host_sems: Dict[str, threading.BoundedSemaphore] = {}
+# Keyed by the loop object itself: entries die with their loop and a recycled
+# id() can never return a client bound to a closed loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+_async_host_sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary())
+_async_users: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, int]" = weakref.WeakKeyDictionary()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def build_session(pool_size: Optional[int] = None, retries: Optional[int] = None,
+                  backoff: Optional[float] = None) -> requests.Session:
+    pool_size = pool_size or cfg.HTTP_POOL_SIZE
+    retry = Retry(
+        total=cfg.HTTP_RETRIES if retries is None else retries,
+        backoff_factor=cfg.HTTP_BACKOFF if backoff is None else backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,  # search POSTs are idempotent, retry them too
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session (rebuilt after a fork)."""
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = build_session()
+            _session_pid = os.getpid()
+        return _session
+
+
+@contextmanager
+def host_slot(url: str):
+    """Bound concurrent sync requests to one host to HTTP_PER_HOST_LIMIT."""
+    limit = cfg.HTTP_PER_HOST_LIMIT
+    if limit <= 0:
+        yield
+        return
+    host = _host(url)
+    with _lock:
+        sem = _host_sems.get(host)
+        if sem is None:
+            sem = _host_sems[host] = threading.BoundedSemaphore(limit)
+    with sem:
+        yield
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", cfg.HTTP_TIMEOUT)
+    with host_slot(url):
+        return get_session().request(method, url, **kwargs)
+
+
+# -------------------------
+# Async
+# -------------------------
+def get_async_client():
+    """Pooled `httpx.AsyncClient` for the running event loop."""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=cfg.HTTP_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=cfg.HTTP_POOL_SIZE,
+                                    max_keepalive_connections=cfg.HTTP_POOL_SIZE),
+                transport=httpx.AsyncHTTPTransport(retries=cfg.HTTP_RETRIES),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+async def aclose_async_client() -> None:
+    """Close the running loop's client; call before the loop shuts down."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+        _async_host_sems.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def async_client_scope():
+    """Hold the running loop's client open; the last scope to exit closes it.
+
+    Scopes nest and overlap freely, so concurrent runs sharing one loop (e.g. a
+    batch) keep using the same pool until every one of them has finished.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _async_users[loop] = _async_users.get(loop, 0) + 1
+    try:
+        yield
+    finally:
+        with _lock:
+            users = _async_users.get(loop, 1) - 1
+            if users:
+                _async_users[loop] = users
+            else:
+                _async_users.pop(loop, None)
+        if not users:
+            await aclose_async_client()
+
+
+@asynccontextmanager
+async def ahost_slot(url: str):
+    limit = cfg.HTTP_PER_HOST_LIMIT
+    if limit <= 0:
+        yield
+        return
+    loop, host = asyncio.get_running_loop(), _host(url)
+    with _lock:
+        sems = _async_host_sems.setdefault(loop, {})
+        sem = sems.get(host)
+        if sem is None:
+            sem = sems[host] = asyncio.Semaphore(limit)
+    async with sem:
+        yield
+
+
+async def arequest(method: str, url: str, **kwargs):
+    """Async request with per-host limits and jittered exponential backoff on 429/5xx."""
+    client = get_async_client()
+    attempts = max(0, cfg.HTTP_RETRIES) + 1
+    for attempt in range(attempts):
+        async with ahost_slot(url):
+            resp = await client.request(method, url, **kwargs)
+        if resp.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+            return resp
+        delay = cfg.HTTP_BACKOFF * (2 ** attempt)
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        logger.debug(f"{method} {url} returned {resp.status_code}; retrying in {delay:.2f}s")
+        await asyncio.sleep(delay * (0.5 + random.random() / 2))
+    return resp
@@ -0,0 +1,164 @@
+"""Lightweight tracing for workflow nodes and tool calls.
+
+Code under measurement wraps itself in `span(name, **attrs)`. Finished spans are
+appended to the trace collected by the innermost `collect_trace()` block (the
+workflow exposes it as `state["trace"]`) and handed to every registered hook, so
+they can be exported to a metrics stack. When `enable_opentelemetry()` has been
+called, each span is also mirrored as a live OpenTelemetry span.
+
+Tracing state lives in context variables, so it follows asyncio tasks and
+`asyncio.to_thread` / LangGraph executor hops without extra plumbing.
+"""
+import contextvars
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SpanHook = Callable[[Dict[str, Any]], None]
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+_ids = itertools.count(1)
+_hooks: List[SpanHook] = []
+_otel_tracer = None
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attrs = dict(attrs)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attrs[key] = value
+
+    def incr(self, key: str, amount: int = 1) -> None:
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+def add_hook(hook: SpanHook) -> None:
+    """Call `hook(span_dict)` for every finished span."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: SpanHook) -> None:
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def enable_opentelemetry(tracer=None) -> bool:
+    """Mirror spans to OpenTelemetry. Returns False if the API isn't installed."""
+    global _otel_tracer
+    if tracer is None:
+        try:
+            from opentelemetry import trace  # type: ignore
+        except ImportError:
+            logger.warning("opentelemetry-api not installed; spans will not be exported.")
+            return False
+        tracer = trace.get_tracer("multiagent-research-report")
+    _otel_tracer = tracer
+    return True
+
+
+def disable_opentelemetry() -> None:
+    global _otel_tracer
+    _otel_tracer = None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def collect_trace():
+    """Collect every span finished inside the block into the yielded list."""
+    trace: List[Dict[str, Any]] = []
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def _otel_span(name: str):
+    if _otel_tracer is None:
+        yield None
+        return
+    with _otel_tracer.start_as_current_span(name) as otel:
+        yield otel
+
+
+@contextmanager
+def span(name: str, **attrs):
+    sp = Span(name, _current_span.get(), attrs)
+    token = _current_span.set(sp)
+    with _otel_span(name) as otel:
+        try:
+            yield sp
+        except BaseException as e:
+            sp.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            sp.duration_ms = round((time.perf_counter() - sp._t0) * 1000.0, 3)
+            _current_span.reset(token)
+            if otel is not None:
+                for key, value in sp.attrs.items():
+                    if isinstance(value, (str, bool, int, float)):
+                        otel.set_attribute(key, value)
+            _finish(sp)
+
+
+def _finish(sp: Span) -> None:
+    record = sp.to_dict()
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append(record)
+    for hook in list(_hooks):
+        try:
+            hook(record)
+        except Exception as e:
+            logger.warning(f"Span hook {hook!r} failed: {e}")
+
+
+def record_span(name: str, duration_ms: float, error: Optional[str] = None, **attrs) -> Dict[str, Any]:
+    """Record an already-finished span.
+
+    For code that cannot hold a `span()` block open, such as generators that
+    yield to a caller which may resume them from another thread or context.
+    """
+    sp = Span(name, _current_span.get(), attrs)
+    sp.duration_ms = round(duration_ms, 3)
+    sp.error = error
+    _finish(sp)
+    return sp.to_dict()
+
+
+def stage_durations(trace: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Sum span durations by name, in seconds (e.g. {"node.research": 1.2, "llm.generate": 0.9})."""
+    totals: Dict[str, float] = {}
+    for record in trace:
+        if record.get("duration_ms") is not None:
+            totals[record["name"]] = totals.get(record["name"], 0.0) + record["duration_ms"] / 1000.0
+    return {name: round(secs, 4) for name, secs in totals.items()}
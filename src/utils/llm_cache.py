@@ -0,0 +1,131 @@
+"""Persistent, content-addressed cache for LLM responses.
+
+Entries live in a single SQLite file so several worker processes can share
+them. Keys are derived from everything that influences the model output
+(model name, prompt, temperature, max_tokens). Entries expire after a TTL and
+the table is kept under a maximum size by evicting the least recently used rows.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from src.config import cfg
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    h = hashlib.sha256()
+    for part in (model, repr(float(temperature)), str(int(max_tokens)), prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str, ttl: int = 24 * 3600, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork; reopen in each process.
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and self.ttl > 0 and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute(
+                    "UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed: {e}")
+                self.misses += 1
+                return None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created, accessed)"
+                    " VALUES (?, ?, ?, ?)", (key, value, now, now))
+                self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl > 0:
+            cur = conn.execute(
+                "DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+            self.evictions += max(cur.rowcount, 0)
+        if self.max_entries > 0:
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                cur = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY accessed ASC LIMIT ?)", (excess,))
+                self.evictions += max(cur.rowcount, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+# Singleton accessor
+_default_cache: Optional[LLMCache] = None
+
+
+def get_default_cache() -> Optional[LLMCache]:
+    """Return the shared cache, or None when LLM_CACHE_PATH is not configured."""
+    global _default_cache
+    if _default_cache is None and cfg.LLM_CACHE_PATH:
+        _default_cache = LLMCache(
+            cfg.LLM_CACHE_PATH, ttl=cfg.LLM_CACHE_TTL, max_entries=cfg.LLM_CACHE_MAX_ENTRIES)
+    return _default_cache
@@ -1,13 +1,85 @@
-"""Thin LLM client wrapper with a mock fallback for local development."""
+"""Thin LLM client wrapper with rate limiting, retries and a mock fallback for local development.
+
+Real calls go through the process-wide token-bucket `RateLimiter` (LLM_RPM /
+LLM_TPM) and are retried on 429/5xx with jittered exponential backoff. Whether
+the mock may stand in for the model is an explicit policy (LLM_MOCK_FALLBACK):
+
+* "no_key" (default): mock only when no API key / SDK is configured, i.e. local
+  development; a failing real call raises `LLMUnavailableError`;
+* "always": also fall back to the mock after a real call failed;
+* "never": always raise instead of producing mock output.
+
+Callers name their `task` ("key_points", "analysis", ...) and MODEL_ROUTES maps
+tasks to models, so cheap extraction and the final analysis can use different
+models. With LLM_HEDGE enabled, non-streaming calls are hedged (see
+`src.utils.hedging`): a backup request races a primary that is slower than the
+model's recent p95 latency.
+"""
+import asyncio
+import itertools
 import os
 import json
-from typing import Optional
+import random
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterator, Optional
 import logging
+import threading
+import time
 
 from src.config import cfg
+from src.utils.llm_cache import LLMCache, get_default_cache, make_key
+from src.utils.hedging import Hedger, get_default_hedger
+from src.utils.instrumentation import Span, record_span, span
+from src.utils.rate_limiter import RateLimiter, get_default_limiter
+from src.utils.stage_limits import astage_slot, stage_slot
 
 logger = logging.getLogger(__name__)
 
+MOCK_FALLBACK_POLICIES = ("no_key", "always", "never")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+_RETRY_MARKERS = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+
+
+class LLMUnavailableError(RuntimeError):
+    """The model could not be reached and the mock fallback policy forbids mocking."""
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    code = _status_code(error)
+    if code is not None:
+        return code in RETRY_STATUSES
+    text = str(error)
+    return any(marker in text for marker in _RETRY_MARKERS) or isinstance(error, (TimeoutError, ConnectionError))
+
+
+def _backoff(attempt: int) -> float:
+    delay = min(cfg.LLM_BACKOFF * (2 ** attempt), cfg.LLM_BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)
+
+
+def _estimate_tokens(prompt: str, max_tokens: int) -> int:
+    # ~4 characters per token for the prompt, plus the full output allowance
+    return len(prompt) // 4 + 1 + max_tokens
+
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_token_count", None)
+    if total is None:
+        parts = [getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)]
+        total = sum(p for p in parts if p) or None
+    return total
+
 
 class MockLLM:
     def __init__(self):
@@ -15,7 +87,7 @@ class MockLLM:
 
     def generate_text(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1024) -> str:
         # Very small heuristic-based mock: if asked to extract bullets, return first sentences
-        logger.info("Using MOCK LLM for generation.")
+        logger.debug("Using MOCK LLM for generation.")
         if "Extract" in prompt or "top insights" in prompt or "Return max" in prompt:
             snippets = []
             # extract excerpts present after EXCERPT markers
@@ -54,48 +126,386 @@ class MockLLM:
 
 
 class LLMClient:
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 cache: Optional[LLMCache] = None, limiter: Optional[RateLimiter] = None,
+                 routes: Optional[Dict[str, str]] = None, hedger: Optional[Hedger] = None):
         self.api_key = api_key or cfg.GOOGLE_API_KEY
         self.model = model or cfg.DEFAULT_MODEL
-        self._client = None
+        self.routes = dict(routes if routes is not None else cfg.MODEL_ROUTES)
+        self.hedger = hedger if hedger is not None else get_default_hedger()
+        self.cache = cache if cache is not None else get_default_cache()
+        self.limiter = limiter if limiter is not None else get_default_limiter()
+        self._genai_client = None
+        self._client_ready = False
+        self._client_lock = threading.Lock()
+
+    @property
+    def _client(self):
+        """The google-genai client, imported and constructed on first use.
+
+        None when no API key is configured or the SDK is unavailable.
+        """
+        if not self._client_ready:
+            with self._client_lock:
+                if not self._client_ready:
+                    self._genai_client = self._build_client()
+                    self._client_ready = True
+        return self._genai_client
+
+    @_client.setter
+    def _client(self, client) -> None:
+        self._genai_client = client
+        self._client_ready = True
+
+    @property
+    def has_backend(self) -> bool:
+        """Whether a real model is configured (otherwise every answer comes from the mock)."""
+        return self._client is not None
+
+    def _build_client(self):
         # try to initialize real client only if api_key present
-        if self.api_key:
+        if not self.api_key:
+            return None
+        try:
+            from google import genai
+            if cfg.GENAI_BASE_URL:
+                from google.genai import types
+                return genai.Client(api_key=self.api_key,
+                                    http_options=types.HttpOptions(base_url=cfg.GENAI_BASE_URL))
+            return genai.Client(api_key=self.api_key)
+        except ImportError:
+            logger.error("google-genai library not installed.")
+        except Exception as e:
+            logger.error(f"Failed to initialize Google GenAI Client: {e}")
+        return None
+
+    def model_for(self, task: Optional[str] = None) -> str:
+        """The model serving `task` (MODEL_ROUTES), else the default model."""
+        return self.routes.get(task, self.model) if task else self.model
+
+    def _cache_lookup(self, model: str, prompt: str, temperature: float, max_tokens: int, use_cache: bool,
+                      json_mode: bool = False):
+        """Return (cache_key, cached_text); cache_key is None when caching is off."""
+        if not use_cache or self.cache is None:
+            return None, None
+        cache_key = make_key(f"{model}+json" if json_mode else model, prompt, temperature, max_tokens)
+        return cache_key, self.cache.get(cache_key)
+
+    def _structured_key(self, prompt: str, temperature: float, max_tokens: int, task: Optional[str],
+                        response_schema: Optional[dict]) -> Optional[str]:
+        # Mock output is never cached, so without a backend there is nothing to look up
+        if self.cache is None or not self.has_backend:
+            return None
+        json_mode = response_schema is not None and cfg.LLM_JSON_MODE
+        model = self.model_for(task)
+        return make_key(f"{model}+json" if json_mode else model, prompt, temperature, max_tokens)
+
+    def cache_lookup(self, prompt: str, temperature: float, max_tokens: int, task: Optional[str] = None,
+                     response_schema: Optional[dict] = None) -> Optional[str]:
+        """The cached answer a `generate_text` call with these arguments would return, or None."""
+        key = self._structured_key(prompt, temperature, max_tokens, task, response_schema)
+        return self.cache.get(key) if key is not None else None
+
+    def cache_store(self, prompt: str, text: str, temperature: float, max_tokens: int,
+                    task: Optional[str] = None, response_schema: Optional[dict] = None) -> None:
+        """Cache `text` as the answer to these arguments.
+
+        For callers that validate answers first and call `generate_text` with
+        use_cache=False, so invalid output is never served from the cache.
+        """
+        key = self._structured_key(prompt, temperature, max_tokens, task, response_schema)
+        if key is not None and text:
+            self.cache.set(key, text)
+
+    @staticmethod
+    def _config(temperature: float, max_tokens: int, response_schema: Optional[dict] = None):
+        """GenerateContentConfig; with a schema and LLM_JSON_MODE the model answers in JSON natively."""
+        from google.genai import types
+
+        if response_schema is not None and cfg.LLM_JSON_MODE:
+            return types.GenerateContentConfig(temperature=temperature, max_output_tokens=max_tokens,
+                                               response_mime_type="application/json",
+                                               response_schema=response_schema)
+        return types.GenerateContentConfig(temperature=temperature, max_output_tokens=max_tokens)
+
+    def _finish(self, response, cache_key: Optional[str], sp: Span) -> str:
+        text = response.text or ""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            sp.set("prompt_tokens", getattr(usage, "prompt_token_count", None))
+            sp.set("response_tokens", getattr(usage, "candidates_token_count", None))
+        # Only successful real responses are cached; mock output never is.
+        if cache_key is not None and text:
+            self.cache.set(cache_key, text)
+        return text
+
+    def _start_span(self, model: str, task: Optional[str], prompt: str, temperature: float, max_tokens: int):
+        return span("llm.generate", model=model, task=task, prompt_chars=len(prompt),
+                    temperature=temperature, max_tokens=max_tokens,
+                    cache_hit=False, mock=False, retries=0, hedged=False)
+
+    def _mock(self, prompt: str, temperature: float, max_tokens: int, sp: Span) -> str:
+        sp.set("mock", True)
+        return MockLLM().generate_text(prompt, temperature=temperature, max_tokens=max_tokens)
+
+    def _check_fallback(self, error: Optional[Exception]) -> None:
+        """Raise `LLMUnavailableError` unless LLM_MOCK_FALLBACK allows mocking here."""
+        policy = cfg.LLM_MOCK_FALLBACK if cfg.LLM_MOCK_FALLBACK in MOCK_FALLBACK_POLICIES else "no_key"
+        if error is None:
+            if policy == "never":
+                raise LLMUnavailableError("No LLM client configured (GOOGLE_API_KEY) and LLM_MOCK_FALLBACK=never")
+            return
+        if policy != "always":
+            raise LLMUnavailableError(f"LLM call failed: {error}") from error
+        logger.error(f"GenAI call failed: {error}. Falling back to mock.")
+
+    def _fallback(self, prompt: str, temperature: float, max_tokens: int, sp: Span,
+                  error: Optional[Exception] = None) -> str:
+        if error is not None:
+            sp.set("fallback_error", str(error))
+        self._check_fallback(error)
+        return self._mock(prompt, temperature, max_tokens, sp)
+
+    def _retry_wait(self, error: Exception, attempt: int, attempts: int, set_attr: Callable) -> Optional[float]:
+        """Seconds to sleep before retrying `error`, or None when it must propagate."""
+        if not _is_retryable(error) or attempt >= attempts - 1:
+            return None
+        if _status_code(error) == 429 or "RESOURCE_EXHAUSTED" in str(error):
+            self.limiter.throttled()
+        self.limiter.retried()
+        set_attr("retries", attempt + 1)
+        delay = _backoff(attempt)
+        logger.warning(f"LLM call failed ({error}); retry {attempt + 1}/{attempts - 1} in {delay:.2f}s")
+        return delay
+
+    def _call(self, fn: Callable, prompt: str, max_tokens: int, set_attr: Callable,
+              model: Optional[str] = None, hedge: bool = False, slot: bool = True):
+        """Run `fn` under the rate limiter, retrying 429/5xx with jittered backoff.
+
+        `fn` runs inside the "llm" stage slot unless `slot` is False (the caller
+        already holds it, e.g. for the whole lifetime of a stream).
+
+        Successful latencies (excluding limiter waits) feed the hedging deadline of `model`.
+        With `hedge`, the admitted call is raced by a backup request once it is slower
+        than that deadline, if the limiter has capacity for the backup right away.
+        """
+        reserved = _estimate_tokens(prompt, max_tokens)
+        attempts = max(0, cfg.LLM_RETRIES) + 1
+        waited = 0.0
+
+        def timed():
+            t0 = time.perf_counter()
+            response = fn()
+            if model is not None:
+                self.hedger.tracker.observe(model, time.perf_counter() - t0)
+            return response
+
+        for attempt in range(attempts):
+            waited += self.limiter.acquire(reserved)
+            set_attr("rate_limit_wait_ms", round(waited * 1000.0, 3))
             try:
-                from google import genai
-                self._client = genai.Client(api_key=self.api_key)
-            except ImportError:
-                logger.error("google-genai library not installed.")
-                self._client = None
+                with stage_slot("llm") if slot else nullcontext():
+                    if hedge and model is not None:
+                        # A backup's token reservation is kept as its (estimated) usage
+                        response = self.hedger.call(model, timed, set_attr,
+                                                    admit=lambda: self.limiter.try_acquire(reserved))
+                    else:
+                        response = timed()
             except Exception as e:
-                logger.error(f"Failed to initialize Google GenAI Client: {e}")
-                self._client = None
+                self.limiter.settle(reserved, 0)
+                delay = self._retry_wait(e, attempt, attempts, set_attr)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.limiter.settle(reserved, _usage_tokens(response))
+            return response
 
-    def generate_text(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1024) -> str:
+    async def _acall(self, fn: Callable, prompt: str, max_tokens: int, set_attr: Callable,
+                     model: Optional[str] = None, hedge: bool = False):
+        """Async `_call`: `fn` returns an awaitable."""
+        reserved = _estimate_tokens(prompt, max_tokens)
+        attempts = max(0, cfg.LLM_RETRIES) + 1
+        waited = 0.0
+
+        async def timed():
+            t0 = time.perf_counter()
+            response = await fn()
+            if model is not None:
+                self.hedger.tracker.observe(model, time.perf_counter() - t0)
+            return response
+
+        for attempt in range(attempts):
+            waited += await self.limiter.aacquire(reserved)
+            set_attr("rate_limit_wait_ms", round(waited * 1000.0, 3))
+            try:
+                async with astage_slot("llm"):
+                    if hedge and model is not None:
+                        response = await self.hedger.acall(model, timed, set_attr,
+                                                           admit=lambda: self.limiter.try_acquire(reserved))
+                    else:
+                        response = await timed()
+            except Exception as e:
+                self.limiter.settle(reserved, 0)
+                delay = self._retry_wait(e, attempt, attempts, set_attr)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.settle(reserved, _usage_tokens(response))
+            return response
+
+    def generate_text(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1024,
+                      use_cache: bool = True, task: Optional[str] = None,
+                      response_schema: Optional[dict] = None) -> str:
+        """Generate a completion for `prompt`.
+
+        `response_schema` (Gemini schema form) requests native JSON output when
+        LLM_JSON_MODE is on; see `src.utils.structured_output`.
+        """
+        model = self.model_for(task)
+        with self._start_span(model, task, prompt, temperature, max_tokens) as sp:
+            text = self._generate_text(model, prompt, temperature, max_tokens, use_cache, sp, response_schema)
+            sp.set("response_chars", len(text))
+            return text
+
+    def _generate_text(self, model: str, prompt: str, temperature: float, max_tokens: int,
+                       use_cache: bool, sp: Span, response_schema: Optional[dict] = None) -> str:
         if self._client:
+            json_mode = response_schema is not None and cfg.LLM_JSON_MODE
+            sp.set("json_mode", json_mode)
+            cache_key, cached = self._cache_lookup(model, prompt, temperature, max_tokens, use_cache, json_mode)
+            if cached is not None:
+                sp.set("cache_hit", True)
+                return cached
             try:
-                from google.genai import types
-                
-                # Create the config object
-                config = types.GenerateContentConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens
-                )
-                
-                response = self._client.models.generate_content(
-                    model=self.model,
-                    contents=prompt,
-                    config=config
-                )
-                
-                if response.text:
-                    return response.text
-                return ""
+                config = self._config(temperature, max_tokens, response_schema)
+                response = self._call(
+                    lambda: self._client.models.generate_content(
+                        model=model,
+                        contents=prompt,
+                        config=config
+                    ), prompt, max_tokens, sp.set, model, hedge=True)
+                return self._finish(response, cache_key, sp)
             except Exception as e:
-                logger.error(f"GenAI call failed: {e}. Falling back to mock.")
-                # fall through to mock behavior
-                pass
-        # No real client available -> use mock
-        return MockLLM().generate_text(prompt, temperature=temperature, max_tokens=max_tokens)
+                return self._fallback(prompt, temperature, max_tokens, sp, e)
+        # No real client available -> use mock (if the policy allows it)
+        return self._fallback(prompt, temperature, max_tokens, sp)
+
+    def generate_text_stream(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1024,
+                             use_cache: bool = True, task: Optional[str] = None,
+                             response_schema: Optional[dict] = None) -> Iterator[str]:
+        """Yield the response incrementally via `generate_content_stream`.
+
+        Cached responses and the mock fallback are yielded as a single chunk.
+        The SDK only sends the request when the first chunk is pulled, so that
+        pull happens inside `_call`: opening the stream is rate limited and
+        retried like `generate_text`. The "llm" stage slot is held until the
+        stream is drained (or closed), and the token reservation is settled
+        against the usage reported by the last chunk. If the stream fails
+        before producing any text, the mock fallback policy applies; a failure
+        midway re-raises since part of the text is already delivered. Streams
+        are routed by `task` but never hedged.
+        """
+        t0 = time.perf_counter()
+        model = self.model_for(task)
+        attrs = {"model": model, "task": task, "prompt_chars": len(prompt), "temperature": temperature,
+                 "max_tokens": max_tokens, "cache_hit": False, "mock": False, "retries": 0,
+                 "stream": True}
+        chunks = []
+        error = None
+        try:
+            if self._client:
+                json_mode = response_schema is not None and cfg.LLM_JSON_MODE
+                attrs["json_mode"] = json_mode
+                cache_key, cached = self._cache_lookup(model, prompt, temperature, max_tokens, use_cache,
+                                                       json_mode)
+                if cached is not None:
+                    attrs["cache_hit"] = True
+                    chunks.append(cached)
+                    yield cached
+                    return
+                try:
+                    config = self._config(temperature, max_tokens, response_schema)
+
+                    def open_stream():
+                        stream = iter(self._client.models.generate_content_stream(
+                            model=model,
+                            contents=prompt,
+                            config=config
+                        ))
+                        # Pulling the first chunk is what actually sends the request
+                        return stream, next(stream, None)
+
+                    last = None
+                    with stage_slot("llm"):
+                        stream, first = self._call(open_stream, prompt, max_tokens, attrs.__setitem__,
+                                                   slot=False)
+                        for chunk in itertools.chain([first] if first is not None else [], stream):
+                            last = chunk
+                            if chunk.text:
+                                if not chunks:
+                                    attrs["first_chunk_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+                                chunks.append(chunk.text)
+                                yield chunk.text
+                    self.limiter.settle(_estimate_tokens(prompt, max_tokens), _usage_tokens(last))
+                    text = "".join(chunks)
+                    if cache_key is not None and text:
+                        self.cache.set(cache_key, text)
+                    return
+                except Exception as e:
+                    if chunks:
+                        # Too late to retry, but other callers must still back off from the quota
+                        if _status_code(e) == 429 or "RESOURCE_EXHAUSTED" in str(e):
+                            self.limiter.throttled()
+                        raise
+                    attrs["fallback_error"] = str(e)
+                    self._check_fallback(e)
+            else:
+                self._check_fallback(None)
+            attrs["mock"] = True
+            text = MockLLM().generate_text(prompt, temperature=temperature, max_tokens=max_tokens)
+            chunks.append(text)
+            yield text
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            attrs["response_chars"] = sum(len(c) for c in chunks)
+            record_span("llm.generate", (time.perf_counter() - t0) * 1000.0, error=error, **attrs)
+
+    async def agenerate_text(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1024,
+                             use_cache: bool = True, task: Optional[str] = None,
+                             response_schema: Optional[dict] = None) -> str:
+        """Async variant of `generate_text` built on the SDK's native `client.aio` API."""
+        model = self.model_for(task)
+        with self._start_span(model, task, prompt, temperature, max_tokens) as sp:
+            text = await self._agenerate_text(model, prompt, temperature, max_tokens, use_cache, sp,
+                                              response_schema)
+            sp.set("response_chars", len(text))
+            return text
+
+    async def _agenerate_text(self, model: str, prompt: str, temperature: float, max_tokens: int,
+                              use_cache: bool, sp: Span, response_schema: Optional[dict] = None) -> str:
+        if self._client:
+            json_mode = response_schema is not None and cfg.LLM_JSON_MODE
+            sp.set("json_mode", json_mode)
+            cache_key, cached = self._cache_lookup(model, prompt, temperature, max_tokens, use_cache, json_mode)
+            if cached is not None:
+                sp.set("cache_hit", True)
+                return cached
+            try:
+                config = self._config(temperature, max_tokens, response_schema)
+                response = await self._acall(
+                    lambda: self._client.aio.models.generate_content(
+                        model=model,
+                        contents=prompt,
+                        config=config
+                    ), prompt, max_tokens, sp.set, model, hedge=True)
+                return self._finish(response, cache_key, sp)
+            except Exception as e:
+                return self._fallback(prompt, temperature, max_tokens, sp, e)
+        return self._fallback(prompt, temperature, max_tokens, sp)
 
 
 # Singleton accessor
@@ -107,3 +517,9 @@ def get_default_client() -> LLMClient:
     if _default_client is None:
         _default_client = LLMClient()
     return _default_client
+
+
+def get_llm_stats() -> Dict[str, object]:
+    """Saturation metrics of the shared rate limiter (queue depth, waits, 429s, retries)
+    plus hedging counters and per-model latency percentiles under "hedging"."""
+    return {**get_default_limiter().stats(), "hedging": get_default_hedger().stats()}
@@ -0,0 +1,72 @@
+"""Logging configuration shared by the entry points (app, batch CLI, workers).
+
+Production default is one compact JSON object per line at INFO. Structured
+fields are passed as `extra={"fields": {...}}` and merged into the JSON line.
+Large payloads should be logged at DEBUG through `LazyPFormat` so they are only
+formatted when debug output is actually enabled.
+"""
+import json
+import logging
+import pprint
+import sys
+from typing import Any, Optional
+
+from src.config import cfg
+
+
+class LazyPFormat:
+    """Defers `pprint.pformat(obj)` until the log record is actually emitted."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return pprint.pformat(self.obj)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict) and fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Install a single stderr handler on the root logger.
+
+    `level` defaults to LOG_LEVEL (INFO) and `fmt` to LOG_FORMAT ("json" or "text").
+    """
+    level_name = (level or cfg.LOG_LEVEL).upper()
+    handler = logging.StreamHandler(sys.stderr)
+    if (fmt or cfg.LOG_FORMAT).lower() == "text":
+        handler.setFormatter(TextFormatter())
+    else:
+        handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level_name, logging.INFO))
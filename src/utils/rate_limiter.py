@@ -0,0 +1,218 @@
+"""Token-bucket rate limiting for LLM requests.
+
+`RateLimiter` enforces a requests-per-minute and a tokens-per-minute budget
+with two token buckets that refill continuously. Callers are served strictly in
+arrival order (one FIFO queue shared by threads and coroutines), so a large
+request cannot be starved by a stream of small ones. Token reservations are
+estimates made before the call; `settle` refunds the difference once the real
+usage is known. `throttled` empties the request bucket after a 429 so every
+caller backs off together instead of hammering the quota.
+
+`stats()` reports saturation: queue depth, time spent waiting and how full the
+buckets are.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from src.config import cfg
+
+# How often queued (non-head) callers re-check their position
+_POLL_INTERVAL = 0.01
+
+
+class TokenBucket:
+    """Continuously refilling bucket; not thread-safe on its own (RateLimiter locks it)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._stamp = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self, now: float) -> None:
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (amounts above capacity wait for a full bucket)."""
+        if self.unlimited:
+            return 0.0
+        need = min(amount, self.capacity) - self.tokens
+        return max(0.0, need / self.rate)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._queue: deque = deque()
+        self._tickets = itertools.count()
+        self._acquired = 0
+        self._waited = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._max_depth = 0
+        self._throttled = 0
+        self._retries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return not (self.requests.unlimited and self.tokens.unlimited)
+
+    def _enqueue(self) -> int:
+        ticket = next(self._tickets)
+        self._queue.append(ticket)
+        self._max_depth = max(self._max_depth, len(self._queue))
+        return ticket
+
+    def _try_take(self, ticket: int, tokens: int) -> float:
+        """Under the lock: take capacity if `ticket` is first and it fits; else seconds to wait."""
+        if self._queue[0] != ticket:
+            return _POLL_INTERVAL
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if wait > 0:
+            return wait
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self._queue.popleft()
+        self._cond.notify_all()
+        return 0.0
+
+    def _record(self, waited: float) -> None:
+        self._acquired += 1
+        if waited > 0.001:
+            self._waited += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request and `tokens` tokens fit; returns seconds waited."""
+        if not self.enabled:
+            return 0.0
+        t0 = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue()
+            try:
+                while True:
+                    wait = self._try_take(ticket, tokens)
+                    if wait == 0.0:
+                        break
+                    self._cond.wait(wait)
+            except BaseException:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+                raise
+            waited = time.monotonic() - t0
+            self._record(waited)
+        return waited
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take one request and `tokens` tokens only if nobody is queued and they fit now; never waits."""
+        if not self.enabled:
+            return True
+        with self._cond:
+            if self._queue:
+                return False
+            ticket = self._enqueue()
+            if self._try_take(ticket, tokens) == 0.0:
+                self._record(0.0)
+                return True
+            self._queue.remove(ticket)
+            return False
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """Async `acquire`: waits with `asyncio.sleep` so the event loop keeps running."""
+        if not self.enabled:
+            return 0.0
+        t0 = time.monotonic()
+        with self._lock:
+            ticket = self._enqueue()
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(ticket, tokens)
+                    if wait == 0.0:
+                        waited = time.monotonic() - t0
+                        self._record(waited)
+                        return waited
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+            raise
+
+    def settle(self, reserved: int, actual: Optional[int]) -> None:
+        """Refund (or charge) the difference between reserved and actual token usage."""
+        if actual is None or self.tokens.unlimited:
+            return
+        with self._lock:
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + reserved - actual)
+
+    def throttled(self) -> None:
+        """The provider rejected a request (429): make every caller wait for a refill."""
+        with self._lock:
+            self._throttled += 1
+            self.requests.refill(time.monotonic())
+            self.requests.tokens = min(self.requests.tokens, 0.0)
+
+    def retried(self) -> None:
+        with self._lock:
+            self._retries += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+
+            def saturation(bucket: TokenBucket) -> float:
+                return 0.0 if bucket.unlimited else round(1.0 - max(bucket.tokens, 0.0) / bucket.capacity, 3)
+
+            return {
+                "rpm_limit": self.requests.capacity,
+                "tpm_limit": self.tokens.capacity,
+                "rpm_saturation": saturation(self.requests),
+                "tpm_saturation": saturation(self.tokens),
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_depth,
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "wait_seconds_total": round(self._wait_total, 3),
+                "wait_seconds_max": round(self._wait_max, 3),
+                "throttled": self._throttled,
+                "retries": self._retries,
+            }
+
+
+# Singleton accessor
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_default_limiter() -> RateLimiter:
+    """Process-wide limiter configured from LLM_RPM / LLM_TPM (0 = unlimited)."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter(cfg.LLM_RPM, cfg.LLM_TPM)
+        return _default_limiter
@@ -0,0 +1,65 @@
+"""Process-wide concurrency limits for the pipeline stages.
+
+Tools wrap their expensive section in `stage_slot("search" | "llm" | "render")`,
+or `astage_slot` on async paths. Both draw on the same per-stage limit, so
+threaded and async runs share it. Stages without a configured limit are not
+gated at all, so single-report runs pay nothing; the batch runner sets limits
+for the duration of a batch.
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+STAGES = ("search", "llm", "render")
+
+_limits: Dict[str, threading.BoundedSemaphore] = {}
+_sizes: Dict[str, int] = {}
+_lock = threading.Lock()
+
+# Longest pause between astage_slot's non-blocking attempts
+_ASYNC_POLL_MAX = 0.05
+
+
+def set_stage_limit(stage: str, limit: Optional[int]) -> None:
+    """Limit `stage` to `limit` concurrent callers; None or <= 0 removes the limit."""
+    with _lock:
+        if limit and limit > 0:
+            _limits[stage] = threading.BoundedSemaphore(limit)
+            _sizes[stage] = limit
+        else:
+            _limits.pop(stage, None)
+            _sizes.pop(stage, None)
+
+
+def get_stage_limits() -> Dict[str, int]:
+    with _lock:
+        return dict(_sizes)
+
+
+@contextmanager
+def stage_slot(stage: str):
+    sem = _limits.get(stage)
+    if sem is None:
+        yield
+        return
+    with sem:
+        yield
+
+
+@asynccontextmanager
+async def astage_slot(stage: str):
+    """Async `stage_slot`: waits for the same slot without blocking the event loop."""
+    sem = _limits.get(stage)
+    if sem is None:
+        yield
+        return
+    # The semaphore is shared with threads, so poll it with a short backoff
+    delay = 0.001
+    while not sem.acquire(blocking=False):
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _ASYNC_POLL_MAX)
+    try:
+        yield
+    finally:
+        sem.release()
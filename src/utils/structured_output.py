@@ -0,0 +1,359 @@
+"""Structured (JSON) output from the LLM: native JSON mode, tolerant parsing, schema validation, repair.
+
+A `StructuredOutput` wraps one JSON schema (a small JSON-Schema subset:
+type, properties, required, items, anyOf, minItems) and:
+
+* asks the model for JSON natively (`response_mime_type` / `response_schema`)
+  when LLM_JSON_MODE is on, so well-behaved models never emit prose or fences;
+* extracts the first JSON object from the answer in one pass over the text,
+  skipping code fences and surrounding prose without copying the answer;
+* validates it with a validator compiled from the schema once, at import time;
+* on failure re-prompts once with just the broken answer and the validation
+  errors (LLM_JSON_REPAIR), which is far cheaper than falling back to a
+  heuristic report after a full analysis call.
+
+Raw answers are never put in the LLM cache; only validated or repaired JSON is
+stored under the original prompt, so an invalid answer is not replayed (and
+repaired again) on every repeat of the prompt.
+
+Outcomes are counted per schema; `get_structured_output_stats()` reports them.
+"""
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.config import cfg
+from src.utils.instrumentation import span
+from src.utils.llm_client import LLMClient, get_default_client
+
+logger = logging.getLogger(__name__)
+
+Validator = Callable[[Any, str], List[str]]
+
+_TYPES = {"object": dict, "array": list, "string": str, "number": (int, float),
+          "integer": int, "boolean": bool}
+# Characters the extractor has to look at; everything else is skipped by the regex engine
+_JSON_TOKENS = re.compile(r'[{}"\\]')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_MAX_REPORTED_ERRORS = 5
+_REPAIR_ANSWER_CHARS = 6000
+
+
+# -------------------------
+# Schemas
+# -------------------------
+_CONTENT_SCHEMA = {"anyOf": [{"type": "string"}, {"type": "array", "items": {"type": "string"}}]}
+_SECTION_SCHEMA = {
+    "type": "object",
+    "properties": {"heading": {"type": "string"}, "content": _CONTENT_SCHEMA},
+    "required": ["heading", "content"],
+}
+REPORT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "summary": {"type": "string"},
+        "key_points": {"type": "array", "items": {"type": "string"}},
+        "sections": {"type": "array", "items": _SECTION_SCHEMA, "minItems": 1},
+    },
+    "required": ["title", "summary", "sections"],
+}
+SECTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {"sections": {"type": "array", "items": _SECTION_SCHEMA}},
+    "required": ["sections"],
+}
+
+
+def compile_schema(schema: Dict) -> Validator:
+    """Build a validator `(value, path) -> [error, ...]` for `schema` (empty list = valid)."""
+    if "anyOf" in schema:
+        options = [compile_schema(option) for option in schema["anyOf"]]
+
+        def check_any(value, path):
+            first: List[str] = []
+            for option in options:
+                errors = option(value, path)
+                if not errors:
+                    return []
+                first = first or errors
+            return first
+        return check_any
+
+    kind = schema.get("type")
+    expected = _TYPES.get(kind) if kind else None
+    properties = {name: compile_schema(sub) for name, sub in schema.get("properties", {}).items()}
+    required = tuple(schema.get("required", ()))
+    items = compile_schema(schema["items"]) if "items" in schema else None
+    min_items = schema.get("minItems", 0)
+
+    def check(value, path):
+        # bool is an int subclass but never a valid number here
+        if expected is not None and (not isinstance(value, expected) or
+                                     (isinstance(value, bool) and kind != "boolean")):
+            return [f"{path}: expected {kind}, got {type(value).__name__}"]
+        errors: List[str] = []
+        if kind == "object":
+            errors += [f"{path}: missing required key '{name}'" for name in required if name not in value]
+            for name, validate in properties.items():
+                if name in value:
+                    errors += validate(value[name], f"{path}.{name}")
+        elif kind == "array":
+            if len(value) < min_items:
+                errors.append(f"{path}: expected at least {min_items} item(s)")
+            if items is not None:
+                for i, item in enumerate(value):
+                    errors += items(item, f"{path}[{i}]")
+        return errors
+    return check
+
+
+def native_schema(schema: Dict) -> Dict:
+    """`schema` in the form Gemini's `response_schema` accepts.
+
+    Types are upper-cased and unions reduced to their first alternative, since
+    not every API version supports anyOf; the local validator still accepts all
+    alternatives.
+    """
+    if "anyOf" in schema:
+        return native_schema(schema["anyOf"][0])
+    out: Dict[str, Any] = {}
+    if "type" in schema:
+        out["type"] = schema["type"].upper()
+    if "properties" in schema:
+        out["properties"] = {name: native_schema(sub) for name, sub in schema["properties"].items()}
+    if "required" in schema:
+        out["required"] = list(schema["required"])
+    if "items" in schema:
+        out["items"] = native_schema(schema["items"])
+    return out
+
+
+# -------------------------
+# Extraction
+# -------------------------
+def _object_spans(text: str):
+    """Yield (start, end) of each balanced top-level {...} in `text`, scanning it once.
+
+    Quotes outside an object (prose, code fences) are ignored; inside one,
+    strings and escapes are tracked so braces in string values do not count.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    skip = -1
+    for m in _JSON_TOKENS.finditer(text):
+        i = m.start()
+        if i == skip:
+            continue
+        ch = text[i]
+        if in_string:
+            if ch == "\\":
+                skip = i + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield start, i + 1
+
+
+def extract_json(text: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """The first JSON object in `text` as (object, None), or (None, reason).
+
+    Tolerates code fences, prose around the object and trailing commas.
+    """
+    if not text or "{" not in text:
+        return None, "no JSON object in the answer"
+    reason = "unterminated JSON object (answer cut off?)"
+    for start, end in _object_spans(text):
+        candidate = text[start:end]
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError as e:
+            try:
+                value = json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+            except json.JSONDecodeError:
+                reason = f"invalid JSON: {e.msg} at char {e.pos}"
+                continue
+        if isinstance(value, dict):
+            return value, None
+    return None, reason
+
+
+# -------------------------
+# Metrics
+# -------------------------
+_stats: Dict[str, Counter] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, *keys: str) -> None:
+    with _stats_lock:
+        counter = _stats.setdefault(name, Counter())
+        for key in keys:
+            counter[key] += 1
+
+
+def get_structured_output_stats() -> Dict[str, Dict[str, int]]:
+    """Per schema: requests, valid on the first answer ("parsed"), "repaired", "failed",
+    "repair_calls", validated "cache_hits" and the failure kinds of first answers
+    ("invalid_json", "schema")."""
+    with _stats_lock:
+        return {name: dict(counter) for name, counter in _stats.items()}
+
+
+class StructuredOutput:
+    """A schema plus its compiled validator; see the module docstring."""
+
+    def __init__(self, name: str, schema: Dict):
+        self.name = name
+        self.schema = schema
+        self.native_schema = native_schema(schema)
+        self._validate = compile_schema(schema)
+
+    def _check(self, text: str) -> Tuple[Optional[Dict], Optional[str], Optional[str]]:
+        """(object, error, failure kind: "invalid_json" or "schema")."""
+        value, error = extract_json(text)
+        if value is None:
+            return None, error, "invalid_json"
+        errors = self._validate(value, "$")
+        if errors:
+            return None, "; ".join(errors[:_MAX_REPORTED_ERRORS]), "schema"
+        return value, None, None
+
+    def parse(self, text: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """(valid object, None) or (None, error description)."""
+        return self._check(text)[:2]
+
+    def _repair_prompt(self, answer: str, error: str) -> str:
+        return (
+            f"Your previous answer did not match the required JSON structure: {error}\n\n"
+            f"Previous answer:\n{answer[:_REPAIR_ANSWER_CHARS]}\n\n"
+            f"Required JSON schema:\n{json.dumps(self.schema, separators=(',', ':'))}\n\n"
+            "Task: Return only a valid JSON object that fixes these problems and keeps all content. "
+            "Do not include markdown formatting (like ```json ... ```) or any other text."
+        )
+
+    def _first(self, text: str, sp) -> Tuple[Optional[Dict], Optional[str]]:
+        _count(self.name, "requests")
+        value, error, kind = self._check(text)
+        if value is not None:
+            _count(self.name, "parsed")
+        else:
+            _count(self.name, kind)
+            sp.set("error", error)
+            logger.warning(f"Structured output ({self.name}) invalid: {error}")
+        return value, error
+
+    def _outcome(self, value: Optional[Dict], sp) -> Optional[Dict]:
+        _count(self.name, "repaired" if value is not None else "failed")
+        sp.set("repaired", value is not None)
+        return value
+
+    def cached(self, prompt: str, task: Optional[str] = None, temperature: float = 0.0,
+               max_tokens: int = 1024, llm: Optional[LLMClient] = None) -> Optional[Dict]:
+        """The validated answer cached for `prompt`, or None."""
+        text = (llm or get_default_client()).cache_lookup(prompt, temperature, max_tokens, task=task,
+                                                          response_schema=self.native_schema)
+        value = self.parse(text)[0] if text is not None else None
+        if value is not None:
+            _count(self.name, "cache_hits")
+        return value
+
+    def _remember(self, llm: LLMClient, prompt: Optional[str], value: Optional[Dict], task: Optional[str],
+                  temperature: float, max_tokens: int) -> Optional[Dict]:
+        # Only validated (or repaired) answers are cached, under the original prompt's key
+        if prompt is not None and value is not None:
+            llm.cache_store(prompt, json.dumps(value, ensure_ascii=False), temperature, max_tokens,
+                            task=task, response_schema=self.native_schema)
+        return value
+
+    def complete(self, text: str, task: Optional[str] = None, max_tokens: int = 1024,
+                 llm: Optional[LLMClient] = None, prompt: Optional[str] = None,
+                 temperature: float = 0.0) -> Optional[Dict]:
+        """Validate an answer that was already received (e.g. streamed), repairing it once if needed.
+
+        Returns the valid object or None; LLM errors during the repair count as a failure.
+        With the `prompt` (and `temperature`) that produced `text`, a valid or
+        repaired answer is cached for that prompt; answers must then be
+        requested with use_cache=False so the raw text is never cached.
+        """
+        llm = llm or get_default_client()
+        with span("llm.structured", schema=self.name, task=task, repaired=False) as sp:
+            value, error = self._first(text, sp)
+            if value is not None:
+                return self._remember(llm, prompt, value, task, temperature, max_tokens)
+            # The mock answers deterministically; re-prompting it cannot help
+            if not cfg.LLM_JSON_REPAIR or not llm.has_backend:
+                return self._outcome(None, sp)
+            _count(self.name, "repair_calls")
+            try:
+                answer = llm.generate_text(
+                    self._repair_prompt(text, error), temperature=0.0, max_tokens=max_tokens,
+                    use_cache=False, task=task, response_schema=self.native_schema)
+            except Exception as e:
+                logger.warning(f"Structured output ({self.name}) repair call failed: {e}")
+                return self._outcome(None, sp)
+            value = self._outcome(self.parse(answer)[0], sp)
+            return self._remember(llm, prompt, value, task, temperature, max_tokens)
+
+    async def acomplete(self, text: str, task: Optional[str] = None, max_tokens: int = 1024,
+                        llm: Optional[LLMClient] = None, prompt: Optional[str] = None,
+                        temperature: float = 0.0) -> Optional[Dict]:
+        """Async variant of `complete`."""
+        llm = llm or get_default_client()
+        with span("llm.structured", schema=self.name, task=task, repaired=False) as sp:
+            value, error = self._first(text, sp)
+            if value is not None:
+                return self._remember(llm, prompt, value, task, temperature, max_tokens)
+            if not cfg.LLM_JSON_REPAIR or not llm.has_backend:
+                return self._outcome(None, sp)
+            _count(self.name, "repair_calls")
+            try:
+                answer = await llm.agenerate_text(
+                    self._repair_prompt(text, error), temperature=0.0, max_tokens=max_tokens,
+                    use_cache=False, task=task, response_schema=self.native_schema)
+            except Exception as e:
+                logger.warning(f"Structured output ({self.name}) repair call failed: {e}")
+                return self._outcome(None, sp)
+            value = self._outcome(self.parse(answer)[0], sp)
+            return self._remember(llm, prompt, value, task, temperature, max_tokens)
+
+    def generate(self, prompt: str, task: Optional[str] = None, temperature: float = 0.0,
+                 max_tokens: int = 1024, llm: Optional[LLMClient] = None) -> Optional[Dict]:
+        """Ask for JSON matching the schema; returns the valid object or None.
+
+        Errors of the first LLM call propagate like `generate_text`'s.
+        """
+        llm = llm or get_default_client()
+        value = self.cached(prompt, task, temperature, max_tokens, llm)
+        if value is not None:
+            return value
+        text = llm.generate_text(prompt, temperature=temperature, max_tokens=max_tokens, use_cache=False,
+                                 task=task, response_schema=self.native_schema)
+        return self.complete(text, task, max_tokens, llm, prompt=prompt, temperature=temperature)
+
+    async def agenerate(self, prompt: str, task: Optional[str] = None, temperature: float = 0.0,
+                        max_tokens: int = 1024, llm: Optional[LLMClient] = None) -> Optional[Dict]:
+        """Async variant of `generate`."""
+        llm = llm or get_default_client()
+        value = self.cached(prompt, task, temperature, max_tokens, llm)
+        if value is not None:
+            return value
+        text = await llm.agenerate_text(prompt, temperature=temperature, max_tokens=max_tokens, use_cache=False,
+                                        task=task, response_schema=self.native_schema)
+        return await self.acomplete(text, task, max_tokens, llm, prompt=prompt, temperature=temperature)
+
+
+REPORT = StructuredOutput("report", REPORT_SCHEMA)
+SECTIONS = StructuredOutput("sections", SECTIONS_SCHEMA)
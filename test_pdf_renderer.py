@@ -0,0 +1,64 @@
+import io
+import re
+import struct
+
+from src.config import cfg
+from src.tools.pdf_renderer import PDFRenderer
+
+AMHARIC = "ሰላም ዓለም፣ የፀሐይ መስኖ በኢትዮጵያ"
+TABLE = [["Region", "ክልል"], ["Tigray", "ትግራይ"]]
+
+
+def _truetype_font(chars: str) -> bytes:
+    """Minimal TrueType font with one (blank, 600-unit wide) glyph per character of `chars`."""
+    codes = sorted({ord(c) for c in chars})
+    n_glyphs = len(codes) + 1  # glyph 0 is .notdef
+    head = struct.pack(">IIIIHH16x4h5h", 0x10000, 0x10000, 0, 0x5F0F3CF5, 0, 1000,
+                       0, -200, 1000, 800, 0, 8, 2, 0, 0)
+    hhea = struct.pack(">Ihhh24xH", 0x10000, 800, -200, 0, n_glyphs)
+    hmtx = struct.pack(f">{2 * n_glyphs}H", *[600, 0] * n_glyphs)
+    segs = len(codes) + 1
+    ends, starts = codes + [0xFFFF], codes + [0xFFFF]
+    deltas = [(gid - code) & 0xFFFF for gid, code in enumerate(codes, 1)] + [1]
+    subtable = struct.pack(f">7H{segs}HH{segs}H{segs}H{segs}H", 4, 16 + 8 * segs, 0, 2 * segs, 0, 0, 0,
+                           *ends, 0, *starts, *deltas, *[0] * segs)
+    cmap = struct.pack(">HHHHI", 0, 1, 3, 1, 12) + subtable
+    tables = {b"cmap": cmap, b"glyf": b"", b"head": head, b"hhea": hhea, b"hmtx": hmtx}
+    offset = 12 + 16 * len(tables)
+    directory, body = b"", b""
+    for tag, data in tables.items():
+        directory += struct.pack(">4sIII", tag, 0, offset + len(body), len(data))
+        body += data + b"\0" * (-len(data) % 4)
+    return struct.pack(">IHHHH", 0x10000, len(tables), 0, 0, 0) + directory + body
+
+
+def _extract_text(pdf: bytes) -> str:
+    """Text shown by an uncompressed PDF, decoding Identity-H strings through its ToUnicode map."""
+    to_unicode = {int(gid, 16): bytes.fromhex(text.decode()).decode("utf-16-be")
+                  for gid, text in re.findall(rb"<([0-9A-F]{4})> <([0-9A-F]+)>", pdf)}
+    shown = []
+    for literal, glyphs in re.findall(rb"\(((?:[^()\\]|\\.)*)\) Tj|<([0-9A-F]*)> Tj", pdf):
+        if glyphs:
+            shown.append("".join(to_unicode[int(glyphs[i:i + 4], 16)] for i in range(0, len(glyphs), 4)))
+        else:
+            shown.append(re.sub(rb"\\(.)", rb"\1", literal).decode("cp1252"))
+    return "".join(shown)
+
+
+def test_non_latin_text_survives_pdf_rendering(tmp_path, monkeypatch):
+    font_path = tmp_path / "ethiopic.ttf"
+    font_path.write_bytes(_truetype_font(AMHARIC + "".join(cell for row in TABLE for cell in row)))
+    monkeypatch.setattr(cfg, "PDF_FONTS", [str(font_path)])
+
+    out = io.BytesIO()
+    with PDFRenderer(out, compress=False) as pdf:
+        pdf.heading(AMHARIC, level=0)
+        pdf.paragraph(f"Summary: {AMHARIC} (2024)")
+        pdf.table(TABLE)
+    data = out.getvalue()
+
+    text = _extract_text(data)
+    assert AMHARIC.replace(" ", "") in text.replace(" ", "")
+    assert "Summary:" in text and "ክልል" in text and "ትግራይ" in text
+    assert "?" not in text
+    assert b"/FontFile2" in data and b"/Encoding /Identity-H" in data